@@ -39,9 +39,21 @@ CREATE TABLE IF NOT EXISTS ev_iam.usuario (
   is_deleted     TINYINT(1)   NOT NULL DEFAULT 0,
   UNIQUE KEY uq_usuario_email (email),
   INDEX idx_usuario_status    (status),
-  INDEX idx_usuario_deleted   (is_deleted)
+  INDEX idx_usuario_deleted   (is_deleted),
+  INDEX idx_usuario_nombre    (nombre)      -- búsqueda admin por prefijo de nombre
 ) ENGINE=InnoDB;
 
+/* Migración idempotente: índice por nombre para /admin/users/search */
+SET @exists := (
+  SELECT COUNT(*) FROM information_schema.statistics
+  WHERE table_schema='ev_iam'
+    AND table_name='usuario'
+    AND index_name='idx_usuario_nombre'
+);
+SET @sql := IF(@exists=0,
+  'CREATE INDEX idx_usuario_nombre ON ev_iam.usuario (nombre)',
+  'SELECT 1'); PREPARE s FROM @sql; EXECUTE s; DEALLOCATE PREPARE s;
+
 CREATE TABLE IF NOT EXISTS ev_iam.rol (
   id           CHAR(36)     PRIMARY KEY,
   codigo       VARCHAR(50)  NOT NULL,
@@ -70,16 +82,62 @@ CREATE TABLE IF NOT EXISTS ev_iam.sesion (
   issued_at   DATETIME    NOT NULL,
   expires_at  DATETIME    NOT NULL,
   jwt_id      VARCHAR(64) NOT NULL,   -- jti
+  prev_jwt_id VARCHAR(64)  NULL,      -- hash del refresh token rotado justo antes (detección de reuso)
   user_agent  VARCHAR(255) NULL,
   ip          VARCHAR(64)  NULL,
   status      TINYINT      NOT NULL DEFAULT 1, -- 1=activa,0=revocada
   created_at  TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at  TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP, -- watermark de revocaciones
   UNIQUE KEY uq_sesion_jti (jwt_id),
   INDEX idx_sesion_usuario (usuario_id),
   INDEX idx_sesion_expira  (expires_at),
+  INDEX idx_sesion_status_upd (status, updated_at),
+  INDEX idx_sesion_prev_jti (prev_jwt_id),
   CONSTRAINT chk_sesion_rango CHECK (expires_at > issued_at)
 ) ENGINE=InnoDB;
 
+/* Migración idempotente: sesion.updated_at + índice para el feed de revocaciones */
+SET @exists := (
+  SELECT COUNT(*) FROM information_schema.columns
+  WHERE table_schema='ev_iam'
+    AND table_name='sesion'
+    AND column_name='updated_at'
+);
+SET @sql := IF(@exists=0,
+  'ALTER TABLE ev_iam.sesion ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP AFTER created_at',
+  'SELECT 1'); PREPARE s FROM @sql; EXECUTE s; DEALLOCATE PREPARE s;
+
+SET @exists := (
+  SELECT COUNT(*) FROM information_schema.statistics
+  WHERE table_schema='ev_iam'
+    AND table_name='sesion'
+    AND index_name='idx_sesion_status_upd'
+);
+SET @sql := IF(@exists=0,
+  'CREATE INDEX idx_sesion_status_upd ON ev_iam.sesion (status, updated_at)',
+  'SELECT 1'); PREPARE s FROM @sql; EXECUTE s; DEALLOCATE PREPARE s;
+
+/* Migración idempotente: sesion.prev_jwt_id (reuso de refresh token rotado) */
+SET @exists := (
+  SELECT COUNT(*) FROM information_schema.columns
+  WHERE table_schema='ev_iam'
+    AND table_name='sesion'
+    AND column_name='prev_jwt_id'
+);
+SET @sql := IF(@exists=0,
+  'ALTER TABLE ev_iam.sesion ADD COLUMN prev_jwt_id VARCHAR(64) NULL AFTER jwt_id',
+  'SELECT 1'); PREPARE s FROM @sql; EXECUTE s; DEALLOCATE PREPARE s;
+
+SET @exists := (
+  SELECT COUNT(*) FROM information_schema.statistics
+  WHERE table_schema='ev_iam'
+    AND table_name='sesion'
+    AND index_name='idx_sesion_prev_jti'
+);
+SET @sql := IF(@exists=0,
+  'CREATE INDEX idx_sesion_prev_jti ON ev_iam.sesion (prev_jwt_id)',
+  'SELECT 1'); PREPARE s FROM @sql; EXECUTE s; DEALLOCATE PREPARE s;
+
 CREATE TABLE IF NOT EXISTS ev_iam.evento_audit (
   id          CHAR(36)    PRIMARY KEY,
   fecha_hora  DATETIME    NOT NULL DEFAULT CURRENT_TIMESTAMP,
@@ -88,10 +146,54 @@ CREATE TABLE IF NOT EXISTS ev_iam.evento_audit (
   entidad_id  CHAR(36)    NOT NULL,
   accion      VARCHAR(40) NOT NULL,       -- 'CREAR','ACTUALIZAR','CANCELAR','LOGIN'
   metadata    JSON        NULL,           -- request_id, correlation_id, detalles
-  INDEX idx_audit_entidad (entidad, entidad_id),
-  INDEX idx_audit_actor   (actor_id, fecha_hora)
+  INDEX idx_audit_entidad       (entidad, entidad_id, fecha_hora),
+  INDEX idx_audit_entidad_fecha (entidad, fecha_hora),  -- filtro solo por entidad
+  INDEX idx_audit_actor         (actor_id, fecha_hora),
+  INDEX idx_audit_fecha         (fecha_hora)      -- consultas/export solo por rango de fechas
 ) ENGINE=InnoDB;
 
+/* Migración idempotente: índice por fecha para /admin/audit */
+SET @exists := (
+  SELECT COUNT(*) FROM information_schema.statistics
+  WHERE table_schema='ev_iam'
+    AND table_name='evento_audit'
+    AND index_name='idx_audit_fecha'
+);
+SET @sql := IF(@exists=0,
+  'CREATE INDEX idx_audit_fecha ON ev_iam.evento_audit (fecha_hora)',
+  'SELECT 1'); PREPARE s FROM @sql; EXECUTE s; DEALLOCATE PREPARE s;
+
+/* Migración idempotente: idx_audit_entidad termina en fecha_hora (orden y rango sin filesort) */
+SET @exists := (
+  SELECT COUNT(*) FROM information_schema.statistics
+  WHERE table_schema='ev_iam'
+    AND table_name='evento_audit'
+    AND index_name='idx_audit_entidad'
+);
+SET @has_fecha := (
+  SELECT COUNT(*) FROM information_schema.statistics
+  WHERE table_schema='ev_iam'
+    AND table_name='evento_audit'
+    AND index_name='idx_audit_entidad'
+    AND column_name='fecha_hora'
+);
+SET @sql := IF(@has_fecha>0, 'SELECT 1',
+  IF(@exists=0,
+    'CREATE INDEX idx_audit_entidad ON ev_iam.evento_audit (entidad, entidad_id, fecha_hora)',
+    'ALTER TABLE ev_iam.evento_audit DROP INDEX idx_audit_entidad, ADD INDEX idx_audit_entidad (entidad, entidad_id, fecha_hora)'));
+PREPARE s FROM @sql; EXECUTE s; DEALLOCATE PREPARE s;
+
+/* Migración idempotente: índice (entidad, fecha_hora) para filtrar solo por entidad */
+SET @exists := (
+  SELECT COUNT(*) FROM information_schema.statistics
+  WHERE table_schema='ev_iam'
+    AND table_name='evento_audit'
+    AND index_name='idx_audit_entidad_fecha'
+);
+SET @sql := IF(@exists=0,
+  'CREATE INDEX idx_audit_entidad_fecha ON ev_iam.evento_audit (entidad, fecha_hora)',
+  'SELECT 1'); PREPARE s FROM @sql; EXECUTE s; DEALLOCATE PREPARE s;
+
 /* --- NUEVO: Tokens de reset de contraseña --- */
 CREATE TABLE IF NOT EXISTS ev_iam.password_reset_token (
   id           CHAR(36)   PRIMARY KEY,
@@ -240,6 +342,31 @@ CREATE TABLE IF NOT EXISTS ev_paquetes.precio_paquete (
   INDEX idx_precio_pkg_actor (created_by)
 ) ENGINE=InnoDB;
 
+-- Read model: total vigente por paquete y su desglose (mantenido por sp_paquete_total_*)
+CREATE TABLE IF NOT EXISTS ev_paquetes.paquete_total (
+  paquete_id    CHAR(36)      PRIMARY KEY,
+  codigo        VARCHAR(50)   NOT NULL,
+  nombre        VARCHAR(120)  NOT NULL,
+  descripcion   VARCHAR(500)  NULL,
+  status        TINYINT       NOT NULL,
+  moneda        CHAR(3)       NOT NULL,
+  monto_total   DECIMAL(14,2) NOT NULL,
+  n_items       INT           NOT NULL,
+  fecha_calculo DATE          NOT NULL,  -- CURRENT_DATE() con que se resolvieron los precios
+  UNIQUE KEY uq_pt_codigo (codigo)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS ev_paquetes.paquete_total_item (
+  paquete_id         CHAR(36)      NOT NULL,
+  item_id            CHAR(36)      NOT NULL,
+  opcion_servicio_id CHAR(36)      NOT NULL,
+  cantidad           INT           NOT NULL,
+  moneda             CHAR(3)       NOT NULL,
+  precio_unit        DECIMAL(12,2) NOT NULL,
+  subtotal           DECIMAL(14,2) NOT NULL,
+  PRIMARY KEY (paquete_id, item_id)
+) ENGINE=InnoDB;
+
 SET @exists := (
   SELECT COUNT(*) FROM information_schema.table_constraints
   WHERE constraint_schema='ev_paquetes'
@@ -498,22 +625,17 @@ JOIN ev_catalogo.v_opcion_con_precio_vigente vc ON vc.opcion_id = ip.opcion_serv
 WHERE p.is_deleted = 0
   AND p.status = 1;
 
--- NUEVA: total vigente del paquete (suma de ítems * cantidad)
+-- Total vigente del paquete: lectura del read model materializado (ver sp_paquete_total_refrescar)
 CREATE OR REPLACE VIEW ev_paquetes.v_paquete_precio_vigente_total AS
 SELECT
-  p.paquete_id,
-  MIN(p.codigo)  AS codigo,
-  MIN(p.nombre)  AS nombre,
-  MIN(p.descripcion) AS descripcion,
-  MIN(p.status)  AS status,
-  MIN(p.moneda)  AS moneda,
-  SUM(p.cantidad * p.monto) AS monto_total_vigente
-FROM (
-  SELECT d.paquete_id, d.codigo, d.nombre, d.descripcion, d.status, d.opcion_servicio_id,
-         d.cantidad, d.moneda, d.monto
-  FROM ev_paquetes.v_paquete_detalle d
-) p
-GROUP BY p.paquete_id;
+  t.paquete_id,
+  t.codigo,
+  t.nombre,
+  t.descripcion,
+  t.status,
+  t.moneda,
+  t.monto_total AS monto_total_vigente
+FROM ev_paquetes.paquete_total t;
 
 -- Pedido con datos ligeros del cliente
 CREATE OR REPLACE VIEW ev_contratacion.v_pedido_con_cliente AS
@@ -529,6 +651,216 @@ SELECT
 FROM ev_contratacion.pedido_evento pe
 LEFT JOIN ev_iam.usuario u ON u.id = pe.cliente_id;
 
+-- Versión del catálogo: catalogo-service sondea esta fila (PK) y reconstruye su snapshot en
+-- memoria cuando cambia. Los triggers la incrementan en cada escritura de catálogo/paquetes.
+CREATE TABLE IF NOT EXISTS ev_catalogo.catalogo_version (
+  id          TINYINT  PRIMARY KEY,
+  version     BIGINT   NOT NULL DEFAULT 0,
+  updated_at  TIMESTAMP NULL DEFAULT NULL ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+INSERT IGNORE INTO ev_catalogo.catalogo_version (id, version) VALUES (1, 0);
+
+DROP TRIGGER IF EXISTS ev_catalogo.trg_tipo_evento_ver_ai;
+CREATE TRIGGER ev_catalogo.trg_tipo_evento_ver_ai AFTER INSERT ON ev_catalogo.tipo_evento FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_catalogo.trg_tipo_evento_ver_au;
+CREATE TRIGGER ev_catalogo.trg_tipo_evento_ver_au AFTER UPDATE ON ev_catalogo.tipo_evento FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_catalogo.trg_tipo_evento_ver_ad;
+CREATE TRIGGER ev_catalogo.trg_tipo_evento_ver_ad AFTER DELETE ON ev_catalogo.tipo_evento FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_catalogo.trg_servicio_ver_ai;
+CREATE TRIGGER ev_catalogo.trg_servicio_ver_ai AFTER INSERT ON ev_catalogo.servicio FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_catalogo.trg_servicio_ver_au;
+CREATE TRIGGER ev_catalogo.trg_servicio_ver_au AFTER UPDATE ON ev_catalogo.servicio FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_catalogo.trg_servicio_ver_ad;
+CREATE TRIGGER ev_catalogo.trg_servicio_ver_ad AFTER DELETE ON ev_catalogo.servicio FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_catalogo.trg_opcion_servicio_ver_ai;
+CREATE TRIGGER ev_catalogo.trg_opcion_servicio_ver_ai AFTER INSERT ON ev_catalogo.opcion_servicio FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_catalogo.trg_opcion_servicio_ver_au;
+CREATE TRIGGER ev_catalogo.trg_opcion_servicio_ver_au AFTER UPDATE ON ev_catalogo.opcion_servicio FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_catalogo.trg_opcion_servicio_ver_ad;
+CREATE TRIGGER ev_catalogo.trg_opcion_servicio_ver_ad AFTER DELETE ON ev_catalogo.opcion_servicio FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_catalogo.trg_precio_servicio_ver_ai;
+CREATE TRIGGER ev_catalogo.trg_precio_servicio_ver_ai AFTER INSERT ON ev_catalogo.precio_servicio FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_catalogo.trg_precio_servicio_ver_au;
+CREATE TRIGGER ev_catalogo.trg_precio_servicio_ver_au AFTER UPDATE ON ev_catalogo.precio_servicio FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_catalogo.trg_precio_servicio_ver_ad;
+CREATE TRIGGER ev_catalogo.trg_precio_servicio_ver_ad AFTER DELETE ON ev_catalogo.precio_servicio FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_paquetes.trg_paquete_ver_ai;
+CREATE TRIGGER ev_paquetes.trg_paquete_ver_ai AFTER INSERT ON ev_paquetes.paquete FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_paquetes.trg_paquete_ver_au;
+CREATE TRIGGER ev_paquetes.trg_paquete_ver_au AFTER UPDATE ON ev_paquetes.paquete FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_paquetes.trg_paquete_ver_ad;
+CREATE TRIGGER ev_paquetes.trg_paquete_ver_ad AFTER DELETE ON ev_paquetes.paquete FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_paquetes.trg_item_paquete_ver_ai;
+CREATE TRIGGER ev_paquetes.trg_item_paquete_ver_ai AFTER INSERT ON ev_paquetes.item_paquete FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_paquetes.trg_item_paquete_ver_au;
+CREATE TRIGGER ev_paquetes.trg_item_paquete_ver_au AFTER UPDATE ON ev_paquetes.item_paquete FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_paquetes.trg_item_paquete_ver_ad;
+CREATE TRIGGER ev_paquetes.trg_item_paquete_ver_ad AFTER DELETE ON ev_paquetes.item_paquete FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_paquetes.trg_precio_paquete_ver_ai;
+CREATE TRIGGER ev_paquetes.trg_precio_paquete_ver_ai AFTER INSERT ON ev_paquetes.precio_paquete FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_paquetes.trg_precio_paquete_ver_au;
+CREATE TRIGGER ev_paquetes.trg_precio_paquete_ver_au AFTER UPDATE ON ev_paquetes.precio_paquete FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+DROP TRIGGER IF EXISTS ev_paquetes.trg_precio_paquete_ver_ad;
+CREATE TRIGGER ev_paquetes.trg_precio_paquete_ver_ad AFTER DELETE ON ev_paquetes.precio_paquete FOR EACH ROW
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+
+-- Totales de paquete materializados (ev_paquetes.paquete_total / paquete_total_item).
+-- Se recalcula solo el paquete afectado por cada cambio de ítem, precio, opción o cabecera;
+-- evt_paquete_total_diario reconstruye todo al cambiar el día (precios que entran/salen de vigencia).
+DELIMITER $$
+
+DROP PROCEDURE IF EXISTS ev_paquetes.sp_paquete_total_refrescar $$
+CREATE PROCEDURE ev_paquetes.sp_paquete_total_refrescar(IN p_paquete_id CHAR(36))
+BEGIN
+  DELETE FROM ev_paquetes.paquete_total_item WHERE paquete_id = p_paquete_id;
+  DELETE FROM ev_paquetes.paquete_total WHERE paquete_id = p_paquete_id;
+
+  INSERT INTO ev_paquetes.paquete_total_item
+         (paquete_id, item_id, opcion_servicio_id, cantidad, moneda, precio_unit, subtotal)
+  SELECT ip.paquete_id, ip.id, ip.opcion_servicio_id, ip.cantidad, ps.moneda, ps.monto, ip.cantidad * ps.monto
+    FROM ev_paquetes.item_paquete ip
+    JOIN ev_paquetes.paquete pk
+      ON pk.id = ip.paquete_id AND pk.is_deleted = 0 AND pk.status = 1
+    JOIN ev_catalogo.opcion_servicio o
+      ON o.id = ip.opcion_servicio_id AND o.is_deleted = 0 AND o.status = 1
+    JOIN ev_catalogo.precio_servicio ps
+      ON ps.id = (SELECT p2.id
+                    FROM ev_catalogo.precio_servicio p2
+                   WHERE p2.opcion_servicio_id = ip.opcion_servicio_id
+                     AND p2.vigente_desde <= CURRENT_DATE()
+                     AND (p2.vigente_hasta IS NULL OR p2.vigente_hasta >= CURRENT_DATE())
+                   ORDER BY p2.vigente_desde DESC
+                   LIMIT 1)
+   WHERE ip.paquete_id = p_paquete_id;
+
+  INSERT INTO ev_paquetes.paquete_total
+         (paquete_id, codigo, nombre, descripcion, status, moneda, monto_total, n_items, fecha_calculo)
+  SELECT pk.id, pk.codigo, pk.nombre, pk.descripcion, pk.status,
+         MIN(t.moneda), SUM(t.subtotal), COUNT(*), CURRENT_DATE()
+    FROM ev_paquetes.paquete pk
+    JOIN ev_paquetes.paquete_total_item t ON t.paquete_id = pk.id
+   WHERE pk.id = p_paquete_id
+   GROUP BY pk.id, pk.codigo, pk.nombre, pk.descripcion, pk.status;
+END $$
+
+DROP PROCEDURE IF EXISTS ev_paquetes.sp_paquete_total_por_opcion $$
+CREATE PROCEDURE ev_paquetes.sp_paquete_total_por_opcion(IN p_opcion_id CHAR(36))
+BEGIN
+  DECLARE v_fin INT DEFAULT 0;
+  DECLARE v_paquete CHAR(36);
+  DECLARE cur CURSOR FOR
+    SELECT DISTINCT paquete_id FROM ev_paquetes.item_paquete WHERE opcion_servicio_id = p_opcion_id;
+  DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_fin = 1;
+  OPEN cur;
+  lectura: LOOP
+    FETCH cur INTO v_paquete;
+    IF v_fin = 1 THEN LEAVE lectura; END IF;
+    CALL ev_paquetes.sp_paquete_total_refrescar(v_paquete);
+  END LOOP;
+  CLOSE cur;
+END $$
+
+DROP PROCEDURE IF EXISTS ev_paquetes.sp_paquete_total_reconstruir $$
+CREATE PROCEDURE ev_paquetes.sp_paquete_total_reconstruir()
+BEGIN
+  DECLARE v_fin INT DEFAULT 0;
+  DECLARE v_paquete CHAR(36);
+  DECLARE cur CURSOR FOR SELECT id FROM ev_paquetes.paquete;
+  DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_fin = 1;
+  START TRANSACTION;
+  DELETE FROM ev_paquetes.paquete_total_item;
+  DELETE FROM ev_paquetes.paquete_total;
+  OPEN cur;
+  lectura: LOOP
+    FETCH cur INTO v_paquete;
+    IF v_fin = 1 THEN LEAVE lectura; END IF;
+    CALL ev_paquetes.sp_paquete_total_refrescar(v_paquete);
+  END LOOP;
+  CLOSE cur;
+  -- el snapshot de catalogo-service vuelve a leer con los totales del día
+  UPDATE ev_catalogo.catalogo_version SET version = version + 1 WHERE id = 1;
+  COMMIT;
+END $$
+
+DROP TRIGGER IF EXISTS ev_paquetes.trg_item_paquete_total_ai $$
+CREATE TRIGGER ev_paquetes.trg_item_paquete_total_ai AFTER INSERT ON ev_paquetes.item_paquete FOR EACH ROW
+BEGIN
+  CALL ev_paquetes.sp_paquete_total_refrescar(NEW.paquete_id);
+END $$
+DROP TRIGGER IF EXISTS ev_paquetes.trg_item_paquete_total_au $$
+CREATE TRIGGER ev_paquetes.trg_item_paquete_total_au AFTER UPDATE ON ev_paquetes.item_paquete FOR EACH ROW
+BEGIN
+  CALL ev_paquetes.sp_paquete_total_refrescar(NEW.paquete_id);
+  IF OLD.paquete_id <> NEW.paquete_id THEN
+    CALL ev_paquetes.sp_paquete_total_refrescar(OLD.paquete_id);
+  END IF;
+END $$
+DROP TRIGGER IF EXISTS ev_paquetes.trg_item_paquete_total_ad $$
+CREATE TRIGGER ev_paquetes.trg_item_paquete_total_ad AFTER DELETE ON ev_paquetes.item_paquete FOR EACH ROW
+BEGIN
+  CALL ev_paquetes.sp_paquete_total_refrescar(OLD.paquete_id);
+END $$
+
+DROP TRIGGER IF EXISTS ev_paquetes.trg_paquete_total_ai $$
+CREATE TRIGGER ev_paquetes.trg_paquete_total_ai AFTER INSERT ON ev_paquetes.paquete FOR EACH ROW
+BEGIN
+  CALL ev_paquetes.sp_paquete_total_refrescar(NEW.id);
+END $$
+DROP TRIGGER IF EXISTS ev_paquetes.trg_paquete_total_au $$
+CREATE TRIGGER ev_paquetes.trg_paquete_total_au AFTER UPDATE ON ev_paquetes.paquete FOR EACH ROW
+BEGIN
+  CALL ev_paquetes.sp_paquete_total_refrescar(NEW.id);
+END $$
+
+DROP TRIGGER IF EXISTS ev_catalogo.trg_precio_servicio_total_ai $$
+CREATE TRIGGER ev_catalogo.trg_precio_servicio_total_ai AFTER INSERT ON ev_catalogo.precio_servicio FOR EACH ROW
+BEGIN
+  CALL ev_paquetes.sp_paquete_total_por_opcion(NEW.opcion_servicio_id);
+END $$
+DROP TRIGGER IF EXISTS ev_catalogo.trg_precio_servicio_total_au $$
+CREATE TRIGGER ev_catalogo.trg_precio_servicio_total_au AFTER UPDATE ON ev_catalogo.precio_servicio FOR EACH ROW
+BEGIN
+  CALL ev_paquetes.sp_paquete_total_por_opcion(NEW.opcion_servicio_id);
+  IF OLD.opcion_servicio_id <> NEW.opcion_servicio_id THEN
+    CALL ev_paquetes.sp_paquete_total_por_opcion(OLD.opcion_servicio_id);
+  END IF;
+END $$
+DROP TRIGGER IF EXISTS ev_catalogo.trg_precio_servicio_total_ad $$
+CREATE TRIGGER ev_catalogo.trg_precio_servicio_total_ad AFTER DELETE ON ev_catalogo.precio_servicio FOR EACH ROW
+BEGIN
+  CALL ev_paquetes.sp_paquete_total_por_opcion(OLD.opcion_servicio_id);
+END $$
+
+DROP TRIGGER IF EXISTS ev_catalogo.trg_opcion_servicio_total_au $$
+CREATE TRIGGER ev_catalogo.trg_opcion_servicio_total_au AFTER UPDATE ON ev_catalogo.opcion_servicio FOR EACH ROW
+BEGIN
+  IF OLD.status <> NEW.status OR OLD.is_deleted <> NEW.is_deleted THEN
+    CALL ev_paquetes.sp_paquete_total_por_opcion(NEW.id);
+  END IF;
+END $$
+
+DELIMITER ;
+
 /* ============================================================
    9) SEEDS mínimos (roles + un usuario demo + catálogo base)
    ============================================================ */
@@ -599,7 +931,7 @@ INSERT INTO ev_proveedores.habilidad_proveedor (id, proveedor_id, servicio_id, n
 ON DUPLICATE KEY UPDATE nivel=VALUES(nivel);
 
 /* ============================================================
-   10) EVENTOS programados (holds expirados)
+   10) EVENTOS programados (holds expirados, totales de paquete)
    ============================================================ */
 DROP EVENT IF EXISTS ev_proveedores.evt_expira_holds;
 CREATE EVENT ev_proveedores.evt_expira_holds
@@ -610,6 +942,14 @@ CREATE EVENT ev_proveedores.evt_expira_holds
      WHERE status = 0   -- hold activa
        AND expira_en <= NOW();
 
+DROP EVENT IF EXISTS ev_paquetes.evt_paquete_total_diario;
+CREATE EVENT ev_paquetes.evt_paquete_total_diario
+  ON SCHEDULE EVERY 1 DAY STARTS (CURRENT_DATE() + INTERVAL 1 DAY + INTERVAL 1 MINUTE)
+  DO CALL ev_paquetes.sp_paquete_total_reconstruir();
+
+-- Carga inicial del read model (idempotente)
+CALL ev_paquetes.sp_paquete_total_reconstruir();
+
 /* ============================================================
    11) USUARIOS DB / PERMISOS (por bounded context)
    ============================================================ */
@@ -1,5 +1,6 @@
 
 # ev_shared package re-exports
-from .config import Settings, load_settings
+from .config import Settings, load_settings, get_settings, reload_settings, install_reload_signal
 from .logger import get_logger
-from .db import build_engine, make_session_factory, session_scope
+from .db import build_engine, get_engine, dispose_engines, make_session_factory, session_scope
+from .db import get_async_engine, dispose_async_engines, async_session_scope
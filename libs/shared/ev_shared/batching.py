@@ -0,0 +1,192 @@
+"""
+ev_shared.batching
+------------------
+Buffer write-behind en memoria para telemetría de alto volumen (audit, intentos de login).
+- add() no toca la BD: encola y retorna.
+- Un worker asíncrono vacía en lotes de hasta `max_batch` cuando se llena el lote o pasa
+  `flush_interval`, llamando a `flush(rows)` (una transacción, INSERT multi-fila).
+- Memoria acotada a `max_pending` filas; al desbordar aplica `overflow`:
+  "drop_oldest" (default) descarta la más antigua, "drop_newest" rechaza la nueva.
+  `on_drop(rows)` (opcional) recibe cada fila descartada, también las que quedan al apagar.
+- Si el flush falla, el lote vuelve al frente de la cola (lo que no quepa se descarta) y se
+  reintenta con backoff. stop() hace el flush final.
+- stats(): encoladas, escritas, descartadas, lotes, errores y filas demoradas (> 2x intervalo).
+Synopsis: created by emeday 2025
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+from .logger import get_logger
+
+log = get_logger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest")
+
+class WriteBehindBuffer:
+    def __init__(self, name: str, flush: Callable[[List[Any]], Awaitable[None]],
+                 max_batch: int = 500, flush_interval: float = 1.0, max_pending: int = 10000,
+                 overflow: str = "drop_oldest", retry_max_seconds: float = 30.0,
+                 on_drop: Optional[Callable[[List[Any]], None]] = None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow debe ser uno de {OVERFLOW_POLICIES}")
+        self.name = name
+        self.flush = flush
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.overflow = overflow
+        self.retry_max_seconds = retry_max_seconds
+        self.on_drop = on_drop
+        self._rows: Deque[Tuple[float, Any]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight = 0
+        self.added = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self.delayed = 0
+        self.max_age_ms = 0.0
+
+    def add(self, row: Any) -> bool:
+        """Encola una fila; False si se descartó por desborde (drop_newest)"""
+        if len(self._rows) >= self.max_pending:
+            self.dropped += 1
+            if self.overflow == "drop_newest":
+                self._dropped([row])
+                return False
+            self._dropped([self._rows.popleft()[1]])
+        self._rows.append((time.monotonic(), row))
+        self.added += 1
+        if self._wakeup is not None and len(self._rows) >= self.max_batch:
+            self._wakeup.set()
+        return True
+
+    def __len__(self) -> int:
+        return len(self._rows) + self._inflight
+
+    @property
+    def queued(self) -> int:
+        """Filas esperando lote (sin contar el lote en escritura)"""
+        return len(self._rows)
+
+    def _take_batch(self) -> List[Tuple[float, Any]]:
+        n = min(self.max_batch, len(self._rows))
+        return [self._rows.popleft() for _ in range(n)]
+
+    def _dropped(self, rows: List[Any]) -> None:
+        if self.on_drop is not None and rows:
+            self.on_drop(rows)
+
+    def _requeue(self, batch: List[Tuple[float, Any]]) -> None:
+        room = self.max_pending - len(self._rows)
+        if room < len(batch):
+            self.dropped += len(batch) - max(room, 0)
+            self._dropped([row for _, row in batch[max(room, 0):]])
+            batch = batch[:max(room, 0)]
+        self._rows.extendleft(reversed(batch))
+
+    async def _flush_once(self) -> bool:
+        batch = self._take_batch()
+        if not batch:
+            return True
+        self._inflight = len(batch)
+        try:
+            await self.flush([row for _, row in batch])
+        except asyncio.CancelledError:
+            self._requeue(batch)
+            raise
+        except Exception as e:
+            self.errors += 1
+            log.warning("Buffer %s: fallo escribiendo %s filas (%s)", self.name, len(batch), e)
+            self._requeue(batch)
+            return False
+        finally:
+            self._inflight = 0
+        now = time.monotonic()
+        oldest_ms = (now - batch[0][0]) * 1000
+        self.max_age_ms = max(self.max_age_ms, oldest_ms)
+        limit = 2 * self.flush_interval
+        self.delayed += sum(1 for t, _ in batch if now - t > limit)
+        self.written += len(batch)
+        self.batches += 1
+        return True
+
+    async def _run(self) -> None:
+        delay = 0.5
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._rows:
+                if not await self._flush_once():
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.retry_max_seconds)
+                    break
+                delay = 0.5
+                if len(self._rows) < self.max_batch:
+                    break
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Detiene el worker y hace el flush final (lo que no alcance en `timeout` se pierde)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        deadline = time.monotonic() + timeout
+        while self._rows and time.monotonic() < deadline:
+            if not await self._flush_once():
+                await asyncio.sleep(0.2)
+        if self._rows:
+            log.warning("Buffer %s: %s filas sin escribir al apagar", self.name, len(self._rows))
+            self.dropped += len(self._rows)
+            self._dropped([row for _, row in self._rows])
+            self._rows.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self),
+            "max_pending": self.max_pending,
+            "overflow": self.overflow,
+            "added": self.added,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "errors": self.errors,
+            "delayed": self.delayed,
+            "max_age_ms": round(self.max_age_ms, 1),
+        }
+
+def multi_row_insert(table: str, columns: Sequence[str], rows: Sequence[Dict[str, Any]],
+                     ignore: bool = False, casts: Optional[Dict[str, str]] = None) -> Tuple[TextClause, Dict[str, Any]]:
+    """
+    Arma un INSERT multi-fila con parámetros nombrados (:col_0, :col_1, ...).
+    `casts` envuelve columnas: {"metadata": "JSON"} -> CAST(:metadata_0 AS JSON).
+    """
+    casts = casts or {}
+    params: Dict[str, Any] = {}
+    tuples = []
+    for i, row in enumerate(rows):
+        values = []
+        for col in columns:
+            key = f"{col}_{i}"
+            params[key] = row.get(col)
+            values.append(f"CAST(:{key} AS {casts[col]})" if col in casts else f":{key}")
+        tuples.append("(" + ", ".join(values) + ")")
+    verb = "INSERT IGNORE INTO" if ignore else "INSERT INTO"
+    sql = f"{verb} {table} ({', '.join(columns)}) VALUES " + ", ".join(tuples)
+    return text(sql), params
@@ -0,0 +1,79 @@
+"""
+ev_shared.cache
+---------------
+Cache en memoria LRU + TTL, acotado y thread-safe, para datos de lectura frecuente.
+- get() distingue "no está" (MISSING) de un valor None cacheado (negativo).
+- Generación: quien carga desde la BD toma generation antes de consultar y usa
+  put(..., gen=...); si hubo una invalidación entremedio, el valor viejo no se guarda.
+Synopsis: created by emeday 2025
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+MISSING = object()
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def get_many(self, keys: Iterable[Hashable]) -> Tuple[Dict[Hashable, Any], list]:
+        """(encontrados, faltantes) en una sola pasada"""
+        found: Dict[Hashable, Any] = {}
+        missing = []
+        for k in keys:
+            v = self.get(k)
+            if v is MISSING:
+                missing.append(k)
+            else:
+                found[k] = v
+        return found, missing
+
+    def put(self, key: Hashable, value: Any, gen: Optional[int] = None) -> bool:
+        if self.maxsize <= 0:
+            return False
+        with self._lock:
+            if gen is not None and gen != self.generation:
+                return False
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return True
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self.generation += 1
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                "hits": self.hits, "misses": self.misses}
@@ -2,35 +2,276 @@
 ev_shared.db
 ------------
 SQLAlchemy Engine / Session helpers.
+- Un Engine (QueuePool) por proceso y por DATABASE_URL, reutilizado entre requests.
+- Ping de vida al checkout solo si la conexión estuvo ociosa más de DB_POOL_PING_IDLE.
+- Contraparte asíncrona (aiomysql): get_async_engine / async_session_scope.
+- Lecturas en réplicas: session_scope(settings, readonly=True) reparte entre DB_REPLICA_URLS
+  (round-robin), saca de rotación las réplicas con lag > DB_REPLICA_MAX_LAG y, si el request
+  ya escribió en el primario, sigue leyendo del primario (read-your-writes).
+  El lag lo mide un hilo por réplica cada DB_REPLICA_CHECK_INTERVAL (arranca en la primera
+  lectura readonly); el request solo lee el último estado. Sin medición aún, va al primario.
+  session.info["replica"] = URL de la réplica usada (None si es el primario), para que un
+  cache de proceso no se llene con datos posiblemente atrasados.
 Synopsis: created by emeday 2025
 """
-from contextlib import contextmanager
-from sqlalchemy import create_engine
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from sqlalchemy import create_engine, event, exc, text
 from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool
 from .config import Settings
+from .logger import get_logger
 
-def build_engine(settings: Settings) -> Engine:
-    """Crea un Engine de SQLAlchemy desde Settings"""
-    return create_engine(settings.DATABASE_URL, pool_pre_ping=True, pool_recycle=300)
+log = get_logger(__name__)
+
+_engines: Dict[str, Engine] = {}
+_factories: Dict[str, sessionmaker] = {}
+_async_engines: Dict[str, AsyncEngine] = {}
+_async_factories: Dict[str, async_sessionmaker] = {}
+_lock = threading.Lock()
+
+def _install_idle_ping(engine: Engine, idle_seconds: int) -> None:
+    """
+    Registra listeners de pool: guarda la hora de devolución de cada conexión y,
+    al sacarla de nuevo, hace SELECT 1 solo si pasó más de `idle_seconds`.
+    Si el ping falla, DisconnectionError hace que el pool descarte y reintente.
+    """
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_conn, conn_record):
+        conn_record.info["last_checkin"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_conn, conn_record, conn_proxy):
+        last = conn_record.info.get("last_checkin")
+        if last is None or time.monotonic() - last < idle_seconds:
+            return
+        try:
+            cur = dbapi_conn.cursor()
+            try:
+                cur.execute("SELECT 1")
+            finally:
+                cur.close()
+        except Exception:
+            raise exc.DisconnectionError()
+
+def _install_write_marker(engine: Engine) -> None:
+    """Marca el contexto del request como 'escribió en primario' al ejecutar DML"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip()[:7].upper().startswith(_WRITE_VERBS):
+            _wrote_in_request.set(True)
+
+def build_engine(settings: Settings, url: Optional[str] = None) -> Engine:
+    """Crea un Engine de SQLAlchemy (QueuePool) desde Settings; `url` permite apuntar a una réplica"""
+    engine = create_engine(
+        url or settings.DATABASE_URL,
+        poolclass=QueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=False,
+    )
+    _install_idle_ping(engine, settings.DB_POOL_PING_IDLE)
+    return engine
 
 def make_session_factory(engine: Engine):
     """Crea un sessionmaker desde un Engine"""
     return sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+def get_engine(settings: Settings, url: Optional[str] = None) -> Engine:
+    """Devuelve el Engine compartido del proceso para `url` (por defecto DATABASE_URL); lo crea una sola vez"""
+    url = url or settings.DATABASE_URL
+    engine = _engines.get(url)
+    if engine is not None:
+        return engine
+    with _lock:
+        engine = _engines.get(url)
+        if engine is None:
+            engine = build_engine(settings, url)
+            if url == settings.DATABASE_URL:
+                _install_write_marker(engine)
+            _engines[url] = engine
+            _factories[url] = make_session_factory(engine)
+        return engine
+
+def get_session_factory(settings: Settings, url: Optional[str] = None) -> sessionmaker:
+    """sessionmaker ligado al Engine compartido"""
+    url = url or settings.DATABASE_URL
+    get_engine(settings, url)
+    return _factories[url]
+
+def dispose_engines() -> None:
+    """Cierra todos los pools del proceso (usar en shutdown)"""
+    stop_replica_monitor()
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _factories.clear()
+
+def _reset_after_fork() -> None:
+    # Las conexiones heredadas del padre no se deben usar en el hijo
+    for engine in list(_engines.values()):
+        engine.dispose(close=False)
+    for aengine in list(_async_engines.values()):
+        aengine.sync_engine.dispose(close=False)
+    _engines.clear()
+    _factories.clear()
+    _async_engines.clear()
+    _async_factories.clear()
+    _replicas.clear()
+    _monitors.clear()   # los hilos no sobreviven al fork: el hijo arranca los suyos
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+# ---------- Réplicas de lectura ----------
+_WRITE_VERBS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+_LAG_QUERIES = ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS")   # MySQL >= 8.0.22 / anteriores
+_LAG_COLUMNS = ("Seconds_Behind_Source", "Seconds_Behind_Master")
+
+# Cada request corre en su propia tarea/contexto, así que la marca no se filtra entre requests
+_wrote_in_request: ContextVar[bool] = ContextVar("ev_db_wrote_in_request", default=False)
+
+class _ReplicaState:
+    __slots__ = ("lag", "healthy", "checked_at")
+
+    def __init__(self):
+        self.lag: Optional[int] = None
+        self.healthy = True
+        self.checked_at = 0.0
+
+    def usable(self, max_lag: int) -> bool:
+        return self.healthy and self.lag is not None and self.lag <= max_lag
+
+_replicas: Dict[str, _ReplicaState] = {}
+_rr = itertools.count()
+_monitors: List[threading.Thread] = []
+_monitor_stop = threading.Event()
+
+def mark_primary_write() -> None:
+    """Fuerza que las lecturas readonly restantes del request vayan al primario"""
+    _wrote_in_request.set(True)
+
+def _replica_state(url: str) -> _ReplicaState:
+    state = _replicas.get(url)
+    if state is None:
+        state = _replicas.setdefault(url, _ReplicaState())
+    return state
+
+def _lag_from_row(row) -> Optional[int]:
+    # Sin fila: el DSN no es réplica (p. ej. apunta al primario en dev) -> sin lag
+    if row is None:
+        return 0
+    for col in _LAG_COLUMNS:
+        if col in row:
+            return row[col]   # None = replicación detenida
+    return None
+
+def _read_lag(conn) -> Optional[int]:
+    last_error: Optional[Exception] = None
+    for sql in _LAG_QUERIES:
+        try:
+            row = conn.execute(text(sql)).mappings().first()
+        except exc.DBAPIError as e:
+            conn.rollback()
+            last_error = e
+            continue
+        return _lag_from_row(row)
+    raise last_error
+
+def _record_lag(url: str, state: _ReplicaState, lag: Optional[int], error: Optional[Exception]) -> None:
+    was_usable = state.healthy
+    state.lag = lag
+    state.healthy = error is None and lag is not None
+    state.checked_at = time.monotonic()
+    if was_usable and not state.healthy:
+        log.warning("Réplica fuera de rotación (%s): %s", url.split("@")[-1], error or "replicación detenida")
+
+def _probe(settings: Settings, url: str) -> None:
+    lag, error = None, None
+    try:
+        with get_engine(settings, url).connect() as conn:
+            lag = _read_lag(conn)
+    except Exception as e:
+        error = e
+    _record_lag(url, _replica_state(url), lag, error)
+
+def _monitor_replica(settings: Settings, url: str) -> None:
+    # Un hilo por réplica: una inalcanzable solo demora su propio chequeo (timeout de connect)
+    while not _monitor_stop.is_set():
+        _probe(settings, url)
+        _monitor_stop.wait(settings.DB_REPLICA_CHECK_INTERVAL)
+
+def _ensure_monitor(settings: Settings) -> None:
+    """Arranca (una vez por proceso) los hilos que miden el lag de cada réplica"""
+    if _monitors or not settings.REPLICA_DATABASE_URLS:
+        return
+    with _lock:
+        if _monitors:
+            return
+        _monitor_stop.clear()
+        for url in settings.REPLICA_DATABASE_URLS:
+            _replica_state(url)
+            t = threading.Thread(target=_monitor_replica, args=(settings, url),
+                                 name=f"ev-replica-lag-{len(_monitors)}", daemon=True)
+            t.start()
+            _monitors.append(t)
+
+def stop_replica_monitor() -> None:
+    _monitor_stop.set()
+    _monitors.clear()
+
+def _rotation(urls: List[str]):
+    """Recorre las réplicas en orden round-robin (índice, url)"""
+    if not urls:
+        return
+    start = next(_rr)
+    for i in range(len(urls)):
+        yield (start + i) % len(urls), urls[(start + i) % len(urls)]
+
+def _pick_from(settings: Settings, urls: List[str]) -> Optional[str]:
+    """
+    Réplica utilizable según el último lag medido en segundo plano; el request nunca mide.
+    `urls` va en paralelo a REPLICA_DATABASE_URLS (misma réplica, otro driver).
+    """
+    if _wrote_in_request.get() or not urls:
+        return None
+    _ensure_monitor(settings)
+    measured = settings.REPLICA_DATABASE_URLS
+    for i, url in _rotation(urls):
+        state = _replicas.get(measured[i])
+        if state is not None and state.usable(settings.DB_REPLICA_MAX_LAG):
+            return url
+    return None
+
+def _pick_replica(settings: Settings) -> Optional[str]:
+    """URL de una réplica utilizable o None para leer del primario"""
+    return _pick_from(settings, settings.REPLICA_DATABASE_URLS)
+
 @contextmanager
-def session_scope(settings: Settings):
+def session_scope(settings: Settings, readonly: bool = False):
     """
     Context manager para sesiones de SQLAlchemy.
-    Ahora acepta Settings directamente y crea el engine y session internamente.
-    
+    Acepta Settings directamente y toma la sesión del pool compartido del proceso.
+    Con readonly=True la sesión puede ir a una réplica (ver cabecera del módulo);
+    no usar para escribir.
+
     Uso:
         with session_scope(settings) as session:
             result = session.execute(...)
     """
-    engine = build_engine(settings)
-    SessionFactory = make_session_factory(engine)
-    session = SessionFactory()
+    url = _pick_replica(settings) if readonly else None
+    session: Session = get_session_factory(settings, url)()
+    session.info["replica"] = url
     try:
         yield session
         session.commit()
@@ -39,4 +280,74 @@ def session_scope(settings: Settings):
         raise
     finally:
         session.close()
-        engine.dispose()
+
+
+# ---------- Async (aiomysql) ----------
+def build_async_engine(settings: Settings, url: Optional[str] = None) -> AsyncEngine:
+    """Crea un AsyncEngine (driver aiomysql) con la misma política de pool que build_engine"""
+    engine = create_async_engine(
+        url or settings.ASYNC_DATABASE_URL,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=False,
+    )
+    _install_idle_ping(engine.sync_engine, settings.DB_POOL_PING_IDLE)
+    return engine
+
+def get_async_engine(settings: Settings, url: Optional[str] = None) -> AsyncEngine:
+    """AsyncEngine compartido del proceso para `url` (por defecto ASYNC_DATABASE_URL)"""
+    url = url or settings.ASYNC_DATABASE_URL
+    engine = _async_engines.get(url)
+    if engine is not None:
+        return engine
+    with _lock:
+        engine = _async_engines.get(url)
+        if engine is None:
+            engine = build_async_engine(settings, url)
+            if url == settings.ASYNC_DATABASE_URL:
+                _install_write_marker(engine.sync_engine)
+            _async_engines[url] = engine
+            _async_factories[url] = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        return engine
+
+def get_async_session_factory(settings: Settings, url: Optional[str] = None) -> async_sessionmaker:
+    """async_sessionmaker ligado al AsyncEngine compartido"""
+    url = url or settings.ASYNC_DATABASE_URL
+    get_async_engine(settings, url)
+    return _async_factories[url]
+
+async def dispose_async_engines() -> None:
+    """Cierra todos los pools asíncronos del proceso (usar en shutdown)"""
+    engines = list(_async_engines.values())
+    _async_engines.clear()
+    _async_factories.clear()
+    for engine in engines:
+        await engine.dispose()
+
+def _pick_async_replica(settings: Settings) -> Optional[str]:
+    """Igual que _pick_replica, con la URL aiomysql de la réplica (el lag lo mide el mismo hilo)"""
+    return _pick_from(settings, settings.ASYNC_REPLICA_DATABASE_URLS)
+
+@asynccontextmanager
+async def async_session_scope(settings: Settings, readonly: bool = False):
+    """
+    Contraparte asíncrona de session_scope: commit al salir, rollback si hay error.
+    readonly=True se comporta igual que en session_scope.
+
+    Uso:
+        async with async_session_scope(settings) as session:
+            result = await session.execute(...)
+    """
+    url = _pick_async_replica(settings) if readonly else None
+    session: AsyncSession = get_async_session_factory(settings, url)()
+    session.info["replica"] = url
+    try:
+        yield session
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
@@ -8,7 +8,9 @@ Synopsis: created by emeday 2025
 from fastapi import APIRouter
 from sqlalchemy import text
 from .config import Settings
-from .db import build_engine
+from .db import get_engine
+from .security.hashing import hashing_stats
+from .security.revocation import revocation_stats
 
 def build_debug_router(settings: Settings) -> APIRouter:
     router = APIRouter(tags=["_debug"])
@@ -30,11 +32,20 @@ def build_debug_router(settings: Settings) -> APIRouter:
 
     @router.get("/_debug/db")
     def debug_db():
-        engine = build_engine(settings)
         try:
-            with engine.connect() as conn:
+            with get_engine(settings).connect() as conn:
                 conn.execute(text("SELECT 1"))
             return {"ok": True}
         except Exception as e:
             return {"ok": False, "error": str(e)}
+
+    @router.get("/_debug/hashing")
+    def debug_hashing():
+        # Métricas del pool de bcrypt (cola, rechazos por saturación)
+        return hashing_stats()
+
+    @router.get("/_debug/revocation")
+    def debug_revocation():
+        # Estado del Bloom/set exacto de sesiones revocadas
+        return revocation_stats(settings)
     return router
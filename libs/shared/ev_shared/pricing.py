@@ -0,0 +1,179 @@
+"""
+ev_shared.pricing
+-----------------
+Línea de tiempo de precios por opción (ev_catalogo.precio_servicio) y por paquete, para
+resolver el precio vigente en cualquier fecha sin volver a evaluar CURRENT_DATE() en una vista.
+- PriceTimeline: intervalos [vigente_desde, vigente_hasta] (hasta inclusivo, NULL = abierto)
+  aplanados al construir en segmentos disjuntos ordenados; at(fecha) es un bisect, O(log n).
+  Si dos precios se solapan gana el de vigente_desde más reciente; los huecos quedan en None.
+- PriceIndex: timeline por clave con lookup puntual y por lote (pares (clave, fecha)).
+- Paquete = suma de cantidad * precio de sus ítems con precio en esa fecha (mismas reglas que
+  v_paquete_precio_vigente_total); su timeline se arma sobre la unión de cortes de sus opciones.
+- load_option_index / load_package_index: lectura de solo las opciones activas (o de `ids`);
+  load_option_prices devuelve las filas sin indexar, para construir el índice fuera del event loop.
+Synopsis: created by emeday 2025
+"""
+from bisect import bisect_right
+from datetime import date, timedelta
+from decimal import Decimal
+from heapq import heappop, heappush
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import bindparam, text
+
+Price = Tuple[str, Decimal]                          # (moneda, monto)
+Interval = Tuple[date, Optional[date], Price]        # (vigente_desde, vigente_hasta, precio)
+PackageItems = Dict[str, List[Tuple[str, int]]]     # paquete_id -> [(opcion_servicio_id, cantidad)]
+
+_ONE_DAY = timedelta(days=1)
+
+class PriceTimeline:
+    __slots__ = ("starts", "values")
+
+    def __init__(self, intervals: Iterable[Interval] = ()):
+        ivs = sorted(intervals, key=lambda iv: iv[0])
+        cuts = {iv[0] for iv in ivs}
+        cuts.update(iv[1] + _ONE_DAY for iv in ivs if iv[1] is not None and iv[1] < date.max)
+        heap: List[Tuple[int, int, Optional[date], Price]] = []
+        starts: List[date] = []
+        values: List[Optional[Price]] = []
+        i = 0
+        for cut in sorted(cuts):
+            while i < len(ivs) and ivs[i][0] <= cut:
+                start, end, price = ivs[i]
+                heappush(heap, (-start.toordinal(), -i, end, price))
+                i += 1
+            # el tope es el de inicio más reciente; los vencidos bajo él no importan
+            while heap and heap[0][2] is not None and heap[0][2] < cut:
+                heappop(heap)
+            value = heap[0][3] if heap else None
+            if values and values[-1] == value:
+                continue
+            starts.append(cut)
+            values.append(value)
+        self.starts = starts
+        self.values = values
+
+    @classmethod
+    def from_segments(cls, starts: List[date], values: List[Optional[Price]]) -> "PriceTimeline":
+        tl = cls()
+        tl.starts = starts
+        tl.values = values
+        return tl
+
+    def at(self, fecha: date) -> Optional[Price]:
+        idx = bisect_right(self.starts, fecha) - 1
+        return self.values[idx] if idx >= 0 else None
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+class PriceIndex:
+    def __init__(self, timelines: Optional[Dict[str, PriceTimeline]] = None):
+        self.timelines: Dict[str, PriceTimeline] = timelines or {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], key: str = "opcion_servicio_id") -> "PriceIndex":
+        """Filas con key, moneda, monto, vigente_desde, vigente_hasta"""
+        grouped: Dict[str, List[Interval]] = {}
+        for r in rows:
+            grouped.setdefault(str(r[key]), []).append(
+                (r["vigente_desde"], r["vigente_hasta"], (r["moneda"], r["monto"])))
+        return cls({k: PriceTimeline(ivs) for k, ivs in grouped.items()})
+
+    def price_at(self, key: str, fecha: date) -> Optional[Price]:
+        tl = self.timelines.get(str(key))
+        return tl.at(fecha) if tl is not None else None
+
+    def prices_at(self, pairs: Iterable[Tuple[str, date]]) -> List[Optional[Price]]:
+        """Precio por cada (clave, fecha), en el mismo orden"""
+        get = self.timelines.get
+        out: List[Optional[Price]] = []
+        for key, fecha in pairs:
+            tl = get(str(key))
+            out.append(tl.at(fecha) if tl is not None else None)
+        return out
+
+    def __contains__(self, key: str) -> bool:
+        return str(key) in self.timelines
+
+    def __len__(self) -> int:
+        return len(self.timelines)
+
+def package_total(items: Sequence[Tuple[str, int]], options: PriceIndex, fecha: date) -> Optional[Price]:
+    """(moneda, total) en `fecha`; None si ningún ítem tiene precio"""
+    priced = [(cant, p) for (op, cant), p in zip(items, options.prices_at((op, fecha) for op, _ in items))
+              if p is not None]
+    if not priced:
+        return None
+    return min(p[0] for _, p in priced), sum((cant * p[1] for cant, p in priced), Decimal("0"))
+
+def package_timeline(items: Sequence[Tuple[str, int]], options: PriceIndex) -> PriceTimeline:
+    cuts = sorted({c for op, _ in items if op in options for c in options.timelines[str(op)].starts})
+    starts: List[date] = []
+    values: List[Optional[Price]] = []
+    for cut in cuts:
+        value = package_total(items, options, cut)
+        if values and values[-1] == value:
+            continue
+        starts.append(cut)
+        values.append(value)
+    return PriceTimeline.from_segments(starts, values)
+
+def build_package_index(items_by_pkg: PackageItems, options: PriceIndex) -> PriceIndex:
+    return PriceIndex({pid: package_timeline(items, options) for pid, items in items_by_pkg.items()})
+
+# ---- Carga desde la BD (sesión async) ----
+
+_OPTION_PRICES_SQL = """
+    SELECT p.opcion_servicio_id, p.moneda, p.monto, p.vigente_desde, p.vigente_hasta
+      FROM ev_catalogo.precio_servicio p
+      JOIN ev_catalogo.opcion_servicio o
+        ON o.id = p.opcion_servicio_id AND o.is_deleted = 0 AND o.status = 1
+"""
+
+_PACKAGE_ITEMS_SQL = """
+    SELECT ip.paquete_id, ip.opcion_servicio_id, ip.cantidad
+      FROM ev_paquetes.item_paquete ip
+      JOIN ev_paquetes.paquete pk
+        ON pk.id = ip.paquete_id AND pk.is_deleted = 0 AND pk.status = 1
+      JOIN ev_catalogo.opcion_servicio o
+        ON o.id = ip.opcion_servicio_id AND o.is_deleted = 0 AND o.status = 1
+"""
+
+async def load_option_prices(s, ids: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """Filas de precio de las opciones activas (o solo de `ids`, vía uq_precio_op_ini), sin indexar"""
+    if ids is None:
+        stmt = text(_OPTION_PRICES_SQL)
+        params: Dict[str, Any] = {}
+    else:
+        if not ids:
+            return []
+        stmt = text(_OPTION_PRICES_SQL + " WHERE p.opcion_servicio_id IN :ids").bindparams(
+            bindparam("ids", expanding=True))
+        params = {"ids": list(dict.fromkeys(ids))}
+    return [dict(r) for r in (await s.execute(stmt, params)).mappings().all()]
+
+async def load_option_index(s, ids: Optional[Sequence[str]] = None) -> PriceIndex:
+    """Historia completa de precios de las opciones activas (o solo de `ids`)"""
+    return PriceIndex.from_rows(await load_option_prices(s, ids))
+
+async def load_package_items(s, ids: Optional[Sequence[str]] = None) -> PackageItems:
+    if ids is None:
+        stmt = text(_PACKAGE_ITEMS_SQL + " ORDER BY ip.paquete_id, ip.id")
+        params: Dict[str, Any] = {}
+    else:
+        stmt = text(_PACKAGE_ITEMS_SQL + " WHERE ip.paquete_id IN :ids ORDER BY ip.paquete_id, ip.id").bindparams(
+            bindparam("ids", expanding=True))
+        params = {"ids": list(dict.fromkeys(ids))}
+    items: PackageItems = {}
+    for r in (await s.execute(stmt, params)).all():
+        items.setdefault(str(r[0]), []).append((str(r[1]), int(r[2])))
+    return items
+
+async def load_package_index(s, ids: Optional[Sequence[str]] = None) -> PriceIndex:
+    """Timeline de total por paquete activo (o solo de `ids`) a partir de sus ítems"""
+    items = await load_package_items(s, ids)
+    if not items:
+        return PriceIndex()
+    options = await load_option_index(s, None if ids is None else [op for its in items.values() for op, _ in its])
+    return build_package_index(items, options)
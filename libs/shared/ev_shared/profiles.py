@@ -0,0 +1,130 @@
+"""
+ev_shared.profiles
+------------------
+Perfiles mínimos de usuario (id, email, nombre) para enriquecer listados sin JOIN a ev_iam.
+- Fuente según PROFILE_SOURCE: "http(s)://host:8010/iam" (por defecto) usa
+  GET {base}/internal/users/profiles?ids=... de IAM con X-Internal-Key; "db" lee ev_iam.usuario
+  (una consulta por PK IN) y requiere SELECT sobre ese esquema.
+- Cache LRU + TTL por id (PROFILE_CACHE_SIZE / PROFILE_CACHE_TTL), incluidos los ids
+  inexistentes (negativo); los faltantes se piden de a PROFILE_BATCH_MAX ids por llamada.
+- attach_profiles(): completa filas con cliente_email / cliente_nombre en una sola llamada.
+  Si la fuente falla (IAM caído, 503 sin INTERNAL_API_KEY, JSON inválido) se loguea y las filas
+  salen con esos campos en None; no se cachea nada del fallo.
+Synopsis: created by emeday 2025
+"""
+import asyncio
+import json
+import threading
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import bindparam, text
+from .cache import TTLCache
+from .config import Settings
+from .db import session_scope
+from .logger import get_logger
+
+log = get_logger(__name__)
+
+Profile = Dict[str, Any]
+
+PROFILES_SQL = text("""
+    SELECT id, email, nombre
+      FROM ev_iam.usuario
+     WHERE id IN :ids
+       AND is_deleted = 0
+""").bindparams(bindparam("ids", expanding=True))
+
+class SqlProfileSource:
+    """Lectura directa de ev_iam.usuario (IAM, o servicios con acceso al esquema)"""
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+
+    def fetch(self, ids: Sequence[str]) -> Dict[str, Profile]:
+        with session_scope(self.settings, readonly=True) as s:
+            rows = s.execute(PROFILES_SQL, {"ids": list(ids)}).mappings().all()
+        return {str(r["id"]): {"id": str(r["id"]), "email": r["email"], "nombre": r["nombre"]} for r in rows}
+
+class HttpProfileSource:
+    """Endpoint interno de IAM: GET {base}/internal/users/profiles?ids=a,b,c"""
+
+    def __init__(self, base_url: str, timeout: float, api_key: str = ""):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.api_key = api_key
+
+    def fetch(self, ids: Sequence[str]) -> Dict[str, Profile]:
+        url = f"{self.base_url}/internal/users/profiles?" + urllib.parse.urlencode({"ids": ",".join(ids)})
+        req = urllib.request.Request(url, headers={"X-Internal-Key": self.api_key} if self.api_key else {})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            data = json.loads(resp.read().decode("utf-8"))
+        return {p["id"]: p for p in data["profiles"]}
+
+class ProfileClient:
+    def __init__(self, source, cache_size: int, ttl: float, batch_max: int):
+        self.source = source
+        self.cache = TTLCache(cache_size, ttl)
+        self.batch_max = batch_max
+
+    def _load(self, found: Dict[str, Optional[Profile]], missing: List[str]) -> Dict[str, Optional[Profile]]:
+        for start in range(0, len(missing), self.batch_max):
+            chunk = missing[start:start + self.batch_max]
+            gen = self.cache.generation
+            loaded = self.source.fetch(chunk)
+            for uid in chunk:
+                profile = loaded.get(uid)
+                self.cache.put(uid, profile, gen=gen)
+                found[uid] = profile
+        return found
+
+    def get_many(self, ids: Iterable[Any]) -> Dict[str, Optional[Profile]]:
+        """Perfil por id (None si no existe o está eliminado)"""
+        found, missing = self.cache.get_many(dict.fromkeys(str(i) for i in ids if i))
+        return self._load(found, missing) if missing else found
+
+    async def get_many_async(self, ids: Iterable[Any]) -> Dict[str, Optional[Profile]]:
+        found, missing = self.cache.get_many(dict.fromkeys(str(i) for i in ids if i))
+        if not missing:
+            return found  # todo en cache: sin saltar a un hilo
+        return await asyncio.to_thread(self._load, found, missing)
+
+    def invalidate(self, user_id: str) -> None:
+        self.cache.invalidate(str(user_id))
+
+_client: Optional[ProfileClient] = None
+_client_lock = threading.Lock()
+
+def build_profile_source(settings: Settings):
+    src = (settings.PROFILE_SOURCE or "").strip()
+    if src == "db":
+        return SqlProfileSource(settings)
+    if src.startswith(("http://", "https://")):
+        return HttpProfileSource(src, settings.PROFILE_HTTP_TIMEOUT, settings.INTERNAL_API_KEY)
+    raise RuntimeError(f"PROFILE_SOURCE inválido: {src!r} (db | http(s)://...)")
+
+def get_profile_client(settings: Settings) -> ProfileClient:
+    """Cliente del proceso, creado en el primer uso"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ProfileClient(build_profile_source(settings), settings.PROFILE_CACHE_SIZE,
+                                        settings.PROFILE_CACHE_TTL, settings.PROFILE_BATCH_MAX)
+    return _client
+
+async def attach_profiles(settings: Settings, rows: List[Dict[str, Any]], id_key: str = "cliente_id",
+                          fields: Tuple[Tuple[str, str], ...] = (("email", "cliente_email"),
+                                                                 ("nombre", "cliente_nombre"))) -> List[Dict[str, Any]]:
+    """Agrega a cada fila los campos del perfil de `row[id_key]` (None si no hay perfil o la fuente falla)"""
+    try:
+        profiles = await get_profile_client(settings).get_many_async(r.get(id_key) for r in rows)
+    except (OSError, ValueError, LookupError) as e:
+        # el perfil es decorativo: la respuesta sale igual, sin email/nombre del cliente
+        log.warning("Perfiles no disponibles (%s): %s", settings.PROFILE_SOURCE, e)
+        profiles = {}
+    for row in rows:
+        profile = profiles.get(str(row.get(id_key))) or {}
+        for src, dst in fields:
+            row[dst] = profile.get(src)
+    return rows
@@ -0,0 +1,184 @@
+"""
+ev_shared.retention
+-------------------
+Retención de tablas que solo crecen (ev_iam.evento_audit, login_intento, sesion).
+- Política por tabla en RETENTION_POLICIES: "tabla:columna:días[:archive]" separadas por coma.
+  Se borran las filas con `columna` < ahora - días; días = 0 desactiva la tabla.
+- Recorre la PK en orden, en chunks de RETENTION_CHUNK_SIZE (FORCE INDEX PRIMARY, cada chunk
+  en su propia transacción) con RETENTION_SLEEP_MS entre chunks: locks cortos y un flujo
+  parejo hacia las réplicas, en lugar de un DELETE masivo.
+- ":archive" (y RETENTION_ARCHIVE_DIR) escribe antes las filas en NDJSON gzip
+  ({tabla}-{fecha}.ndjson.gz); si el DELETE falla, el chunk se vuelve a archivar en la
+  siguiente corrida (at-least-once).
+- Un GET_LOCK por tabla evita que dos procesos (workers, CLI) purguen la misma tabla a la vez.
+- RetentionJob: corrida periódica cada RETENTION_INTERVAL_SECONDS; CLI: tools/retention.py.
+Synopsis: created by emeday 2025
+"""
+import asyncio
+import gzip
+import json
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import bindparam, text
+from .config import Settings
+from .db import async_session_scope
+from .logger import get_logger
+
+log = get_logger(__name__)
+
+_IDENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$")
+
+class RetentionPolicy:
+    def __init__(self, table: str, column: str, days: int, archive: bool = False, pk: str = "id"):
+        for ident in (table, column, pk):
+            if not _IDENT.match(ident):
+                raise ValueError(f"Identificador inválido en política de retención: {ident!r}")
+        self.table = table
+        self.column = column
+        self.days = days
+        self.archive = archive
+        self.pk = pk
+
+    def __repr__(self) -> str:
+        return f"{self.table}:{self.column}:{self.days}{':archive' if self.archive else ''}"
+
+def parse_policies(spec: str) -> List[RetentionPolicy]:
+    """'ev_iam.login_intento:created_at:90,ev_iam.evento_audit:fecha_hora:365:archive'"""
+    policies = []
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        parts = item.split(":")
+        if len(parts) not in (3, 4) or (len(parts) == 4 and parts[3] != "archive"):
+            raise ValueError(f"Política de retención inválida: {item!r}")
+        policies.append(RetentionPolicy(parts[0], parts[1], int(parts[2]), archive=len(parts) == 4))
+    return policies
+
+def _archive_path(directory: str, table: str, started: datetime) -> str:
+    return os.path.join(directory, f"{table}-{started:%Y%m%d-%H%M%S}.ndjson.gz")
+
+def _write_archive(path: str, rows: List[Dict[str, Any]]) -> None:
+    with gzip.open(path, "at", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+
+async def purge(settings: Settings, policy: RetentionPolicy, dry_run: bool = False) -> Dict[str, Any]:
+    """Aplica una política; retorna el reporte (filas, chunks, segundos, filas/seg)"""
+    started = datetime.now()
+    cutoff = started.replace(microsecond=0) - timedelta(days=policy.days)
+    report: Dict[str, Any] = {"policy": repr(policy), "cutoff": cutoff.isoformat(sep=" "),
+                              "deleted": 0, "archived": 0, "chunks": 0, "skipped": None}
+    t0 = time.perf_counter()
+    archive_dir = settings.RETENTION_ARCHIVE_DIR if policy.archive else ""
+    if policy.archive and not archive_dir:
+        report["skipped"] = "archive sin RETENTION_ARCHIVE_DIR"
+        return report
+    if archive_dir and not dry_run:
+        os.makedirs(archive_dir, exist_ok=True)
+    archive_path = _archive_path(archive_dir, policy.table, started) if archive_dir else None
+
+    pick = text(f"""
+        SELECT {policy.pk} FROM {policy.table} FORCE INDEX (PRIMARY)
+         WHERE {policy.pk} > :last AND {policy.column} < :cutoff
+         ORDER BY {policy.pk}
+         LIMIT :n
+    """)
+    load = text(f"SELECT * FROM {policy.table} WHERE {policy.pk} IN :ids").bindparams(
+        bindparam("ids", expanding=True))
+    delete = text(f"DELETE FROM {policy.table} WHERE {policy.pk} IN :ids AND {policy.column} < :cutoff").bindparams(
+        bindparam("ids", expanding=True))
+    lock_name = f"ev_retention:{policy.table}"
+
+    async with async_session_scope(settings) as lock_s:
+        if not (await lock_s.execute(text("SELECT GET_LOCK(:k, 0)"), {"k": lock_name})).scalar():
+            report["skipped"] = "en curso en otro proceso"
+            return report
+        try:
+            last = ""
+            while True:
+                async with async_session_scope(settings) as s:
+                    ids = [r[0] for r in (await s.execute(
+                        pick, {"last": last, "cutoff": cutoff, "n": settings.RETENTION_CHUNK_SIZE})).all()]
+                    if not ids:
+                        break
+                    last = ids[-1]
+                    if dry_run:
+                        report["deleted"] += len(ids)
+                    else:
+                        if archive_path:
+                            rows = [dict(r) for r in (await s.execute(load, {"ids": ids})).mappings().all()]
+                            await asyncio.to_thread(_write_archive, archive_path, rows)
+                            report["archived"] += len(rows)
+                        res = await s.execute(delete, {"ids": ids, "cutoff": cutoff})
+                        report["deleted"] += res.rowcount or 0
+                report["chunks"] += 1
+                if len(ids) < settings.RETENTION_CHUNK_SIZE:
+                    break
+                if settings.RETENTION_SLEEP_MS and not dry_run:
+                    await asyncio.sleep(settings.RETENTION_SLEEP_MS / 1000)
+        finally:
+            await lock_s.execute(text("SELECT RELEASE_LOCK(:k)"), {"k": lock_name})
+
+    elapsed = time.perf_counter() - t0
+    report["seconds"] = round(elapsed, 2)
+    report["rows_per_sec"] = round(report["deleted"] / elapsed, 1) if elapsed > 0 else 0.0
+    if archive_path and report["archived"]:
+        report["archive"] = archive_path
+    return report
+
+async def run_retention(settings: Settings, dry_run: bool = False,
+                        tables: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Corre todas las políticas activas (o solo `tables`) en secuencia"""
+    reports = []
+    for policy in parse_policies(settings.RETENTION_POLICIES):
+        if policy.days <= 0 or (tables and policy.table not in tables):
+            continue
+        try:
+            report = await purge(settings, policy, dry_run=dry_run)
+        except Exception as e:
+            log.exception("Retención %s: fallo", policy)
+            report = {"policy": repr(policy), "error": str(e)}
+        log.info("Retención %s: %s", policy, report)
+        reports.append(report)
+    return reports
+
+class RetentionJob:
+    """Corrida periódica en el event loop del servicio"""
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.interval = settings.RETENTION_INTERVAL_SECONDS
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[str] = None
+        self.last_reports: List[Dict[str, Any]] = []
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.last_reports = await run_retention(self.settings)
+            self.last_run = datetime.now().isoformat(sep=" ", timespec="seconds")
+
+    async def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval,
+            "policies": self.settings.RETENTION_POLICIES,
+            "last_run": self.last_run,
+            "last_reports": self.last_reports,
+        }
@@ -0,0 +1,145 @@
+"""
+ev_shared.security.auth
+-----------------------
+Verificación de JWT compartida por todos los servicios.
+- Cache LRU acotado de claims ya verificados, con clave = sha256(alg, secreto, token):
+  cada entrada vence en el `exp` del token (o JWT_CLAIMS_CACHE_TTL si es antes).
+- Los claims del request quedan en request.state.jwt_claims: un request nunca verifica dos veces.
+- Tokens con `sid` se chequean contra la lista de revocaciones en memoria (ev_shared.security.revocation),
+  también cuando vienen del cache.
+- Dependencias FastAPI: get_token_claims (claims crudos) y get_current_user ({id, email, role}).
+Synopsis: created by emeday 2025
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+from fastapi import Depends, HTTPException, Request, Security, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from jose import jwt, JWTError
+from ..config import Settings, get_settings
+from .revocation import get_revocation_list
+
+# auto_error=True: si falta el header, 403 antes de llegar a la dependencia
+bearer_scheme = HTTPBearer(auto_error=True)
+
+class ClaimsCache:
+    """LRU de claims verificados; thread-safe y con vencimiento por entrada"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, claims = item
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def put(self, key: bytes, claims: Dict[str, Any], expires_at: float) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (expires_at, claims)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+_cache: Optional[ClaimsCache] = None
+
+def claims_cache(settings: Settings) -> ClaimsCache:
+    """Cache del proceso; se recrea si cambia JWT_CLAIMS_CACHE_SIZE (p. ej. tras reload_settings)"""
+    global _cache
+    cache = _cache
+    if cache is None or cache.maxsize != settings.JWT_CLAIMS_CACHE_SIZE:
+        cache = _cache = ClaimsCache(settings.JWT_CLAIMS_CACHE_SIZE)
+    return cache
+
+def _jwt_conf(settings: Settings) -> Tuple[str, str]:
+    secret = getattr(settings, "JWT_SECRET", None)
+    if not secret:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="JWT_SECRET no configurado")
+    algorithm = getattr(settings, "JWT_ALG", getattr(settings, "JWT_ALGORITHM", "HS256"))
+    return secret, algorithm
+
+def decode_token(settings: Settings, token: str) -> Dict[str, Any]:
+    """
+    Verifica firma y expiración (python-jose) pasando por el cache de claims, y que la sesión
+    (claim sid) no esté revocada. Lanza 401 si el token no es válido.
+    Devuelve una copia: el llamador puede modificarla.
+    """
+    secret, algorithm = _jwt_conf(settings)
+    key = hashlib.sha256(f"{algorithm}\0{secret}\0{token}".encode()).digest()
+    now = time.time()
+    cache = claims_cache(settings)
+    claims = cache.get(key, now)
+    if claims is None:
+        try:
+            claims = jwt.decode(token, secret, algorithms=[algorithm])
+        except JWTError:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido o expirado")
+        expires_at = now + settings.JWT_CLAIMS_CACHE_TTL
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        cache.put(key, claims, expires_at)
+    sid = claims.get("sid")
+    if sid:
+        revocations = get_revocation_list(settings)
+        if revocations is not None and revocations.is_revoked(str(sid)):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revocado")
+    return dict(claims)
+
+def request_claims(request: Request, settings: Settings, token: str) -> Dict[str, Any]:
+    """Claims del token del request, verificados a lo sumo una vez por request"""
+    claims = getattr(request.state, "jwt_claims", None)
+    if claims is None:
+        claims = decode_token(settings, token)
+        request.state.jwt_claims = claims
+    return claims
+
+def require_claims(claims: Dict[str, Any], names: Iterable[str]) -> Dict[str, Any]:
+    """401 si falta alguno de los claims indicados"""
+    if any(n not in claims for n in names):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido (claims)")
+    return claims
+
+def get_token_claims(
+    request: Request,
+    creds: HTTPAuthorizationCredentials = Security(bearer_scheme),
+    settings: Settings = Depends(get_settings),
+) -> Dict[str, Any]:
+    """Dependencia: claims verificados del Bearer token"""
+    return request_claims(request, settings, creds.credentials)
+
+def to_user(claims: Dict[str, Any]) -> Dict[str, Any]:
+    """Forma homogénea del usuario autenticado: {id, email, role}"""
+    return {
+        "id": claims.get("sub"),
+        "email": claims.get("username"),
+        "role": claims.get("role"),
+    }
+
+def get_current_user(claims: Dict[str, Any] = Depends(get_token_claims)) -> Dict[str, Any]:
+    """Dependencia: usuario autenticado {id, email, role}"""
+    return to_user(claims)
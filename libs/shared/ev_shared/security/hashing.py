@@ -0,0 +1,139 @@
+"""
+ev_shared.security.hashing
+--------------------------
+Executor dedicado para bcrypt (verify/hash) fuera del event loop y del threadpool de Starlette.
+- bcrypt libera el GIL, así que basta un ThreadPoolExecutor propio de HASH_POOL_WORKERS hilos.
+- Cola acotada (HASH_POOL_MAX_QUEUE): si está llena, HashingPoolSaturated al instante
+  (los servicios lo devuelven como 503 + Retry-After) en lugar de encolar sin límite.
+- stats(): profundidad de cola, en curso, rechazos y espera promedio (ver /_debug/hashing).
+- configure_password_cost(): rounds de bcrypt desde Settings (fijo o calibrado) al arranque.
+Synopsis: created by emeday 2025
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from ..config import Settings, get_settings
+from .passwords import verify_password, hash_password, calibrate_rounds, configure_rounds, current_rounds
+
+class HashingPoolSaturated(Exception):
+    """La cola del pool de hashing está llena; el request debe reintentarse más tarde"""
+
+class HashingPool:
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ev-hash")
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_depth_seen = 0
+        self._wait_avg_ms = 0.0
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._inflight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HashingPoolSaturated()
+            self._inflight += 1
+            self.submitted += 1
+            self.max_depth_seen = max(self.max_depth_seen, self._inflight - self.workers)
+
+    def _timed(self, enqueued_at: float, fn: Callable[..., Any], *args) -> Any:
+        wait_ms = (time.perf_counter() - enqueued_at) * 1000
+        with self._lock:
+            # promedio móvil exponencial de la espera en cola
+            self._wait_avg_ms += 0.1 * (wait_ms - self._wait_avg_ms)
+        return fn(*args)
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._inflight -= 1
+            self.completed += 1
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        self._admit()
+        try:
+            future = self._executor.submit(self._timed, time.perf_counter(), fn, *args)
+        except RuntimeError:
+            self._release()
+            raise
+        # se libera el cupo cuando el hilo termina (o la tarea se cancela antes de empezar),
+        # no cuando el request deja de esperar
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._inflight,
+                "queue_depth": max(0, self._inflight - self.workers),
+                "max_queue_depth_seen": self.max_depth_seen,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self._wait_avg_ms, 2),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+_pool: Optional[HashingPool] = None
+_pool_lock = threading.Lock()
+
+def get_hashing_pool(settings: Settings) -> HashingPool:
+    """Pool del proceso, creado en el primer uso"""
+    global _pool
+    pool = _pool
+    if pool is not None:
+        return pool
+    with _pool_lock:
+        if _pool is None:
+            workers = settings.HASH_POOL_WORKERS or min(4, os.cpu_count() or 1)
+            _pool = HashingPool(workers, settings.HASH_POOL_MAX_QUEUE)
+        return _pool
+
+def shutdown_hashing_pool() -> None:
+    """Detiene el pool (usar en shutdown)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+def hashing_stats() -> Dict[str, Any]:
+    stats = _pool.stats() if _pool is not None else {"workers": 0, "in_flight": 0, "queue_depth": 0}
+    stats["bcrypt_rounds"] = current_rounds()
+    return stats
+
+def configure_password_cost(settings: Settings) -> int:
+    """Aplica BCRYPT_ROUNDS o, si es 0, calibra para BCRYPT_TARGET_MS. Llamar una vez en startup."""
+    rounds = settings.BCRYPT_ROUNDS or calibrate_rounds(
+        settings.BCRYPT_TARGET_MS, settings.BCRYPT_MIN_ROUNDS, settings.BCRYPT_MAX_ROUNDS
+    )
+    configure_rounds(rounds)
+    return rounds
+
+async def hashing_saturated_handler(request: Request, exc: HashingPoolSaturated) -> JSONResponse:
+    """Exception handler FastAPI: 503 inmediato cuando el pool está saturado"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Servicio ocupado, reintente en unos segundos"},
+        headers={"Retry-After": str(get_settings().HASH_POOL_RETRY_AFTER)},
+    )
+
+async def verify_password_async(settings: Settings, plain: str, stored_hash: str) -> bool:
+    """verify_password en el pool de hashing; lanza HashingPoolSaturated si la cola está llena"""
+    return await get_hashing_pool(settings).run(verify_password, plain, stored_hash)
+
+async def hash_password_async(settings: Settings, plain: str) -> str:
+    """hash_password en el pool de hashing; lanza HashingPoolSaturated si la cola está llena"""
+    return await get_hashing_pool(settings).run(hash_password, plain)
@@ -5,18 +5,48 @@ ev_shared.security.passwords
 Hash y verificación de contraseñas usando bcrypt_sha256.
 - Permite contraseñas largas (evita límite 72 bytes de bcrypt puro)
 - Soporta hashes legacy bcrypt ($2a/$2b/$2y$) y rehash a bcrypt_sha256
+- Costo (rounds) configurable o calibrado al arranque: calibrate_rounds / configure_rounds;
+  needs_rehash() marca los hashes con menos rounds que el configurado
 Synopsis: created by emeday 2025
 """
+import time
 from passlib.hash import bcrypt_sha256, bcrypt
 
+# Hasher vigente; configure_rounds() lo reemplaza (por defecto, rounds de passlib)
+_hasher = bcrypt_sha256
+
 def is_bcrypt(hash_: str) -> bool:
     return hash_.startswith("$2a$") or hash_.startswith("$2b$") or hash_.startswith("$2y$")
 
 def is_bcrypt_sha256(hash_: str) -> bool:
     return hash_.startswith("$bcrypt-sha256$")
 
+def configure_rounds(rounds: int) -> None:
+    """Fija el costo para hashes nuevos; los existentes con menos rounds pasan a needs_rehash"""
+    global _hasher
+    _hasher = bcrypt_sha256.using(default_rounds=rounds, min_desired_rounds=rounds)
+
+def current_rounds() -> int:
+    return _hasher.default_rounds
+
+def calibrate_rounds(target_ms: float, min_rounds: int = 10, max_rounds: int = 14, samples: int = 3) -> int:
+    """
+    Mayor costo cuyo verify estimado no supera `target_ms` en este host.
+    Mide a `min_rounds` (mejor de `samples`) y extrapola: cada round duplica el tiempo.
+    """
+    probe = bcrypt_sha256.using(rounds=min_rounds).hash("calibracion")
+    best_ms = float("inf")
+    for _ in range(samples):
+        t0 = time.perf_counter()
+        bcrypt_sha256.verify("calibracion", probe)
+        best_ms = min(best_ms, (time.perf_counter() - t0) * 1000)
+    rounds = min_rounds
+    while rounds < max_rounds and best_ms * 2 ** (rounds + 1 - min_rounds) <= target_ms:
+        rounds += 1
+    return rounds
+
 def hash_password(plain: str) -> str:
-    return bcrypt_sha256.hash(plain)
+    return _hasher.hash(plain)
 
 def verify_password(plain: str, stored_hash: str) -> bool:
     if not stored_hash:
@@ -35,5 +65,5 @@ def needs_rehash(stored_hash: str) -> bool:
     if is_bcrypt(stored_hash):
         return True
     if is_bcrypt_sha256(stored_hash):
-        return bcrypt_sha256.needs_update(stored_hash)
+        return _hasher.needs_update(stored_hash)
     return True
@@ -0,0 +1,66 @@
+"""
+ev_shared.security.permissions
+------------------------------
+Permisos como bits, compilados por IAM en el claim `perm` (int) al emitir el token.
+- Perm: catálogo de permisos. Los bits son estables: solo se agregan al final, nunca se reusan.
+- ROLE_PERMISSIONS: permisos por código de rol (en mayúsculas); un usuario con varios roles
+  recibe el OR de todos.
+- require_permission(...): dependencia FastAPI que autoriza con un AND de bits, sin BD ni IAM.
+  Tokens anteriores sin `perm` se evalúan compilando su claim `role`.
+Synopsis: created by emeday 2025
+"""
+from enum import IntFlag
+from typing import Any, Dict, Iterable, Optional
+from fastapi import Depends, HTTPException, status
+from .auth import get_token_claims, to_user
+
+class Perm(IntFlag):
+    USUARIOS_LEER = 1 << 0
+    USUARIOS_ESCRIBIR = 1 << 1
+    SESIONES_REVOCAR = 1 << 2
+    AUDITORIA_LEER = 1 << 3
+    PEDIDOS_GESTIONAR = 1 << 4      # estado e items de pedidos ajenos
+    PEDIDOS_ASIGNAR = 1 << 5        # asignar proveedor
+    CATALOGO_ESCRIBIR = 1 << 6
+    PROVEEDORES_ESCRIBIR = 1 << 7
+
+PERM_ALL = Perm(0)
+for _p in Perm:
+    PERM_ALL |= _p
+
+ROLE_PERMISSIONS: Dict[str, Perm] = {
+    "ADMIN": PERM_ALL,
+    "CLIENTE": Perm(0),
+}
+
+def compile_permissions(roles: Iterable[Optional[str]]) -> int:
+    """OR de los permisos de los roles indicados (códigos sin distinguir mayúsculas)"""
+    mask = Perm(0)
+    for role in roles:
+        mask |= ROLE_PERMISSIONS.get((role or "").upper(), Perm(0))
+    return int(mask)
+
+def claims_permissions(claims: Dict[str, Any]) -> int:
+    perm = claims.get("perm")
+    if isinstance(perm, int) and not isinstance(perm, bool):
+        return perm
+    return compile_permissions([claims.get("role")])
+
+def has_permission(claims: Dict[str, Any], required: int) -> bool:
+    return claims_permissions(claims) & required == required
+
+def require_permission(*perms: Perm):
+    """
+    Uso:
+      admin = Depends(require_permission(Perm.USUARIOS_ESCRIBIR))
+    Devuelve el usuario {id, email, role}; 403 si falta algún bit.
+    """
+    required = 0
+    for p in perms:
+        required |= int(p)
+
+    def guard(claims: Dict[str, Any] = Depends(get_token_claims)) -> Dict[str, Any]:
+        if not has_permission(claims, required):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Sin permisos")
+        return to_user(claims)
+    return guard
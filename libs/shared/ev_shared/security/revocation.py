@@ -0,0 +1,283 @@
+"""
+ev_shared.security.revocation
+-----------------------------
+Revocación de access tokens por sesión (claim `sid`) sin ida a la BD por request.
+- Fuente: ev_iam.sesion con status=0. IAM la lee directo (REVOCATION_SOURCE=db); los demás
+  servicios usan el feed de IAM por HTTP (REVOCATION_SOURCE=http://host:8010/iam).
+- En memoria: Bloom filter con las revocadas de la última foto completa + set exacto con las
+  que llegan después, leídas de forma incremental por el watermark de updated_at.
+- Un positivo del Bloom que no está en el set exacto se confirma contra la fuente (cacheado).
+- Solo cuentan las revocaciones de los últimos JWT_EXPIRES_MIN: un access token más viejo ya expiró.
+- Si la fuente no responde se sigue con el último estado conocido (fail-open) y se reintenta.
+Synopsis: created by emeday 2025
+"""
+import hashlib
+import json
+import math
+import threading
+import time
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, List, Optional, Protocol, Set, Tuple
+from sqlalchemy import text
+from ..cache import MISSING, TTLCache
+from ..config import Settings
+from ..db import session_scope
+from ..logger import get_logger
+
+log = get_logger(__name__)
+
+# seg. que se relee hacia atrás del watermark: cubre transacciones que commitean después de un poll
+# con un updated_at anterior al watermark (el feed se lee del primario, sin lag de réplica)
+_OVERLAP_SECONDS = 5
+
+class BloomFilter:
+    """Bloom filter sobre bytearray; k posiciones por doble hashing de un blake2b de 128 bits"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        m = math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.m = max(64, m)
+        self.k = max(1, round(self.m / self.capacity * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        d = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], "little")
+        h2 = int.from_bytes(d[8:], "little") | 1
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def add(self, item: str) -> None:
+        for p in self._positions(item):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+class RevocationSource(Protocol):
+    def revoked_since(self, since: Optional[str], horizon: int) -> Tuple[List[str], str]:
+        """(sids revocados, nuevo watermark); since=None = foto de los últimos `horizon` seg."""
+        ...
+
+    def is_revoked(self, sid: str) -> bool: ...
+
+class SqlRevocationSource:
+    """Lee ev_iam.sesion con la conexión del servicio (IAM o un usuario con SELECT sobre ev_iam.sesion)"""
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+
+    def revoked_since(self, since: Optional[str], horizon: int) -> Tuple[List[str], str]:
+        # primario: en una réplica con lag una revocación podría llegar detrás del watermark
+        # y quedar fuera hasta la próxima foto completa
+        with session_scope(self.settings) as s:
+            if since is None:
+                rows = s.execute(
+                    text("""
+                        SELECT id, updated_at FROM ev_iam.sesion
+                         WHERE status = 0
+                           AND updated_at >= NOW() - INTERVAL :h SECOND
+                    """),
+                    {"h": horizon}
+                ).all()
+            else:
+                rows = s.execute(
+                    text("""
+                        SELECT id, updated_at FROM ev_iam.sesion
+                         WHERE status = 0
+                           AND updated_at >= :since - INTERVAL :o SECOND
+                    """),
+                    {"since": since, "o": _OVERLAP_SECONDS}
+                ).all()
+            # watermark = mayor updated_at leído (no NOW()): nada posterior a lo visto queda atrás
+            if rows:
+                # el reintento del solape puede traer solo filas viejas: el watermark no retrocede
+                watermark = max(str(max(r[1] for r in rows)), since or "")
+            elif since is not None:
+                watermark = since
+            else:
+                watermark = str(s.execute(text("SELECT NOW()")).scalar())
+        return [str(r[0]) for r in rows], watermark
+
+    def is_revoked(self, sid: str) -> bool:
+        # primario: la confirmación no debe depender del lag de una réplica
+        with session_scope(self.settings) as s:
+            st = s.execute(
+                text("SELECT status FROM ev_iam.sesion WHERE id=:id LIMIT 1"), {"id": sid}
+            ).scalar()
+        return st is not None and int(st) == 0
+
+class HttpRevocationSource:
+    """Feed de IAM: GET {base}/internal/revocations y {base}/internal/revocations/{sid} (con X-Internal-Key)"""
+
+    def __init__(self, base_url: str, timeout: float, api_key: str = ""):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.api_key = api_key
+
+    def _get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        url = f"{self.base_url}{path}"
+        if params:
+            url += "?" + urllib.parse.urlencode({k: v for k, v in params.items() if v is not None})
+        req = urllib.request.Request(url, headers={"X-Internal-Key": self.api_key} if self.api_key else {})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+
+    def revoked_since(self, since: Optional[str], horizon: int) -> Tuple[List[str], str]:
+        data = self._get("/internal/revocations", {"since": since, "horizon": horizon})
+        return list(data["revoked"]), data["watermark"]
+
+    def is_revoked(self, sid: str) -> bool:
+        return bool(self._get(f"/internal/revocations/{urllib.parse.quote(sid)}")["revoked"])
+
+class RevocationList:
+    def __init__(self, source: RevocationSource, horizon: int, refresh_interval: float,
+                 rebuild_interval: float, capacity: int, error_rate: float, recent_max: int):
+        self.source = source
+        self.horizon = horizon
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.recent_max = recent_max
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._recent: Set[str] = set()
+        # respuestas exactas a positivos del Bloom; se vacía en cada foto completa
+        self._exact = TTLCache(10000, rebuild_interval)
+        self._watermark: Optional[str] = None
+        self._loaded = False
+        self._attempted = False
+        self._refresh_due = 0.0
+        self._rebuild_due = 0.0
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self.checks = 0
+        self.exact_checks = 0
+        self.revoked = 0
+        self.errors = 0
+
+    def _rebuild(self) -> None:
+        sids, watermark = self.source.revoked_since(None, self.horizon)
+        bloom = BloomFilter(max(self.capacity, 2 * len(sids)), self.error_rate)
+        for sid in sids:
+            bloom.add(sid)
+        # swap atómico: los lectores ven la foto vieja o la nueva completa
+        self._bloom, self._recent = bloom, set()
+        self._exact.clear()
+        self._watermark = watermark
+        self._rebuild_due = time.monotonic() + self.rebuild_interval
+
+    def _increment(self) -> None:
+        sids, watermark = self.source.revoked_since(self._watermark, self.horizon)
+        if sids:
+            self._recent = self._recent | set(sids)
+        self._watermark = watermark
+
+    def refresh(self) -> None:
+        """Foto completa si toca (o si el set exacto creció de más); si no, incremental"""
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._attempted = True
+            if not self._loaded or time.monotonic() >= self._rebuild_due or len(self._recent) > self.recent_max:
+                self._rebuild()
+            else:
+                self._increment()
+            self._loaded = True
+        except Exception as e:
+            self.errors += 1
+            log.warning("Revocaciones: no se pudo refrescar (%s); se usa el último estado", e)
+        finally:
+            self._refresh_due = time.monotonic() + self.refresh_interval
+            self._lock.release()
+
+    def _maybe_refresh(self) -> None:
+        if not self._attempted:
+            self.refresh()  # primera carga en línea, una sola vez por proceso
+            return
+        now = time.monotonic()
+        if now < self._refresh_due:
+            return
+        with self._state_lock:
+            if now < self._refresh_due:
+                return
+            self._refresh_due = now + self.refresh_interval
+        threading.Thread(target=self.refresh, name="revocation-refresh", daemon=True).start()
+
+    def is_revoked(self, sid: str) -> bool:
+        self._maybe_refresh()
+        self.checks += 1
+        if sid in self._recent:
+            self.revoked += 1
+            return True
+        if sid not in self._bloom:
+            return False
+        cached = self._exact.get(sid)
+        if cached is MISSING:
+            gen = self._exact.generation
+            self.exact_checks += 1
+            try:
+                cached = self.source.is_revoked(sid)
+            except Exception as e:
+                self.errors += 1
+                log.warning("Revocaciones: chequeo exacto falló (%s)", e)
+                return False
+            self._exact.put(sid, cached, gen=gen)
+        if cached:
+            self.revoked += 1
+        return cached
+
+    def stats(self) -> Dict[str, Any]:
+        bloom = self._bloom
+        return {
+            "loaded": self._loaded,
+            "watermark": self._watermark,
+            "bloom_items": bloom.count,
+            "bloom_bytes": len(bloom.bits),
+            "bloom_k": bloom.k,
+            "recent": len(self._recent),
+            "checks": self.checks,
+            "exact_checks": self.exact_checks,
+            "revoked": self.revoked,
+            "errors": self.errors,
+        }
+
+def build_source(settings: Settings) -> Optional[RevocationSource]:
+    src = (settings.REVOCATION_SOURCE or "").strip()
+    if not src:
+        return None
+    if src == "db":
+        return SqlRevocationSource(settings)
+    if src.startswith(("http://", "https://")):
+        return HttpRevocationSource(src, settings.REVOCATION_HTTP_TIMEOUT, settings.INTERNAL_API_KEY)
+    raise RuntimeError(f"REVOCATION_SOURCE inválido: {src!r} (vacío | db | http(s)://...)")
+
+_instance: Optional[RevocationList] = None
+_instance_lock = threading.Lock()
+
+def get_revocation_list(settings: Settings) -> Optional[RevocationList]:
+    """Lista del proceso; None si REVOCATION_SOURCE está vacío"""
+    global _instance
+    if _instance is None:
+        source = build_source(settings)
+        if source is None:
+            return None
+        with _instance_lock:
+            if _instance is None:
+                _instance = RevocationList(
+                    source,
+                    horizon=settings.JWT_EXPIRES_MIN * 60 + 60,
+                    refresh_interval=settings.REVOCATION_REFRESH_SECONDS,
+                    rebuild_interval=settings.REVOCATION_REBUILD_SECONDS,
+                    capacity=settings.REVOCATION_BLOOM_CAPACITY,
+                    error_rate=settings.REVOCATION_BLOOM_ERROR_RATE,
+                    recent_max=settings.REVOCATION_RECENT_MAX,
+                )
+    return _instance
+
+def revocation_stats(settings: Settings) -> Dict[str, Any]:
+    rl = get_revocation_list(settings)
+    return rl.stats() if rl else {"enabled": False}
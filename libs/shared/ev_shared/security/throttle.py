@@ -0,0 +1,237 @@
+"""
+ev_shared.security.throttle
+---------------------------
+Throttling de intentos de login por email y por IP, evaluado antes de bcrypt y de la BD.
+- Ventana deslizante de fallos por clave (LOGIN_THROTTLE_WINDOW).
+- Retardo progresivo: tras LOGIN_THROTTLE_FREE_FAILURES fallos, el siguiente intento debe esperar
+  base * 2^(n - libres) segundos desde el último fallo (tope LOGIN_THROTTLE_MAX_DELAY).
+- Bloqueo: al llegar a LOGIN_THROTTLE_MAX_FAILURES_EMAIL / _IP fallos en la ventana,
+  la clave queda bloqueada LOGIN_THROTTLE_LOCKOUT segundos.
+- check() reserva el intento (cuenta como fallo) antes de bcrypt: una ráfaga en paralelo
+  contra la misma clave ve las reservas de las demás y cae en el retardo. record_success()
+  libera la reserva; release() la descarta si el intento no llegó a verificarse (BD, pool).
+- client_ip(): IP del cliente para la clave por IP; detrás de un proxy de TRUSTED_PROXIES se
+  toma de X-Forwarded-For (la primera dirección no confiable desde la derecha). Un peer que es
+  proxy sin X-Forwarded-For utilizable no genera clave por IP (sería la del proxy para todos).
+- Backend en memoria (por proceso, acotado) o compartido vía Redis (LOGIN_THROTTLE_BACKEND=redis,
+  requiere `pip install redis`); ambos cumplen ThrottleBackend.
+Synopsis: created by emeday 2025
+"""
+import ipaddress
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Protocol, Sequence, Tuple, Union
+from ..config import Settings
+
+class LoginThrottled(Exception):
+    """Intento rechazado; retry_after en segundos"""
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.reason = reason
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+def _trusted(address: str, proxies: Sequence[Network]) -> Optional[bool]:
+    """True/False según TRUSTED_PROXIES; None si no es una IP"""
+    try:
+        ip = ipaddress.ip_address(address.strip())
+    except ValueError:
+        return None
+    return any(ip in net for net in proxies)
+
+def client_ip(peer: Optional[str], forwarded_for: Optional[str],
+              proxies: Sequence[Network]) -> Optional[str]:
+    """IP del cliente, o None si no se puede saber sin confiar en datos del propio cliente"""
+    if not peer or not _trusted(peer, proxies):
+        return peer
+    # cada proxy agrega a la derecha: se descartan los confiables y la primera restante es el cliente
+    for hop in reversed((forwarded_for or "").split(",")):
+        hop = hop.strip()
+        if not hop:
+            continue
+        trusted = _trusted(hop, proxies)
+        if trusted is None:
+            return None
+        if not trusted:
+            return str(ipaddress.ip_address(hop))
+    return None
+
+class ThrottleBackend(Protocol):
+    async def failures(self, key: str, window: int, now: float) -> Tuple[int, float]: ...
+    async def add_failure(self, key: str, window: int, now: float) -> int: ...
+    async def remove_failure(self, key: str, at: float) -> None: ...
+    async def reset(self, key: str) -> None: ...
+    async def lock(self, key: str, until: float) -> None: ...
+    async def locked_until(self, key: str, now: float) -> float: ...
+
+class MemoryThrottleBackend:
+    """Contadores en memoria del proceso; LRU acotado a `max_keys` claves"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._hits: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._locks: Dict[str, float] = {}
+
+    def _prune(self, key: str, window: int, now: float) -> Deque[float]:
+        hits = self._hits.get(key)
+        if hits is None:
+            return deque()
+        while hits and hits[0] <= now - window:
+            hits.popleft()
+        if not hits:
+            del self._hits[key]
+        return hits
+
+    async def failures(self, key: str, window: int, now: float) -> Tuple[int, float]:
+        hits = self._prune(key, window, now)
+        return len(hits), (hits[-1] if hits else 0.0)
+
+    async def add_failure(self, key: str, window: int, now: float) -> int:
+        hits = self._prune(key, window, now)
+        if key not in self._hits:
+            hits = self._hits[key] = deque()
+        hits.append(now)
+        self._hits.move_to_end(key)
+        while len(self._hits) > self.max_keys:
+            old, _ = self._hits.popitem(last=False)
+            self._locks.pop(old, None)
+        return len(hits)
+
+    async def remove_failure(self, key: str, at: float) -> None:
+        hits = self._hits.get(key)
+        if hits is not None and at in hits:
+            hits.remove(at)
+            if not hits:
+                del self._hits[key]
+
+    async def reset(self, key: str) -> None:
+        self._hits.pop(key, None)
+        self._locks.pop(key, None)
+
+    async def lock(self, key: str, until: float) -> None:
+        self._locks[key] = until
+
+    async def locked_until(self, key: str, now: float) -> float:
+        until = self._locks.get(key, 0.0)
+        if until and until <= now:
+            del self._locks[key]
+            return 0.0
+        return until
+
+class RedisThrottleBackend:
+    """Mismos contadores en Redis (sorted set por clave) para compartirlos entre procesos/nodos"""
+
+    def __init__(self, url: str, prefix: str = "ev:throttle:"):
+        try:
+            import redis.asyncio as aioredis
+        except ImportError as e:  # dependencia opcional
+            raise RuntimeError("LOGIN_THROTTLE_BACKEND=redis requiere el paquete 'redis'") from e
+        self._r = aioredis.from_url(url)
+        self.prefix = prefix
+
+    async def failures(self, key: str, window: int, now: float) -> Tuple[int, float]:
+        k = self.prefix + key
+        await self._r.zremrangebyscore(k, 0, now - window)
+        last = await self._r.zrange(k, -1, -1, withscores=True)
+        return (await self._r.zcard(k)), (last[0][1] if last else 0.0)
+
+    async def add_failure(self, key: str, window: int, now: float) -> int:
+        k = self.prefix + key
+        pipe = self._r.pipeline()
+        pipe.zadd(k, {repr(now): now})
+        pipe.zremrangebyscore(k, 0, now - window)
+        pipe.zcard(k)
+        pipe.expire(k, window)
+        res = await pipe.execute()
+        return int(res[2])
+
+    async def remove_failure(self, key: str, at: float) -> None:
+        await self._r.zrem(self.prefix + key, repr(at))
+
+    async def reset(self, key: str) -> None:
+        await self._r.delete(self.prefix + key, self.prefix + "lock:" + key)
+
+    async def lock(self, key: str, until: float) -> None:
+        ttl = max(1, int(until - time.time()))
+        await self._r.set(self.prefix + "lock:" + key, repr(until), ex=ttl)
+
+    async def locked_until(self, key: str, now: float) -> float:
+        v = await self._r.get(self.prefix + "lock:" + key)
+        return float(v) if v else 0.0
+
+class LoginThrottle:
+    def __init__(self, settings: Settings, backend: ThrottleBackend):
+        self.settings = settings
+        self.backend = backend
+        self.rejected = 0
+
+    def _keys(self, email: str, ip: Optional[str]):
+        s = self.settings
+        yield f"email:{(email or '').strip().lower()}", s.LOGIN_THROTTLE_MAX_FAILURES_EMAIL
+        if ip:
+            yield f"ip:{ip}", s.LOGIN_THROTTLE_MAX_FAILURES_IP
+
+    def _delay_for(self, failures: int) -> float:
+        s = self.settings
+        extra = failures - s.LOGIN_THROTTLE_FREE_FAILURES
+        if extra < 0:
+            return 0.0
+        return min(s.LOGIN_THROTTLE_BASE_DELAY * (2 ** extra), s.LOGIN_THROTTLE_MAX_DELAY)
+
+    async def check(self, email: str, ip: Optional[str]) -> float:
+        """
+        Lanza LoginThrottled si la clave está bloqueada o aún en retardo; si no, reserva el
+        intento en cada clave y retorna su marca (para record_success / release). Sin BD ni bcrypt.
+        """
+        now = time.time()
+        window = self.settings.LOGIN_THROTTLE_WINDOW
+        keys = list(self._keys(email, ip))
+        for key, _ in keys:
+            until = await self.backend.locked_until(key, now)
+            if until > now:
+                self.rejected += 1
+                raise LoginThrottled(int(until - now) + 1, "bloqueado")
+            count, last = await self.backend.failures(key, window, now)
+            wait = last + self._delay_for(count) - now if count else 0.0
+            if wait > 0:
+                self.rejected += 1
+                raise LoginThrottled(int(wait) + 1, "retardo")
+        for key, _ in keys:
+            await self.backend.add_failure(key, window, now)
+        return now
+
+    async def record_failure(self, email: str, ip: Optional[str]) -> None:
+        """La reserva de check() ya es el fallo; acá solo se decide el bloqueo"""
+        now = time.time()
+        s = self.settings
+        for key, limit in self._keys(email, ip):
+            count, _ = await self.backend.failures(key, s.LOGIN_THROTTLE_WINDOW, now)
+            if count >= limit:
+                await self.backend.lock(key, now + s.LOGIN_THROTTLE_LOCKOUT)
+
+    async def record_success(self, email: str, ip: Optional[str], attempt: float) -> None:
+        # el email se limpia entero; la IP solo pierde esta reserva (una IP compartida/NAT
+        # no se "limpia" con un login correcto)
+        keys = list(self._keys(email, ip))
+        await self.backend.reset(keys[0][0])
+        for key, _ in keys[1:]:
+            await self.backend.remove_failure(key, attempt)
+
+    async def release(self, email: str, ip: Optional[str], attempt: float) -> None:
+        """Descarta la reserva de un intento que no llegó a verificar credenciales"""
+        for key, _ in self._keys(email, ip):
+            await self.backend.remove_failure(key, attempt)
+
+_throttle: Optional[LoginThrottle] = None
+
+def get_login_throttle(settings: Settings) -> LoginThrottle:
+    """Throttle del proceso con el backend configurado"""
+    global _throttle
+    if _throttle is None:
+        if settings.LOGIN_THROTTLE_BACKEND == "redis":
+            backend: ThrottleBackend = RedisThrottleBackend(settings.LOGIN_THROTTLE_REDIS_URL)
+        else:
+            backend = MemoryThrottleBackend(settings.LOGIN_THROTTLE_MAX_KEYS)
+        _throttle = LoginThrottle(settings, backend)
+    return _throttle
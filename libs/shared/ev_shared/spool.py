@@ -0,0 +1,207 @@
+"""
+ev_shared.spool
+---------------
+Journal local (JSONL) + worker asíncrono para escrituras diferidas con entrega at-least-once.
+- append(): escribe la línea al journal (flush; fsync opcional con SPOOL_FSYNC) y la encola:
+  el request no espera a la BD.
+- Los eventos se aplican en lotes con `apply(events)` (debe ser idempotente) vía
+  ev_shared.batching.WriteBehindBuffer (tamaño/intervalo, memoria acotada, reintentos).
+- El journal rota en segmentos ({name}-{pid}-{n}.jsonl, cada uno con lock exclusivo): antes de
+  aplicar un lote se abre un segmento nuevo, y un segmento se borra cuando todos sus eventos
+  se aplicaron. Con tráfico sostenido el disco queda acotado a lo pendiente, sin esperar a
+  que la cola se vacíe.
+- Lo descartado por desborde de memoria queda fuera de la garantía (ver stats()["dropped"]);
+  lo no escrito al apagar sigue en su segmento y se reprocesa al arrancar.
+- Al arrancar se adoptan los segmentos sin lock (procesos caídos) y se reprocesan.
+Synopsis: created by emeday 2025
+"""
+import glob
+import json
+import os
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from .batching import WriteBehindBuffer
+from .logger import get_logger
+
+log = get_logger(__name__)
+
+Event = Dict[str, Any]
+
+def _try_lock(f) -> bool:
+    """Lock exclusivo no bloqueante sobre el archivo (liberado al cerrar o al morir el proceso)"""
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+def _read_events(f) -> List[Event]:
+    f.seek(0)
+    events = []
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            # línea truncada por una caída a mitad de escritura
+            log.warning("Spool: línea corrupta descartada en %s", getattr(f, "name", "?"))
+    return events
+
+class _Segment:
+    """Archivo del journal abierto y bloqueado, con cuántos de sus eventos faltan aplicar"""
+    __slots__ = ("seq", "path", "file", "pending")
+
+    def __init__(self, seq: int, path: str, file):
+        self.seq = seq
+        self.path = path
+        self.file = file
+        self.pending = 0
+
+class DurableSpool:
+    def __init__(self, directory: str, name: str, apply: Callable[[List[Event]], Awaitable[None]],
+                 fsync: bool = False, max_batch: int = 500, flush_interval: float = 1.0,
+                 max_pending: int = 10000, overflow: str = "drop_oldest"):
+        self.directory = directory
+        self.name = name
+        self.apply = apply
+        self.fsync = fsync
+        self.path: Optional[str] = None     # segmento activo
+        self._segments: Dict[int, _Segment] = {}
+        self._active: Optional[_Segment] = None
+        self._seq = 0
+        self._stopping = False
+        # en el buffer va (segmento, evento): al aplicarse se descuenta de su segmento
+        self._buffer = WriteBehindBuffer(name, self._flush, max_batch=max_batch, flush_interval=flush_interval,
+                                         max_pending=max_pending, overflow=overflow, on_drop=self._on_drop)
+        self.appended = 0
+        self.recovered = 0
+
+    # ---------- journal ----------
+    def _adopt_orphans(self) -> List[Event]:
+        events: List[Event] = []
+        for path in sorted(glob.glob(os.path.join(self.directory, f"{self.name}-*.jsonl"))):
+            try:
+                f = open(path, "r+", encoding="utf-8")
+            except OSError:
+                continue
+            try:
+                if not _try_lock(f):
+                    continue  # segmento de un proceso vivo
+                events.extend(_read_events(f))
+            finally:
+                f.close()
+            os.remove(path)
+        return events
+
+    def _rotate(self) -> None:
+        """Abre un segmento nuevo; el anterior se borra cuando se aplican todos sus eventos"""
+        while True:
+            self._seq += 1
+            path = os.path.join(self.directory, f"{self.name}-{os.getpid()}-{self._seq}.jsonl")
+            try:
+                f = open(path, "x+", encoding="utf-8")   # nunca truncar un segmento ajeno
+                break
+            except FileExistsError:
+                continue
+        if not _try_lock(f):
+            f.close()
+            raise RuntimeError(f"Spool bloqueado por otro proceso: {path}")
+        previous = self._active
+        self._active = self._segments[self._seq] = _Segment(self._seq, path, f)
+        self.path = path
+        if previous is not None and previous.pending <= 0:
+            self._discard(previous)
+
+    def _discard(self, seg: _Segment) -> None:
+        del self._segments[seg.seq]
+        seg.file.close()
+        try:
+            os.remove(seg.path)
+        except OSError:
+            pass
+
+    def _settle(self, rows: List[Tuple[int, Event]]) -> None:
+        """Descuenta eventos aplicados (o descartados) y borra los segmentos cerrados que quedan en cero"""
+        for seq, n in Counter(seq for seq, _ in rows).items():
+            seg = self._segments.get(seq)
+            if seg is None:
+                continue
+            seg.pending -= n
+            if seg.pending <= 0 and seg is not self._active:
+                self._discard(seg)
+
+    def _on_drop(self, rows: List[Tuple[int, Event]]) -> None:
+        # al apagar, lo no escrito sigue en su segmento para el próximo arranque
+        if not self._stopping:
+            self._settle(rows)
+
+    def open(self) -> None:
+        """Abre el segmento del proceso y encola lo pendiente de journals huérfanos"""
+        if self._active is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        orphans = self._adopt_orphans()
+        self._rotate()
+        for ev in orphans:
+            self._enqueue(ev)
+        self.recovered = len(orphans)
+        if orphans:
+            log.info("Spool %s: %s eventos recuperados", self.name, len(orphans))
+
+    def _enqueue(self, event: Event) -> None:
+        seg = self._active
+        seg.file.write(json.dumps(event, default=str, separators=(",", ":")) + "\n")
+        seg.file.flush()
+        if self.fsync:
+            os.fsync(seg.file.fileno())
+        seg.pending += 1
+        self._buffer.add((seg.seq, event))
+
+    def append(self, event: Event) -> None:
+        """Persiste y encola el evento; no toca la BD"""
+        if self._active is None:
+            self.open()
+        self._enqueue(event)
+        self.appended += 1
+
+    # ---------- worker ----------
+    async def _flush(self, rows: List[Tuple[int, Event]]) -> None:
+        # lo que llegue durante apply va a otro segmento: este puede borrarse sin esperar a que
+        # la cola se vacíe
+        if self._active.pending:
+            self._rotate()
+        await self.apply([ev for _, ev in rows])
+        self._settle(rows)
+
+    async def start(self) -> None:
+        self.open()
+        await self._buffer.start()
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Flush final; lo que no alcance queda en el journal para el próximo arranque"""
+        self._stopping = True
+        try:
+            await self._buffer.stop(timeout)
+        finally:
+            self._stopping = False
+        for seg in list(self._segments.values()):
+            if seg.pending <= 0:
+                self._discard(seg)
+            else:
+                seg.file.close()
+        self._segments.clear()
+        self._active = None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._buffer.stats()
+        stats.update({"appended": self.appended, "recovered": self.recovered, "journal": self.path,
+                      "segments": len(self._segments)})
+        return stats
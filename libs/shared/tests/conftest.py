@@ -0,0 +1,6 @@
+# libs/shared/tests/conftest.py
+# ev_shared importable también con `pytest` a secas (no solo `python -m pytest` desde libs/shared)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
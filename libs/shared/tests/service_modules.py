@@ -0,0 +1,20 @@
+# libs/shared/tests/service_modules.py
+"""
+Carga un módulo de un servicio por ruta, sin importar su paquete `app` (todos los servicios
+usan ese nombre). Solo para módulos sin imports relativos.
+"""
+import importlib.util
+import os
+import sys
+
+SERVICES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "services")
+
+def load_service_module(service: str, relpath: str):
+    name = f"_svc_{service.replace('-', '_')}_{os.path.splitext(relpath)[0].replace('/', '_')}"
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SERVICES, service, relpath))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
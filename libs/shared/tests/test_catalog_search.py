@@ -0,0 +1,114 @@
+# libs/shared/tests/test_catalog_search.py
+"""
+Búsqueda del catálogo (services/catalogo-service/.../catalog_search.py): normalización sin
+tildes, prefijos, errores de tipeo, AND entre términos, filtro por tipo y sync incremental.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from service_modules import load_service_module
+
+cs = load_service_module("catalogo-service", "app/infrastructure/catalog_search.py")
+
+def snapshot(servicios, opciones):
+    by_servicio = {}
+    for o in opciones:
+        by_servicio.setdefault(o["servicio_id"], []).append(o)
+    return SimpleNamespace(servicios=servicios, opciones_by_servicio=by_servicio)
+
+def servicio(id, nombre, descripcion=""):
+    return {"id": id, "nombre": nombre, "descripcion": descripcion, "tipo_evento_id": "t1"}
+
+def opcion(id, servicio_id, nombre, detalles=None, monto="100.00"):
+    return {"id": id, "servicio_id": servicio_id, "nombre": nombre, "detalles": detalles,
+            "moneda": "PEN", "monto": monto}
+
+SERVICIOS = [
+    servicio("s1", "Fotografía profesional", "Cobertura completa del evento"),
+    servicio("s2", "Catering", "Menú de tres tiempos y bebidas"),
+    servicio("s3", "Música en vivo", "Banda y DJ"),
+]
+OPCIONES = [
+    opcion("o1", "s1", "Paquete fotográfico básico", '{"extras": ["álbum impreso"]}'),
+    opcion("o2", "s2", "Buffet criollo", {"capacidad": "100 personas", "sla": "Montaje 2 h"}),
+    opcion("o3", "s3", "DJ con iluminación"),
+]
+
+@pytest.fixture
+def index():
+    idx = cs.CatalogSearchIndex(max_expansions=50, fuzzy_min=0.5)
+    idx.sync(cs.snapshot_documents(snapshot(SERVICIOS, OPCIONES)))
+    return idx
+
+def ids(results):
+    return [(r["tipo"], r["id"]) for r in results]
+
+def test_fold_and_tokenize():
+    assert cs.fold("Fotografía Ñandú") == "fotografia nandu"
+    assert cs.tokenize("La Música de la BANDA") == ["musica", "banda"]   # sin stopwords
+
+def test_accent_and_case_insensitive(index):
+    assert ids(index.search("FOTOGRAFIA")) == ids(index.search("fotografía"))
+    assert ("servicio", "s1") in ids(index.search("fotografia"))
+
+def test_name_outranks_description(index):
+    results = index.search("dj")
+    assert ids(results)[0] == ("opcion", "o3")            # "DJ" en el nombre
+    assert ("servicio", "s3") in ids(results)             # "DJ" solo en la descripción
+    assert results[0]["score"] > results[-1]["score"]
+
+def test_prefix_match(index):
+    assert ("servicio", "s2") in ids(index.search("cater"))
+
+def test_typo_is_tolerated(index):
+    assert ("servicio", "s2") in ids(index.search("caterin"))
+    assert ("servicio", "s1") in ids(index.search("fotografya"))
+
+def test_all_terms_must_match(index):
+    assert ids(index.search("buffet criollo")) == [("opcion", "o2")]
+    assert index.search("buffet inexistentexyz") == []
+
+def test_detalles_json_values_are_indexed(index):
+    assert ids(index.search("album")) == [("opcion", "o1")]
+    assert ids(index.search("montaje")) == [("opcion", "o2")]
+
+def test_type_filter_and_limit(index):
+    assert all(r["tipo"] == "opcion" for r in index.search("paquete", tipo="opcion"))
+    assert ids(index.search("dj", tipo="servicio")) == [("servicio", "s3")]
+    assert ids(index.search("dj", limit=1)) == [("opcion", "o3")]
+
+def test_empty_or_stopword_query(index):
+    assert index.search("") == []
+    assert index.search("de la y") == []
+
+def test_sync_is_incremental(index):
+    servicios = [SERVICIOS[0], servicio("s2", "Banquetes", "Menú de tres tiempos y bebidas"), servicio("s4", "Decoración floral")]
+    opciones = [OPCIONES[0], dict(OPCIONES[1], monto="120.00")]
+    stats = index.sync(cs.snapshot_documents(snapshot(servicios, opciones)))
+    assert (stats["added"], stats["updated"], stats["removed"]) == (1, 1, 2)
+    assert index.search("catering") == []
+    assert ids(index.search("banquetes")) == [("servicio", "s2")]
+    assert ids(index.search("decoracion")) == [("servicio", "s4")]
+    assert index.search("buffet")[0]["monto"] == "120.00"          # solo cambió el payload
+    assert index.search("iluminacion") == []
+    assert index.stats()["documentos"] == 5
+
+def test_synced_copy_leaves_published_index_untouched(index):
+    before = ids(index.search("catering"))
+    copy = index.synced(cs.snapshot_documents(snapshot(SERVICIOS[:1], OPCIONES[:1])))
+    assert ids(index.search("catering")) == before
+    assert copy.search("catering") == []
+    assert ids(copy.search("fotografia")) and index.stats()["documentos"] == 6
+
+def test_sync_matches_fresh_build(index):
+    servicios = SERVICIOS[1:] + [servicio("s5", "Fotografía aérea con dron")]
+    docs = cs.snapshot_documents(snapshot(servicios, OPCIONES[1:]))
+    index.sync(docs)
+    fresh = cs.CatalogSearchIndex(max_expansions=50, fuzzy_min=0.5)
+    fresh.sync(docs)
+    def scored(results):
+        return sorted((r["tipo"], r["id"], r["score"]) for r in results)   # empates: otro orden de ids internos
+
+    for q in ("fotografia", "dron", "catering", "dj", "buffet", "banda", "fotografico"):
+        assert scored(index.search(q)) == scored(fresh.search(q)), q
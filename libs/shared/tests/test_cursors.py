@@ -0,0 +1,57 @@
+# libs/shared/tests/test_cursors.py
+"""
+Cursores keyset de IAM: auditoría (audit_log.py, (fecha_hora, id)) y búsqueda de usuarios
+(user_search.py, última clave del orden). Ida y vuelta, y rechazo de cursores manipulados.
+"""
+import base64
+from datetime import datetime
+
+import pytest
+
+from service_modules import load_service_module
+
+audit_log = load_service_module("iam-service", "app/infrastructure/db/sqlalchemy/audit_log.py")
+user_search = load_service_module("iam-service", "app/infrastructure/db/sqlalchemy/user_search.py")
+
+GARBAGE = ["", "@@@", "no-es-base64!", base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+           base64.urlsafe_b64encode(b"{}").decode(), base64.urlsafe_b64encode(b'"texto"').decode()]
+
+# ---- auditoría ----
+
+@pytest.mark.parametrize("fecha", [datetime(2025, 3, 1, 12, 30, 5), datetime(2025, 3, 1, 12, 30, 5, 123456)])
+def test_audit_cursor_round_trip(fecha):
+    cursor = audit_log.encode_cursor(fecha, "0b6f-uuid")
+    assert "=" not in cursor and "/" not in cursor and "+" not in cursor   # va en la query string
+    assert audit_log.decode_cursor(cursor) == (fecha, "0b6f-uuid")
+
+@pytest.mark.parametrize("cursor", GARBAGE + [
+    base64.urlsafe_b64encode(b'["no-fecha", "x"]').decode(),
+    base64.urlsafe_b64encode(b'["2025-01-01 00:00:00"]').decode(),
+])
+def test_audit_cursor_rejects_garbage(cursor):
+    with pytest.raises(audit_log.InvalidCursor):
+        audit_log.decode_cursor(cursor)
+
+def test_audit_invalid_cursor_is_a_value_error():
+    assert issubclass(audit_log.InvalidCursor, ValueError)
+
+# ---- búsqueda de usuarios ----
+
+@pytest.mark.parametrize("values", [["ana@example.com"], ["Ñandú Pérez", "3f2a-uuid"]])
+def test_user_search_cursor_round_trip(values):
+    cursor = user_search._encode(values)
+    assert "=" not in cursor
+    assert user_search._decode(cursor, len(values)) == values
+
+def test_user_search_cursor_of_other_order_is_rejected():
+    cursor = user_search._encode(["ana@example.com"])
+    with pytest.raises(user_search.InvalidCursor):
+        user_search._decode(cursor, 2)
+
+@pytest.mark.parametrize("cursor", GARBAGE)
+def test_user_search_cursor_rejects_garbage(cursor):
+    with pytest.raises(user_search.InvalidCursor):
+        user_search._decode(cursor, 1)
+
+def test_user_search_prefix_escapes_like_wildcards():
+    assert user_search._prefix("a_b%c\\") == "a\\_b\\%c\\\\%"
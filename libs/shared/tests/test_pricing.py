@@ -0,0 +1,117 @@
+# libs/shared/tests/test_pricing.py
+"""
+PriceTimeline y package_timeline contra una referencia por fuerza bruta (día por día).
+Ejecutar desde libs/shared: python -m pytest -q tests
+"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List, Optional
+
+import pytest
+
+from ev_shared.pricing import Interval, Price, PriceIndex, PriceTimeline, package_timeline, package_total
+
+D0 = date(2025, 1, 1)
+
+def d(n: int) -> date:
+    return D0 + timedelta(days=n)
+
+def p(monto: str, moneda: str = "PEN") -> Price:
+    return (moneda, Decimal(monto))
+
+def brute_at(intervals: List[Interval], fecha: date) -> Optional[Price]:
+    # vigente = el de vigente_desde más reciente; a igual inicio, el último en llegar
+    best = None
+    for i, (start, end, price) in enumerate(intervals):
+        if start <= fecha and (end is None or fecha <= end):
+            if best is None or (start, i) >= best[0]:
+                best = ((start, i), price)
+    return best[1] if best else None
+
+def brute_package(items, intervals_by_op, fecha: date) -> Optional[Price]:
+    priced = [(cant, brute_at(intervals_by_op.get(op, []), fecha)) for op, cant in items]
+    priced = [(cant, pr) for cant, pr in priced if pr is not None]
+    if not priced:
+        return None
+    return min(pr[0] for _, pr in priced), sum((cant * pr[1] for cant, pr in priced), Decimal("0"))
+
+def random_intervals(rng: random.Random, n: int) -> List[Interval]:
+    out = []
+    for _ in range(n):
+        start = rng.randint(0, 40)
+        end = None if rng.random() < 0.3 else start + rng.randint(0, 15)
+        out.append((d(start), None if end is None else d(end), p(str(rng.randint(1, 5) * 10))))
+    return out
+
+# ---- PriceTimeline ----
+
+def test_empty_timeline():
+    tl = PriceTimeline()
+    assert len(tl) == 0
+    assert tl.at(D0) is None
+
+def test_gap_between_intervals_is_none():
+    tl = PriceTimeline([(d(0), d(9), p("10")), (d(20), d(29), p("20"))])
+    assert tl.at(d(-1)) is None
+    assert tl.at(d(9)) == p("10")     # vigente_hasta es inclusivo
+    assert tl.at(d(10)) is None
+    assert tl.at(d(19)) is None
+    assert tl.at(d(20)) == p("20")
+    assert tl.at(d(30)) is None
+
+def test_overlap_latest_start_wins_and_previous_resumes():
+    tl = PriceTimeline([(d(0), d(30), p("10")), (d(10), d(14), p("15"))])
+    assert tl.at(d(9)) == p("10")
+    assert tl.at(d(10)) == p("15")
+    assert tl.at(d(14)) == p("15")
+    assert tl.at(d(15)) == p("10")
+    assert tl.at(d(31)) is None
+
+def test_open_ended_interval():
+    tl = PriceTimeline([(d(0), None, p("10")), (d(5), d(6), p("12"))])
+    assert tl.at(d(7)) == p("10")
+    assert tl.at(date.max) == p("10")
+
+def test_interval_ending_at_date_max():
+    tl = PriceTimeline([(d(0), date.max, p("10"))])
+    assert tl.at(date.max) == p("10")
+
+def test_equal_segments_are_merged():
+    tl = PriceTimeline([(d(0), d(9), p("10")), (d(10), d(19), p("10"))])
+    assert len(tl) == 2   # [d0: 10], [d20: None]
+
+@pytest.mark.parametrize("seed", range(200))
+def test_timeline_matches_brute_force(seed):
+    rng = random.Random(seed)
+    intervals = random_intervals(rng, rng.randint(1, 8))
+    tl = PriceTimeline(intervals)
+    for n in range(-3, 60):
+        assert tl.at(d(n)) == brute_at(intervals, d(n)), (intervals, d(n))
+    assert all(a != b for a, b in zip(tl.values, tl.values[1:]))
+
+# ---- paquetes ----
+
+def test_package_sums_only_priced_items():
+    options = PriceIndex({
+        "a": PriceTimeline([(d(0), None, p("10"))]),
+        "b": PriceTimeline([(d(5), d(9), p("3"))]),
+    })
+    items = [("a", 2), ("b", 1), ("sin-precio", 4)]
+    tl = package_timeline(items, options)
+    assert tl.at(d(-1)) is None
+    assert tl.at(d(0)) == p("20")
+    assert tl.at(d(5)) == p("23")
+    assert tl.at(d(10)) == p("20")
+    assert tl.at(d(5)) == package_total(items, options, d(5))
+
+@pytest.mark.parametrize("seed", range(100))
+def test_package_timeline_matches_brute_force(seed):
+    rng = random.Random(seed)
+    ops = [f"op{i}" for i in range(rng.randint(1, 4))]
+    intervals_by_op = {op: random_intervals(rng, rng.randint(1, 4)) for op in ops}
+    options = PriceIndex({op: PriceTimeline(ivs) for op, ivs in intervals_by_op.items()})
+    items = [(rng.choice(ops + ["sin-precio"]), rng.randint(1, 3)) for _ in range(rng.randint(1, 5))]
+    tl = package_timeline(items, options)
+    for n in range(-3, 60):
+        assert tl.at(d(n)) == brute_package(items, intervals_by_op, d(n)), (items, d(n))
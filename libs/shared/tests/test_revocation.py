@@ -0,0 +1,122 @@
+# libs/shared/tests/test_revocation.py
+"""
+BloomFilter y RevocationList con una fuente en memoria: foto completa, incrementales por
+watermark, confirmación exacta de positivos del Bloom y fail-open.
+"""
+from typing import List, Optional, Set, Tuple
+
+from ev_shared.security.revocation import BloomFilter, RevocationList
+
+class FakeSource:
+    """Revocaciones con su updated_at (str ordenable, como el feed de IAM)"""
+
+    def __init__(self):
+        self.rows: List[Tuple[str, str]] = []
+        self.calls: List[Optional[str]] = []
+        self.exact_calls: List[str] = []
+        self.fail = False
+
+    def revoke(self, sid: str, at: str) -> None:
+        self.rows.append((sid, at))
+
+    def revoked_since(self, since: Optional[str], horizon: int) -> Tuple[List[str], str]:
+        self.calls.append(since)
+        if self.fail:
+            raise OSError("IAM no responde")
+        rows = [r for r in self.rows if since is None or r[1] >= since]
+        watermark = max([at for _, at in rows] + [since or "0000"])
+        return [sid for sid, _ in rows], watermark
+
+    def is_revoked(self, sid: str) -> bool:
+        self.exact_calls.append(sid)
+        if self.fail:
+            raise OSError("IAM no responde")
+        return any(s == sid for s, _ in self.rows)
+
+def make_list(source: FakeSource, recent_max: int = 100) -> RevocationList:
+    # refresh_interval largo: los tests llaman refresh() a mano, sin hilos
+    return RevocationList(source, horizon=3600, refresh_interval=3600, rebuild_interval=3600,
+                          capacity=1000, error_rate=0.01, recent_max=recent_max)
+
+# ---- BloomFilter ----
+
+def test_bloom_has_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(1000, 0.01)
+    items = [f"sid-{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    false_positives = sum(f"otro-{i}" in bloom for i in range(10000))
+    assert false_positives < 300   # ~1% esperado; margen amplio para no ser frágil
+
+def test_bloom_small_capacity_is_usable():
+    bloom = BloomFilter(0, 0.5)
+    bloom.add("a")
+    assert "a" in bloom and bloom.m >= 64
+
+# ---- RevocationList ----
+
+def test_first_check_loads_snapshot_then_increments_from_watermark():
+    src = FakeSource()
+    src.revoke("s1", "2025-01-01 10:00:00")
+    rl = make_list(src)
+    assert rl.is_revoked("s1")
+    assert not rl.is_revoked("s2")
+    assert src.calls == [None]
+    assert rl.stats()["watermark"] == "2025-01-01 10:00:00"
+
+    src.revoke("s2", "2025-01-01 10:00:05")
+    rl.refresh()
+    assert src.calls[-1] == "2025-01-01 10:00:00"
+    assert rl.is_revoked("s2")
+    assert rl.stats()["watermark"] == "2025-01-01 10:00:05"
+
+def test_watermark_does_not_move_back_without_new_rows():
+    src = FakeSource()
+    src.revoke("s1", "2025-01-01 10:00:00")
+    rl = make_list(src)
+    rl.refresh()
+    rl.refresh()
+    rl.refresh()
+    assert src.calls == [None, "2025-01-01 10:00:00", "2025-01-01 10:00:00"]
+
+def test_bloom_positive_is_confirmed_and_cached():
+    src = FakeSource()
+    src.revoke("s1", "2025-01-01 10:00:00")
+    rl = make_list(src)
+    rl.refresh()
+    assert rl.is_revoked("s1") and rl.is_revoked("s1")
+    assert src.exact_calls == ["s1"]
+
+def test_source_failure_keeps_last_state():
+    src = FakeSource()
+    src.revoke("s1", "2025-01-01 10:00:00")
+    rl = make_list(src)
+    assert rl.is_revoked("s1")
+    src.fail = True
+    rl.refresh()
+    assert rl.stats()["errors"] == 1
+    assert rl.stats()["watermark"] == "2025-01-01 10:00:00"
+    assert rl.is_revoked("s1")              # confirmado antes de la caída (cache exacto)
+    assert not rl.is_revoked("nunca")       # fail-open
+
+def test_unavailable_source_on_first_load_is_fail_open():
+    src = FakeSource()
+    src.fail = True
+    rl = make_list(src)
+    assert not rl.is_revoked("s1")
+    assert rl.stats()["loaded"] is False
+
+def test_recent_set_overflow_forces_full_snapshot():
+    src = FakeSource()
+    rl = make_list(src, recent_max=2)
+    rl.refresh()
+    for i in range(3):
+        src.revoke(f"s{i}", f"2025-01-01 10:00:0{i}")
+    rl.refresh()
+    assert rl.stats()["recent"] == 3
+    rl.refresh()                            # set exacto > recent_max: foto completa
+    assert src.calls[-1] is None
+    assert rl.stats()["recent"] == 0 and rl.stats()["bloom_items"] == 3
+    seen: Set[str] = {f"s{i}" for i in range(3) if rl.is_revoked(f"s{i}")}
+    assert seen == {"s0", "s1", "s2"}
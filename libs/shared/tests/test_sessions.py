@@ -0,0 +1,131 @@
+# libs/shared/tests/test_sessions.py
+"""
+Sesiones de refresh de IAM (services/iam-service/.../sessions.py) contra una sesión falsa en
+memoria que emula ev_iam.sesion: formato del token, rotación y reuso de un token rotado.
+"""
+import asyncio
+import hashlib
+import re
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from service_modules import load_service_module
+
+sessions = load_service_module("iam-service", "app/infrastructure/db/sqlalchemy/sessions.py")
+
+def run(coro):
+    return asyncio.run(coro)
+
+def sha(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+class Result:
+    def __init__(self, rows: List[Dict[str, Any]] = (), rowcount: int = 0):
+        self._rows = list(rows)
+        self.rowcount = rowcount
+
+    def mappings(self):
+        return self
+
+    def first(self):
+        return self._rows[0] if self._rows else None
+
+class FakeSesionTable:
+    """Solo las sentencias de sessions.py, interpretadas sobre dicts"""
+
+    def __init__(self):
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self.statements: List[str] = []
+
+    async def execute(self, stmt, params: Dict[str, Any]) -> Result:
+        sql = " ".join(str(stmt).split())
+        self.statements.append(sql)
+        if sql.startswith("INSERT INTO ev_iam.sesion"):
+            self.rows[params["id"]] = {"id": params["id"], "usuario_id": params["uid"], "jwt_id": params["jti"],
+                                       "prev_jwt_id": None, "expires_at": params["exp"], "status": 1}
+            return Result(rowcount=1)
+        if sql.startswith("SELECT se.id"):
+            rows = [dict(r, email="ana@example.com") for r in self.rows.values()
+                    if r["jwt_id"] == params["jti"] and r["status"] == 1 and r["expires_at"] > params["now"]]
+            return Result(rows)
+        if sql.startswith("UPDATE ev_iam.sesion SET jwt_id=:new"):
+            r = self.rows.get(params["id"])
+            if r and r["jwt_id"] == params["old"] and r["status"] == 1:
+                r["jwt_id"], r["prev_jwt_id"] = params["new"], params["old"]
+                return Result(rowcount=1)
+            return Result()
+        if re.match(r"UPDATE ev_iam.sesion SET status=0 WHERE prev_jwt_id", sql):
+            r = self.rows.get(params["id"])
+            if r and r["prev_jwt_id"] == params["jti"] and r["status"] == 1:
+                r["status"] = 0
+                return Result(rowcount=1)
+            return Result()
+        raise AssertionError(f"sentencia no esperada: {sql}")
+
+def new_session(table: FakeSesionTable):
+    return run(sessions.create_session(table, "u1", timedelta(days=1)))
+
+def test_session_id_of():
+    assert sessions.session_id_of("abc.def") == "abc"
+    assert sessions.session_id_of("abc.def.ghi") == "abc"
+    for bad in ("", None, "abc", "abc.", ".def"):
+        assert sessions.session_id_of(bad) is None
+
+def test_only_the_hash_is_stored():
+    table = FakeSesionTable()
+    sid, token = new_session(table)
+    assert token.startswith(sid + ".")
+    assert table.rows[sid]["jwt_id"] == sha(token)
+    assert token not in str(table.rows)
+
+def test_rotation_invalidates_previous_token():
+    table = FakeSesionTable()
+    sid, token = new_session(table)
+    out = run(sessions.rotate_session(table, token))
+    assert out["sesion_id"] == sid and out["usuario_id"] == "u1"
+    assert out["refresh_token"] != token and sessions.session_id_of(out["refresh_token"]) == sid
+    assert table.rows[sid]["prev_jwt_id"] == sha(token)
+    # el nuevo sigue rotando
+    assert run(sessions.rotate_session(table, out["refresh_token"])) is not None
+
+def test_reuse_of_rotated_token_revokes_session():
+    table = FakeSesionTable()
+    sid, token = new_session(table)
+    fresh = run(sessions.rotate_session(table, token))["refresh_token"]
+    assert run(sessions.rotate_session(table, token)) is None
+    assert table.rows[sid]["status"] == 0
+    assert run(sessions.rotate_session(table, fresh)) is None
+
+def test_forged_token_with_known_sid_does_not_revoke():
+    # el sid viaja en el access token: "<sid>.x" nunca se emitió y no debe cerrar la sesión
+    table = FakeSesionTable()
+    sid, token = new_session(table)
+    run(sessions.rotate_session(table, token))
+    assert run(sessions.rotate_session(table, f"{sid}.inventado")) is None
+    assert table.rows[sid]["status"] == 1
+
+def test_malformed_token_never_touches_the_db():
+    table = FakeSesionTable()
+    assert run(sessions.rotate_session(table, "sin-punto")) is None
+    assert table.statements == []
+
+def test_expired_session_does_not_rotate():
+    table = FakeSesionTable()
+    sid, token = new_session(table)
+    table.rows[sid]["expires_at"] = datetime.now() - timedelta(seconds=1)
+    assert run(sessions.rotate_session(table, token)) is None
+    assert table.rows[sid]["status"] == 1   # vencida, no reusada
+
+def test_lost_rotation_race_returns_none():
+    table = FakeSesionTable()
+    sid, token = new_session(table)
+    real_execute = table.execute
+
+    async def racing_execute(stmt, params):
+        if " ".join(str(stmt).split()).startswith("UPDATE ev_iam.sesion SET jwt_id=:new"):
+            return SimpleNamespace(rowcount=0)   # otra petición rotó entre el SELECT y el UPDATE
+        return await real_execute(stmt, params)
+
+    table.execute = racing_execute
+    assert run(sessions.rotate_session(table, token)) is None
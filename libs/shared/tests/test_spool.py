@@ -0,0 +1,198 @@
+# libs/shared/tests/test_spool.py
+"""
+WriteBehindBuffer (desborde, reintento con reencolado) y DurableSpool (segmentos del journal,
+recuperación tras apagar o caer).
+"""
+import asyncio
+import json
+import os
+from typing import Any, List
+
+import pytest
+
+from ev_shared.batching import WriteBehindBuffer
+from ev_shared.spool import DurableSpool
+
+def run(coro):
+    return asyncio.run(coro)
+
+class Sink:
+    """apply/flush de prueba: guarda lo aplicado; falla las primeras `failures` llamadas"""
+
+    def __init__(self, failures: int = 0, delay: float = 0.0):
+        self.failures = failures
+        self.delay = delay
+        self.rows: List[Any] = []
+        self.calls = 0
+
+    async def __call__(self, rows: List[Any]) -> None:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("BD caída")
+        self.rows.extend(rows)
+
+# ---- WriteBehindBuffer ----
+
+def test_drop_oldest_keeps_newest_and_reports_drops():
+    dropped: List[int] = []
+    buf = WriteBehindBuffer("t", Sink(), max_pending=3, on_drop=dropped.extend)
+    for i in range(5):
+        assert buf.add(i)
+    assert [row for _, row in buf._rows] == [2, 3, 4]
+    assert dropped == [0, 1]
+    assert buf.stats()["dropped"] == 2
+
+def test_drop_newest_rejects_new_rows():
+    dropped: List[int] = []
+    buf = WriteBehindBuffer("t", Sink(), max_pending=2, overflow="drop_newest", on_drop=dropped.extend)
+    assert buf.add(0) and buf.add(1)
+    assert not buf.add(2)
+    assert [row for _, row in buf._rows] == [0, 1]
+    assert dropped == [2]
+
+def test_invalid_overflow_policy():
+    with pytest.raises(ValueError):
+        WriteBehindBuffer("t", Sink(), overflow="block")
+
+def test_failed_flush_requeues_batch_in_order():
+    sink = Sink(failures=1)
+    buf = WriteBehindBuffer("t", sink, max_batch=2)
+    for i in range(3):
+        buf.add(i)
+    assert run(buf._flush_once()) is False
+    assert [row for _, row in buf._rows] == [0, 1, 2]
+    assert run(buf._flush_once()) is True
+    assert sink.rows == [0, 1]
+    assert buf.stats()["errors"] == 1 and buf.stats()["written"] == 2
+
+def test_requeue_overflow_drops_tail_of_batch():
+    dropped: List[int] = []
+    buf = WriteBehindBuffer("t", Sink(), max_batch=3, max_pending=4, on_drop=dropped.extend)
+    for i in range(3):
+        buf.add(i)
+    batch = buf._take_batch()
+    for i in range(3, 6):
+        buf.add(i)
+    buf._requeue(batch)
+    assert [row for _, row in buf._rows] == [0, 3, 4, 5]
+    assert dropped == [1, 2]
+
+def test_stop_flushes_pending_rows():
+    sink = Sink()
+
+    async def scenario():
+        buf = WriteBehindBuffer("t", sink, flush_interval=60)
+        await buf.start()
+        for i in range(10):
+            buf.add(i)
+        await buf.stop()
+
+    run(scenario())
+    assert sink.rows == list(range(10))
+
+# ---- DurableSpool ----
+
+def journal_files(directory: str) -> List[str]:
+    return sorted(f for f in os.listdir(directory) if f.endswith(".jsonl"))
+
+def journal_events(directory: str) -> List[Any]:
+    out = []
+    for name in journal_files(directory):
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            out.extend(json.loads(line) for line in f if line.strip())
+    return out
+
+def test_applied_events_leave_no_journal(tmp_path):
+    sink = Sink()
+
+    async def scenario():
+        spool = DurableSpool(str(tmp_path), "t", sink, flush_interval=0.01)
+        await spool.start()
+        for i in range(20):
+            spool.append({"i": i})
+        await asyncio.sleep(0.1)
+        assert journal_events(str(tmp_path)) == []
+        await spool.stop()
+
+    run(scenario())
+    assert [e["i"] for e in sink.rows] == list(range(20))
+    assert journal_files(str(tmp_path)) == []
+
+def test_unapplied_events_are_recovered_on_restart(tmp_path):
+    async def first_run():
+        spool = DurableSpool(str(tmp_path), "t", Sink(failures=1000), flush_interval=60)
+        await spool.start()
+        for i in range(5):
+            spool.append({"i": i})
+        await spool.stop(timeout=0)
+
+    run(first_run())
+    assert [e["i"] for e in journal_events(str(tmp_path))] == list(range(5))
+
+    sink = Sink()
+
+    async def second_run():
+        spool = DurableSpool(str(tmp_path), "t", sink, flush_interval=0.01)
+        await spool.start()
+        assert spool.recovered == 5
+        await spool.stop()
+
+    run(second_run())
+    assert [e["i"] for e in sink.rows] == list(range(5))
+    assert journal_files(str(tmp_path)) == []
+
+def test_orphan_journal_of_crashed_process_is_adopted(tmp_path):
+    # journal de un proceso caído (sin lock), con la última línea truncada
+    with open(tmp_path / "t-999999-3.jsonl", "w", encoding="utf-8") as f:
+        f.write('{"i":1}\n{"i":2}\n{"i":')
+    sink = Sink()
+
+    async def scenario():
+        spool = DurableSpool(str(tmp_path), "t", sink, flush_interval=0.01)
+        await spool.start()
+        await spool.stop()
+        return spool.recovered
+
+    assert run(scenario()) == 2
+    assert [e["i"] for e in sink.rows] == [1, 2]
+    assert journal_files(str(tmp_path)) == []
+
+def test_segments_are_deleted_while_traffic_never_stops(tmp_path):
+    # la cola nunca se vacía (llega un evento por cada vuelta del apply): los segmentos ya
+    # aplicados igual se borran y el journal no crece con la historia
+    sink = Sink(delay=0.005)
+
+    async def scenario():
+        spool = DurableSpool(str(tmp_path), "t", sink, max_batch=10, flush_interval=0.01)
+        await spool.start()
+        peak = 0
+        for i in range(300):
+            spool.append({"i": i})
+            await asyncio.sleep(0.001)
+            peak = max(peak, len(journal_events(str(tmp_path))))
+        assert len(journal_events(str(tmp_path))) < 100
+        await spool.stop()
+        return peak
+
+    peak = run(scenario())
+    assert peak < 300
+    assert sorted(e["i"] for e in sink.rows) == list(range(300))
+    assert journal_files(str(tmp_path)) == []
+
+def test_events_dropped_on_overflow_release_their_segment(tmp_path):
+    async def scenario():
+        spool = DurableSpool(str(tmp_path), "t", Sink(), max_pending=2, flush_interval=60)
+        spool.open()
+        for i in range(4):
+            spool.append({"i": i})
+        spool._rotate()   # el segmento con los 4 eventos deja de ser el activo
+        await spool._flush([row for _, row in spool._buffer._take_batch()])
+        files = journal_files(str(tmp_path))
+        await spool.stop()
+        return files
+
+    # 2 descartados por desborde + 2 aplicados: el primer segmento ya no hace falta
+    assert len(run(scenario())) == 1
@@ -0,0 +1,121 @@
+# libs/shared/tests/test_throttle.py
+"""
+LoginThrottle con backend en memoria: reserva en check(), retardo, bloqueo, liberación y
+client_ip() detrás de proxies confiables.
+"""
+import asyncio
+
+import pytest
+
+from ev_shared.config import Settings
+from ev_shared.security import throttle as throttle_mod
+from ev_shared.security.throttle import LoginThrottle, LoginThrottled, MemoryThrottleBackend, client_ip
+
+EMAIL, IP = "ana@example.com", "203.0.113.7"
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(throttle_mod.time, "time", c.time)
+    return c
+
+def make_throttle(**overrides) -> LoginThrottle:
+    conf = dict(LOGIN_THROTTLE_WINDOW=900, LOGIN_THROTTLE_FREE_FAILURES=3, LOGIN_THROTTLE_BASE_DELAY=1.0,
+                LOGIN_THROTTLE_MAX_DELAY=60.0, LOGIN_THROTTLE_MAX_FAILURES_EMAIL=5,
+                LOGIN_THROTTLE_MAX_FAILURES_IP=100, LOGIN_THROTTLE_LOCKOUT=900)
+    conf.update(overrides)
+    return LoginThrottle(Settings(**conf), MemoryThrottleBackend())
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def fail(t: LoginThrottle, email: str = EMAIL, ip: str = IP) -> None:
+    await t.check(email, ip)
+    await t.record_failure(email, ip)
+
+def test_parallel_burst_hits_delay_after_free_reservations(clock):
+    t = make_throttle()
+
+    async def burst():
+        return await asyncio.gather(*(t.check(EMAIL, IP) for _ in range(6)), return_exceptions=True)
+
+    results = run(burst())
+    assert sum(not isinstance(r, Exception) for r in results) == 3
+    assert all(isinstance(r, LoginThrottled) and r.reason == "retardo" for r in results[3:])
+
+def test_delay_grows_and_expires(clock):
+    t = make_throttle()
+    for _ in range(3):
+        run(fail(t))
+    with pytest.raises(LoginThrottled) as e:
+        run(t.check(EMAIL, IP))
+    assert e.value.retry_after == 2   # 1 s de retardo, redondeado hacia arriba
+    clock.now += 1.0
+    run(fail(t))                      # 4.º fallo: el próximo espera 2 s
+    clock.now += 1.5
+    with pytest.raises(LoginThrottled):
+        run(t.check(EMAIL, IP))
+    clock.now += 0.5
+    run(t.check(EMAIL, IP))
+
+def test_lockout_after_max_failures(clock):
+    t = make_throttle(LOGIN_THROTTLE_BASE_DELAY=0.0)
+    for _ in range(5):
+        run(fail(t))
+    with pytest.raises(LoginThrottled) as e:
+        run(t.check(EMAIL, "198.51.100.1"))   # el bloqueo es del email, desde cualquier IP
+    assert e.value.reason == "bloqueado"
+    clock.now += 901
+    run(t.check(EMAIL, IP))
+
+def test_success_resets_email_and_only_removes_own_ip_reservation(clock):
+    t = make_throttle()
+    run(fail(t, "otro@example.com"))
+    run(fail(t))
+    attempt = run(t.check(EMAIL, IP))
+    run(t.record_success(EMAIL, IP, attempt))
+    backend = t.backend
+    assert run(backend.failures(f"email:{EMAIL}", 900, clock.now))[0] == 0
+    # los fallos previos desde la IP siguen contando (IP compartida/NAT)
+    assert run(backend.failures(f"ip:{IP}", 900, clock.now))[0] == 2
+
+def test_release_discards_reservation(clock):
+    t = make_throttle()
+    attempt = run(t.check(EMAIL, IP))
+    run(t.release(EMAIL, IP, attempt))
+    assert run(t.backend.failures(f"email:{EMAIL}", 900, clock.now))[0] == 0
+    assert run(t.backend.failures(f"ip:{IP}", 900, clock.now))[0] == 0
+
+def test_email_key_is_case_insensitive(clock):
+    t = make_throttle()
+    for email in ("Ana@Example.com", " ana@example.com", "ANA@EXAMPLE.COM"):
+        run(fail(t, email, None))
+    with pytest.raises(LoginThrottled):
+        run(t.check(EMAIL, None))
+
+# ---- client_ip ----
+
+PROXIES = Settings(TRUSTED_PROXIES="10.0.0.0/8, 127.0.0.1").TRUSTED_PROXY_NETWORKS
+
+@pytest.mark.parametrize("peer, xff, expected", [
+    ("203.0.113.7", "1.1.1.1", "203.0.113.7"),          # peer no confiable: se ignora el header
+    ("10.0.0.2", "203.0.113.7", "203.0.113.7"),
+    ("10.0.0.2", "1.1.1.1, 203.0.113.7, 10.0.0.9", "203.0.113.7"),   # el cliente no puede falsear
+    ("10.0.0.2", None, None),                           # proxy sin header: sin clave por IP
+    ("10.0.0.2", "10.0.0.3", None),
+    ("10.0.0.2", "basura", None),
+    ("127.0.0.1", "2001:db8::1", "2001:db8::1"),
+    (None, "203.0.113.7", None),
+])
+def test_client_ip(peer, xff, expected):
+    assert client_ip(peer, xff, PROXIES) == expected
+
+def test_no_trusted_proxies_uses_peer():
+    assert client_ip("10.0.0.2", "203.0.113.7", Settings(TRUSTED_PROXIES="").TRUSTED_PROXY_NETWORKS) == "10.0.0.2"
@@ -1,9 +1,11 @@
 # created by emeday 2025 - corrected hex alignment
 from fastapi import FastAPI
-from ev_shared.config import load_settings, Settings
+from ev_shared.config import load_settings, install_reload_signal, Settings
 from ev_shared.logger import get_logger
 from ev_shared.http_debug import build_debug_router
+from ev_shared.db import dispose_engines, dispose_async_engines
 from .router import build_api_router
+from ...infrastructure.db.sqlalchemy.catalog_snapshot import get_catalog_store
 
 settings: Settings = load_settings(service_name="catalogo-service")
 log = get_logger(__name__, service_name=settings.SERVICE_NAME)
@@ -17,3 +19,17 @@ app.include_router(build_debug_router(settings), prefix="/catalogo/_debug")
 @app.on_event("startup")
 async def on_startup():
     log.info("Starting %s on %s:%s", settings.SERVICE_NAME, settings.APP_HOST, settings.APP_PORT)
+    if install_reload_signal():
+        log.info("Settings: recarga con SIGHUP habilitada")
+    await get_catalog_store(settings).start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await get_catalog_store(settings).stop()
+    dispose_engines()
+    await dispose_async_engines()
+
+@app.get("/catalogo/_debug/snapshot", tags=["_debug"])
+def debug_snapshot():
+    # Versión servida, conteos y tiempo de la última reconstrucción
+    return get_catalog_store(settings).stats()
@@ -1,165 +1,138 @@
 # router.py — Catalogo Service (MVP: endpoints públicos)
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from pydantic import BaseModel
-from sqlalchemy import text
-from typing import Any, Dict, List, Optional
+from datetime import date
+from typing import Any, Dict, List, Literal, Optional
 
 from ev_shared.config import Settings
-from ev_shared.db import session_scope
+from ...infrastructure.db.sqlalchemy.catalog_snapshot import get_catalog_store
 
 
 class Health(BaseModel):
     status: str = "ok"
 
 
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match usa comparación débil: se ignora el prefijo W/
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
 def build_api_router(settings: Settings) -> APIRouter:
     # Todos los endpoints del catálogo son públicos en el MVP
     r = APIRouter(tags=["catalogo"])
 
     # HEALTH (público)
     @r.get("/health", response_model=Health, operation_id="catalogo_health", openapi_extra={"security": []})
-    def health():
+    async def health():
         return {"status": "ok"}
 
+    # Las lecturas públicas se sirven del snapshot en memoria (catalog_snapshot.py);
+    # la BD solo se consulta al sondear la versión y al reconstruir.
+    store = get_catalog_store(settings)
+
+    # ETag = versión del snapshot: mientras no cambie, un If-None-Match que coincide se
+    # responde 304 antes de filtrar o serializar (revalidación sin BD ni cuerpo).
+    cache_control = (f"public, max-age={settings.CATALOG_CACHE_MAX_AGE}, "
+                     f"stale-while-revalidate={settings.CATALOG_CACHE_SWR}")
+
+    def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return None
+
     # GET /v1/catalogo/tipos  (público)
     @r.get("/v1/catalogo/tipos", openapi_extra={"security": []})
-    def tipos(
+    async def tipos(
+        request: Request,
+        response: Response,
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
     ) -> List[Dict[str, Any]]:
-        with session_scope(settings) as s:
-            rows = s.execute(
-                text("""
-                    SELECT id, nombre, descripcion, status
-                    FROM ev_catalogo.tipo_evento
-                    WHERE is_deleted = 0 AND status = 1
-                    ORDER BY created_at DESC
-                    LIMIT :lim OFFSET :off
-                """),
-                {"lim": limit, "off": offset},
-            ).mappings().all()
-        return [dict(r) for r in rows]
+        snap = await store.current()
+        if (cached := not_modified(request, response, snap.etag)) is not None:
+            return cached
+        return snap.tipos[offset:offset + limit]
 
     # GET /v1/catalogo/servicios  (público)
     @r.get("/v1/catalogo/servicios", openapi_extra={"security": []})
-    def servicios(
+    async def servicios(
+        request: Request,
+        response: Response,
         tipo_evento_id: Optional[str] = None,
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
     ) -> List[Dict[str, Any]]:
-        sql = """
-            SELECT id, nombre, descripcion, tipo_evento_id, status
-            FROM ev_catalogo.servicio
-            WHERE is_deleted = 0 AND status = 1
-        """
-        params: Dict[str, Any] = {}
-        if tipo_evento_id:
-            sql += " AND tipo_evento_id = :teid"
-            params["teid"] = tipo_evento_id
-        sql += " ORDER BY created_at DESC LIMIT :lim OFFSET :off"
-        params.update({"lim": limit, "off": offset})
-
-        with session_scope(settings) as s:
-            rows = s.execute(text(sql), params).mappings().all()
-        return [dict(r) for r in rows]
-
-    # GET /v1/catalogo/opciones  (público) — precios vigentes por vista
+        snap = await store.current()
+        if (cached := not_modified(request, response, snap.etag)) is not None:
+            return cached
+        rows = snap.servicios_by_tipo.get(tipo_evento_id, []) if tipo_evento_id else snap.servicios
+        return rows[offset:offset + limit]
+
+    # GET /v1/catalogo/opciones  (público) — precio vigente hoy o en ?fecha=
     @r.get("/v1/catalogo/opciones", openapi_extra={"security": []})
-    def opciones(
+    async def opciones(
+        request: Request,
+        response: Response,
         servicio_id: str,
+        fecha: Optional[date] = Query(None, description="Fecha de vigencia del precio (p. ej. la del evento); hoy si se omite"),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
     ) -> List[Dict[str, Any]]:
-        with session_scope(settings) as s:
-            rows = s.execute(
-                text("""
-                    SELECT o.id,
-                           o.servicio_id,
-                           o.nombre,
-                           o.detalles,
-                           v.moneda,
-                           v.monto
-                    FROM ev_catalogo.opcion_servicio o
-                    JOIN ev_catalogo.v_opcion_con_precio_vigente v
-                      ON v.opcion_id = o.id
-                    WHERE o.is_deleted = 0
-                      AND o.status = 1
-                      AND o.servicio_id = :sid
-                    ORDER BY o.created_at DESC
-                    LIMIT :lim OFFSET :off
-                """),
-                {"sid": servicio_id, "lim": limit, "off": offset},
-            ).mappings().all()
-        return [dict(r) for r in rows]
+        snap = await store.current()
+        if (cached := not_modified(request, response, snap.etag)) is not None:
+            return cached
+        return snap.opciones(servicio_id, fecha)[offset:offset + limit]
+
+    # GET /v1/catalogo/buscar  (público) — servicios y opciones por nombre/descripción,
+    # sin distinguir tildes ni mayúsculas; prefijos y errores de tipeo, ordenado por score
+    @r.get("/v1/catalogo/buscar", openapi_extra={"security": []})
+    async def buscar(
+        request: Request,
+        response: Response,
+        q: str = Query(..., min_length=1, max_length=100),
+        tipo: Optional[Literal["servicio", "opcion"]] = None,
+        limit: int = Query(20, ge=1, le=100),
+    ) -> List[Dict[str, Any]]:
+        snap, index = await store.current_with_search()
+        if (cached := not_modified(request, response, snap.etag)) is not None:
+            return cached
+        return index.search(q, limit, tipo)
 
     # GET /v1/catalogo/paquetes  (público)
-    # 🔁 Robusto: calculamos el total vigente agregando sobre v_paquete_detalle
+    # Total vigente = suma de cantidad * precio vigente de los ítems, precalculado en el snapshot
     @r.get("/v1/catalogo/paquetes", openapi_extra={"security": []})
-    def paquetes(
+    async def paquetes(
+        request: Request,
+        response: Response,
+        fecha: Optional[date] = Query(None, description="Fecha de vigencia de los precios; hoy si se omite"),
         limit: int = Query(50, ge=1, le=500),
         offset: int = Query(0, ge=0),
     ) -> List[Dict[str, Any]]:
-        with session_scope(settings) as s:
-            rows = s.execute(
-                text("""
-                    SELECT
-                      d.paquete_id      AS id,
-                      MIN(d.codigo)     AS codigo,
-                      MIN(d.nombre)     AS nombre,
-                      MIN(d.descripcion) AS descripcion,
-                      MIN(d.status)     AS status,
-                      MIN(d.moneda)     AS moneda,
-                      SUM(d.cantidad * d.monto) AS monto_total
-                    FROM ev_paquetes.v_paquete_detalle d
-                    GROUP BY d.paquete_id
-                    ORDER BY codigo ASC
-                    LIMIT :lim OFFSET :off
-                """),
-                {"lim": limit, "off": offset},
-            ).mappings().all()
-        return [dict(r) for r in rows]
+        snap = await store.current()
+        if (cached := not_modified(request, response, snap.etag)) is not None:
+            return cached
+        return snap.paquetes_at(fecha)[offset:offset + limit]
 
     # GET /v1/catalogo/paquetes/{id}  (público)
-    # 🔁 Robusto: cabecera agregada + ítems desde v_paquete_detalle
     @r.get("/v1/catalogo/paquetes/{id}", openapi_extra={"security": []})
-    def paquete_detalle(id: str) -> Dict[str, Any]:
-        with session_scope(settings) as s:
-            head = s.execute(
-                text("""
-                    SELECT
-                      d.paquete_id      AS id,
-                      MIN(d.codigo)     AS codigo,
-                      MIN(d.nombre)     AS nombre,
-                      MIN(d.descripcion) AS descripcion,
-                      MIN(d.status)     AS status,
-                      MIN(d.moneda)     AS moneda,
-                      SUM(d.cantidad * d.monto) AS monto_total
-                    FROM ev_paquetes.v_paquete_detalle d
-                    WHERE d.paquete_id = :pid
-                    GROUP BY d.paquete_id
-                    LIMIT 1
-                """),
-                {"pid": id},
-            ).mappings().first()
-            if not head:
-                raise HTTPException(status_code=404, detail="Paquete no encontrado")
-
-            items = s.execute(
-                text("""
-                    SELECT
-                      d.opcion_servicio_id,
-                      d.cantidad,
-                      d.moneda,
-                      d.monto AS precio_unit_vigente
-                    FROM ev_paquetes.v_paquete_detalle d
-                    WHERE d.paquete_id = :pid
-                """),
-                {"pid": id},
-            ).mappings().all()
-
-        return {
-            **dict(head),
-            "items": [dict(i) for i in items],
-        }
+    async def paquete_detalle(
+        id: str,
+        request: Request,
+        response: Response,
+        fecha: Optional[date] = Query(None, description="Fecha de vigencia de los precios; hoy si se omite"),
+    ) -> Dict[str, Any]:
+        snap = await store.current()
+        if (cached := not_modified(request, response, snap.etag)) is not None:
+            return cached
+        paquete = snap.paquete(id, fecha)
+        if paquete is None:
+            raise HTTPException(status_code=404, detail="Paquete no encontrado")
+        return paquete
 
     return r
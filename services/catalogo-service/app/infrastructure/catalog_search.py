@@ -0,0 +1,248 @@
+# services/catalogo-service/app/infrastructure/catalog_search.py
+"""
+Búsqueda en memoria sobre servicios y opciones del catálogo (GET /v1/catalogo/buscar?q=).
+- Índice invertido término -> {documento: peso}; nombre pesa más que descripción/detalles.
+  Texto normalizado: minúsculas y sin tildes (casefold + NFD sin marcas: "Fotografía" = "fotografia",
+  "ñ" = "n"); se descartan stopwords del español.
+- Cada término de la consulta se expande a: exacto, prefijo (vocabulario ordenado + bisect,
+  hasta CATALOG_SEARCH_MAX_EXPANSIONS términos) y, si no hay exacto, parecidos por trigramas
+  (coeficiente de Dice >= CATALOG_SEARCH_FUZZY_MIN). Todos los términos deben coincidir (AND); el
+  puntaje suma peso del campo * calidad de la coincidencia del mejor término expandido.
+- Intersección desde el término más selectivo: los siguientes solo se evalúan sobre candidatos.
+- sync(): compara los documentos del snapshot nuevo con los indexados y solo reindexa
+  los agregados, quitados o con texto distinto (un cambio de precio solo reemplaza el payload).
+  Un índice publicado no se modifica: CatalogStore llama a synced() (copia + sync) en un hilo
+  y publica la copia junto con el snapshot.
+"""
+import heapq
+import json
+import re
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+Key = Tuple[str, str]                  # (tipo, id)
+Row = Dict[str, Any]
+Document = Tuple[str, str, Row]        # (nombre, texto secundario, payload)
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("a al con de del e el en la las lo los o para por su sus u un una uno y".split())
+
+_WEIGHT_NOMBRE = 3.0
+_WEIGHT_TEXTO = 1.0
+_PREFIX = 0.5
+_FUZZY = 0.4
+
+def fold(value: str) -> str:
+    nfd = unicodedata.normalize("NFD", value.casefold())
+    return "".join(c for c in nfd if not unicodedata.combining(c))
+
+def tokenize(value: Optional[str]) -> List[str]:
+    return [t for t in _WORD.findall(fold(value or "")) if t not in _STOPWORDS]
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _detalles_texto(detalles: Any) -> str:
+    # detalles es JSON (capacidad, SLA, extras): se indexan sus valores de texto
+    if isinstance(detalles, (str, bytes)):
+        try:
+            detalles = json.loads(detalles)
+        except ValueError:
+            return detalles if isinstance(detalles, str) else ""
+    out: List[str] = []
+    stack = [detalles]
+    while stack:
+        v = stack.pop()
+        if isinstance(v, str):
+            out.append(v)
+        elif isinstance(v, dict):
+            stack.extend(v.values())
+        elif isinstance(v, list):
+            stack.extend(v)
+    return " ".join(out)
+
+def snapshot_documents(snapshot) -> Dict[Key, Document]:
+    """Servicios activos y opciones listadas hoy (con precio vigente) del snapshot"""
+    docs: Dict[Key, Document] = {}
+    for sv in snapshot.servicios:
+        docs[("servicio", str(sv["id"]))] = (sv["nombre"] or "", sv["descripcion"] or "", {
+            "tipo": "servicio", "id": sv["id"], "nombre": sv["nombre"],
+            "descripcion": sv["descripcion"], "tipo_evento_id": sv["tipo_evento_id"],
+        })
+    for ops in snapshot.opciones_by_servicio.values():
+        for o in ops:
+            docs[("opcion", str(o["id"]))] = (o["nombre"] or "", _detalles_texto(o["detalles"]), {
+                "tipo": "opcion", "id": o["id"], "nombre": o["nombre"], "servicio_id": o["servicio_id"],
+                "moneda": o["moneda"], "monto": o["monto"],
+            })
+    return docs
+
+class CatalogSearchIndex:
+    def __init__(self, max_expansions: int = 50, fuzzy_min: float = 0.5):
+        self.max_expansions = max_expansions
+        self.fuzzy_min = fuzzy_min
+        # documentos por id interno (int: más barato de hashear/intersectar que (tipo, id))
+        self._ids: Dict[Key, int] = {}
+        self._docs: Dict[int, Tuple[str, str, Row, Dict[str, float]]] = {}
+        self._free: List[int] = []
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._vocab: List[str] = []
+        self._grams: Dict[str, Set[str]] = {}
+        self._vocab_dirty = False
+        self.last_sync: Dict[str, Any] = {}
+
+    # ---- mantenimiento ----
+
+    def _add(self, key: Key, nombre: str, texto: str, payload: Row) -> None:
+        doc = self._free.pop() if self._free else len(self._ids)
+        self._ids[key] = doc
+        weights: Dict[str, float] = dict.fromkeys(tokenize(texto), _WEIGHT_TEXTO)
+        weights.update(dict.fromkeys(tokenize(nombre), _WEIGHT_NOMBRE))
+        for term, w in weights.items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = {}
+                for g in trigrams(term):
+                    self._grams.setdefault(g, set()).add(term)
+                self._vocab_dirty = True
+            posting[doc] = w
+        self._docs[doc] = (nombre, texto, payload, weights)
+
+    def _remove(self, key: Key) -> None:
+        doc = self._ids.pop(key)
+        self._free.append(doc)
+        _, _, _, weights = self._docs.pop(doc)
+        for term in weights:
+            posting = self._postings[term]
+            posting.pop(doc, None)
+            if posting:
+                continue
+            del self._postings[term]
+            for g in trigrams(term):
+                terms = self._grams[g]
+                terms.discard(term)
+                if not terms:
+                    del self._grams[g]
+            self._vocab_dirty = True
+
+    def sync(self, docs: Dict[Key, Document]) -> Dict[str, Any]:
+        """Deja el índice igual a `docs` tocando solo lo que cambió"""
+        t0 = time.perf_counter()
+        added = updated = removed = 0
+        for key in [k for k in self._ids if k not in docs]:
+            self._remove(key)
+            removed += 1
+        for key, (nombre, texto, payload) in docs.items():
+            doc = self._ids.get(key)
+            current = self._docs[doc] if doc is not None else None
+            if current is None:
+                self._add(key, nombre, texto, payload)
+                added += 1
+            elif current[0] != nombre or current[1] != texto:
+                self._remove(key)
+                self._add(key, nombre, texto, payload)
+                updated += 1
+            elif current[2] != payload:
+                self._docs[doc] = (nombre, texto, payload, current[3])
+        if self._vocab_dirty:
+            self._vocab = sorted(self._postings)
+            self._vocab_dirty = False
+        self.last_sync = {"added": added, "updated": updated, "removed": removed,
+                          "ms": round((time.perf_counter() - t0) * 1000, 1)}
+        return self.last_sync
+
+    def synced(self, docs: Dict[Key, Document]) -> "CatalogSearchIndex":
+        """Copia sincronizada con `docs`; este índice (el publicado) no se toca.
+        Copiar es lineal pero mucho más barato que re-tokenizar todo el catálogo."""
+        new = CatalogSearchIndex(self.max_expansions, self.fuzzy_min)
+        new._ids = dict(self._ids)
+        new._docs = dict(self._docs)    # las tuplas y sus pesos no se mutan: se comparten
+        new._free = list(self._free)
+        new._postings = {term: dict(posting) for term, posting in self._postings.items()}
+        new._vocab = self._vocab         # sync() lo reemplaza (no lo muta) si cambia
+        new._grams = {g: set(terms) for g, terms in self._grams.items()}
+        new.sync(docs)
+        return new
+
+    # ---- consulta ----
+
+    def _expand(self, token: str) -> Dict[str, float]:
+        """término del vocabulario -> calidad de la coincidencia (exacto 1.0 > prefijo > parecido)"""
+        out: Dict[str, float] = {}
+        exact = token in self._postings
+        if exact:
+            out[token] = 1.0
+        if len(token) >= 2:
+            vocab = self._vocab
+            i = bisect_left(vocab, token)
+            n = 0
+            while i < len(vocab) and n < self.max_expansions and vocab[i].startswith(token):
+                term = vocab[i]
+                if term != token:
+                    out[term] = _PREFIX + (1 - _PREFIX) * 0.8 * len(token) / len(term)
+                    n += 1
+                i += 1
+        if not exact and len(token) >= 3:
+            grams = trigrams(token)
+            shared: Counter = Counter()
+            for g in grams:
+                shared.update(self._grams.get(g, ()))
+            for term, c in shared.items():
+                sim = 2.0 * c / (len(grams) + len(term) + 1)
+                if sim >= self.fuzzy_min and term not in out:
+                    out[term] = _FUZZY * sim
+        return out
+
+    def search(self, q: str, limit: int = 20, tipo: Optional[str] = None) -> List[Row]:
+        tokens = list(dict.fromkeys(tokenize(q)))[:8]
+        if not tokens:
+            return []
+        matched: List[List[Tuple[Dict[int, float], float]]] = []
+        for token in tokens:
+            exp = self._expand(token)
+            if not exp:
+                return []  # AND: un término sin coincidencias vacía el resultado
+            matched.append([(self._postings[t], quality) for t, quality in exp.items()])
+
+        # candidatos: intersección (en C) de los documentos de cada término, desde el más chico
+        docsets = sorted((p[0][0].keys() if len(p) == 1 else set().union(*(posting for posting, _ in p))
+                          for p in matched), key=len)
+        candidates = set(docsets[0])
+        for other in docsets[1:]:
+            candidates.intersection_update(other)
+        if tipo:
+            docs = self._docs
+            candidates = {d for d in candidates if docs[d][2]["tipo"] == tipo}
+        if not candidates:
+            return []
+
+        scores = dict.fromkeys(candidates, 0.0)
+        for postings in matched:
+            if len(postings) == 1:
+                posting, quality = postings[0]
+                for doc in scores:
+                    scores[doc] += posting[doc] * quality
+                continue
+            best: Dict[int, float] = {}
+            if sum(len(posting) for posting, _ in postings) <= len(scores) * len(postings):
+                for posting, quality in postings:
+                    for doc, w in posting.items():
+                        if w * quality > best.get(doc, 0.0):
+                            best[doc] = w * quality
+            else:
+                for doc in scores:
+                    best[doc] = max((posting[doc] * quality for posting, quality in postings if doc in posting),
+                                    default=0.0)
+            for doc in scores:
+                scores[doc] += best[doc]
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda kv: kv[1])
+        return [{**self._docs[doc][2], "score": round(score, 3)} for doc, score in top]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"documentos": len(self._docs), "terminos": len(self._postings),
+                "trigramas": len(self._grams), "last_sync": self.last_sync}
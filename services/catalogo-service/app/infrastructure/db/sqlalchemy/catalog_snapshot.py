@@ -0,0 +1,311 @@
+# services/catalogo-service/app/infrastructure/db/sqlalchemy/catalog_snapshot.py
+"""
+Snapshot en memoria del catálogo público (tipos, servicios, opciones con precio vigente y paquetes).
+- CatalogSnapshot es inmutable e indexado por los filtros de cada endpoint
+  (servicios por tipo_evento_id, opciones por servicio_id, paquete por id); las listas ya
+  vienen en el orden de la API, así limit/offset es un slice.
+- Versión = (ev_catalogo.catalogo_version.version, CURRENT_DATE()): los triggers de bootstrap.sql
+  suben el contador en cada INSERT/UPDATE/DELETE de las tablas de catálogo y paquetes, y el
+  cambio de día mueve los precios vigentes sin que nadie escriba.
+- CatalogStore sondea la versión cada CATALOG_SNAPSHOT_PROBE_SECONDS (una lectura por PK) y,
+  si cambió, reconstruye todo en una transacción de lectura y reemplaza la referencia:
+  las requests ven el snapshot anterior o el nuevo completo, nunca una mezcla. Las lecturas son
+  async; el armado (timelines, totales, listas de hoy) corre en un hilo para no frenar el loop.
+- Precios: historia completa en timelines (ev_shared.pricing). Las listas de hoy se precalculan;
+  con ?fecha= se resuelven para esa fecha sobre el mismo snapshot (bisect por opción/paquete).
+  Mismas reglas que v_opcion_con_precio_vigente / v_paquete_detalle.
+- Paquetes de hoy: se leen del read model ev_paquetes.paquete_total(_item), que la BD mantiene
+  por paquete afectado y reconstruye cada noche; con ?fecha= salen de los timelines.
+- Búsqueda (/buscar): con cada snapshot nuevo se sincroniza, en el mismo hilo de armado, una
+  copia del índice (solo se reindexan los documentos que cambiaron; ver catalog_search) y el
+  par (snapshot, índice) se publica con un único reemplazo de referencia.
+"""
+import asyncio
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import text
+
+from ev_shared.config import Settings, get_settings
+from ev_shared.db import async_session_scope
+from ev_shared.logger import get_logger
+from ev_shared.pricing import PackageItems, PriceIndex, build_package_index, load_option_prices, load_package_items
+
+from ...catalog_search import CatalogSearchIndex, snapshot_documents
+
+log = get_logger(__name__)
+
+Row = Dict[str, Any]
+Version = Tuple[int, date]
+
+_VERSION_SQL = text("SELECT version, CURRENT_DATE() FROM ev_catalogo.catalogo_version WHERE id = 1")
+
+_TIPOS_SQL = text("""
+    SELECT id, nombre, descripcion, status
+      FROM ev_catalogo.tipo_evento
+     WHERE is_deleted = 0 AND status = 1
+     ORDER BY created_at DESC
+""")
+
+_SERVICIOS_SQL = text("""
+    SELECT id, nombre, descripcion, tipo_evento_id, status
+      FROM ev_catalogo.servicio
+     WHERE is_deleted = 0 AND status = 1
+     ORDER BY created_at DESC
+""")
+
+_OPCIONES_SQL = text("""
+    SELECT id, servicio_id, nombre, detalles
+      FROM ev_catalogo.opcion_servicio
+     WHERE is_deleted = 0 AND status = 1
+     ORDER BY created_at DESC
+""")
+
+_PAQUETES_SQL = text("""
+    SELECT id, codigo, nombre, descripcion, status
+      FROM ev_paquetes.paquete
+     WHERE is_deleted = 0 AND status = 1
+     ORDER BY codigo
+""")
+
+# Read model materializado (bootstrap.sql: sp_paquete_total_*); una pasada por uq_pt_codigo
+_PAQUETE_TOTAL_SQL = text("""
+    SELECT paquete_id AS id, codigo, nombre, descripcion, status, moneda, monto_total, fecha_calculo
+      FROM ev_paquetes.paquete_total
+     ORDER BY codigo
+""")
+
+_PAQUETE_TOTAL_ITEMS_SQL = text("""
+    SELECT paquete_id, opcion_servicio_id, cantidad, moneda, precio_unit AS precio_unit_vigente
+      FROM ev_paquetes.paquete_total_item
+     ORDER BY paquete_id, item_id
+""")
+
+class CatalogSnapshot:
+    """Vista de solo lectura del catálogo en una versión; no se modifica después de construida"""
+
+    __slots__ = ("version", "etag", "built_at", "tipos", "servicios", "servicios_by_tipo", "option_prices",
+                 "package_prices", "_opciones", "_paquetes", "_items",
+                 "opciones_by_servicio", "paquetes", "paquete_by_id", "totales_materializados")
+
+    def __init__(self, version: Version, tipos: List[Row], servicios: List[Row], opciones: List[Row],
+                 option_prices: PriceIndex, paquetes: List[Row], items: PackageItems,
+                 totales: Optional[List[Row]] = None, totales_items: Optional[List[Row]] = None):
+        self.version = version
+        self.etag = f'"cat-{version[0]}-{version[1]:%Y%m%d}"'  # ETag fuerte de todas las rutas /v1/catalogo
+        self.built_at = datetime.now().isoformat(sep=" ", timespec="seconds")
+        self.tipos = tipos
+        self.servicios = servicios
+        self.servicios_by_tipo: Dict[str, List[Row]] = {}
+        for sv in servicios:
+            self.servicios_by_tipo.setdefault(str(sv["tipo_evento_id"]), []).append(sv)
+
+        self.option_prices = option_prices
+        self.package_prices = build_package_index(items, option_prices)
+        self._opciones: Dict[str, List[Row]] = {}
+        for o in opciones:
+            self._opciones.setdefault(str(o["servicio_id"]), []).append(o)
+        self._paquetes = paquetes
+        self._items = items
+
+        # precalculado para la fecha de la versión (CURRENT_DATE() de la BD): el caso común
+        today = version[1]
+        self.opciones_by_servicio = {sid: self._opciones_at(ops, today) for sid, ops in self._opciones.items()}
+        # paquetes de hoy: del read model si ya está calculado para esta fecha (el evento nocturno
+        # puede ir unos segundos detrás del cambio de día); si no, desde los timelines
+        self.totales_materializados = bool(totales) and all(t["fecha_calculo"] == today for t in totales)
+        if self.totales_materializados:
+            by_pkg: Dict[str, List[Row]] = {}
+            for it in totales_items or []:
+                pid = str(it.pop("paquete_id"))
+                by_pkg.setdefault(pid, []).append(it)
+            self.paquetes = [{k: v for k, v in t.items() if k != "fecha_calculo"} for t in totales]
+            self.paquete_by_id = {str(p["id"]): {**p, "items": by_pkg.get(str(p["id"]), [])} for p in self.paquetes}
+        else:
+            self.paquetes = self._paquetes_at(today)
+            self.paquete_by_id = {str(p["id"]): self._detalle_at(p, today) for p in self.paquetes}
+
+    def _opciones_at(self, opciones: List[Row], fecha: date) -> List[Row]:
+        out = []
+        for o, p in zip(opciones, self.option_prices.prices_at((o["id"], fecha) for o in opciones)):
+            if p is not None:
+                out.append({**o, "moneda": p[0], "monto": p[1]})
+        return out
+
+    def _paquetes_at(self, fecha: date) -> List[Row]:
+        out = []
+        for pk, p in zip(self._paquetes, self.package_prices.prices_at((pk["id"], fecha) for pk in self._paquetes)):
+            if p is not None:  # como el JOIN de v_paquete_detalle: sin ítems con precio no se expone
+                out.append({**pk, "moneda": p[0], "monto_total": p[1]})
+        return out
+
+    def _detalle_at(self, head: Row, fecha: date) -> Row:
+        items = self._items.get(str(head["id"]), [])
+        detalle = []
+        for (op, cantidad), p in zip(items, self.option_prices.prices_at((op, fecha) for op, _ in items)):
+            if p is not None:
+                detalle.append({"opcion_servicio_id": op, "cantidad": cantidad,
+                                "moneda": p[0], "precio_unit_vigente": p[1]})
+        return {**head, "items": detalle}
+
+    def opciones(self, servicio_id: str, fecha: Optional[date] = None) -> List[Row]:
+        """Opciones activas del servicio con precio en `fecha` (hoy si None)"""
+        if fecha is None or fecha == self.version[1]:
+            return self.opciones_by_servicio.get(servicio_id, [])
+        return self._opciones_at(self._opciones.get(servicio_id, []), fecha)
+
+    def paquetes_at(self, fecha: Optional[date] = None) -> List[Row]:
+        if fecha is None or fecha == self.version[1]:
+            return self.paquetes
+        return self._paquetes_at(fecha)
+
+    def paquete(self, paquete_id: str, fecha: Optional[date] = None) -> Optional[Row]:
+        if fecha is None or fecha == self.version[1]:
+            return self.paquete_by_id.get(paquete_id)
+        p = self.package_prices.price_at(paquete_id, fecha)
+        head = next((pk for pk in self._paquetes if str(pk["id"]) == paquete_id), None)
+        if p is None or head is None:
+            return None
+        return self._detalle_at({**head, "moneda": p[0], "monto_total": p[1]}, fecha)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version[0],
+            "fecha": self.version[1].isoformat(),
+            "built_at": self.built_at,
+            "tipos": len(self.tipos),
+            "servicios": len(self.servicios),
+            "opciones": sum(len(v) for v in self.opciones_by_servicio.values()),
+            "paquetes": len(self.paquetes),
+            "totales_materializados": self.totales_materializados,
+            "precios_opcion": len(self.option_prices),
+        }
+
+async def _read_version(s) -> Version:
+    row = (await s.execute(_VERSION_SQL)).first()
+    if row is None:  # bootstrap sin catalogo_version: solo el cambio de día refresca
+        return 0, (await s.execute(text("SELECT CURRENT_DATE()"))).scalar()
+    return int(row[0]), row[1]
+
+async def probe_version(settings: Settings) -> Version:
+    async with async_session_scope(settings, readonly=True) as s:
+        return await _read_version(s)
+
+def build_snapshot(version: Version, precios: List[Row], **rows: Any) -> CatalogSnapshot:
+    """Parte de CPU (timelines, paquetes, listas de hoy): corre en un hilo, fuera del event loop"""
+    return CatalogSnapshot(version, option_prices=PriceIndex.from_rows(precios), **rows)
+
+async def load_snapshot(settings: Settings) -> CatalogSnapshot:
+    """Lee todo en una transacción (REPEATABLE READ): la versión corresponde a los datos leídos.
+    Solo las lecturas corren en el loop; el armado va a asyncio.to_thread con la conexión ya liberada."""
+    async with async_session_scope(settings, readonly=True) as s:
+        async def rows(stmt, params=None) -> List[Row]:
+            return [dict(r) for r in (await s.execute(stmt, params or {})).mappings().all()]
+        version = await _read_version(s)
+        data = dict(
+            tipos=await rows(_TIPOS_SQL),
+            servicios=await rows(_SERVICIOS_SQL),
+            opciones=await rows(_OPCIONES_SQL),
+            precios=await load_option_prices(s),
+            paquetes=await rows(_PAQUETES_SQL),
+            items=await load_package_items(s),
+            totales=await rows(_PAQUETE_TOTAL_SQL),
+            totales_items=await rows(_PAQUETE_TOTAL_ITEMS_SQL),
+        )
+    return await asyncio.to_thread(build_snapshot, version, **data)
+
+class CatalogStore:
+    """Referencia al snapshot vigente + sondeo de versión en el event loop del servicio"""
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.interval = settings.CATALOG_SNAPSHOT_PROBE_SECONDS
+        # (snapshot, índice de búsqueda) de la misma versión: se reemplaza siempre como par
+        self._current: Optional[Tuple[CatalogSnapshot, CatalogSearchIndex]] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.rebuilds = 0
+        self.probe_errors = 0
+        self.last_build_ms: Optional[float] = None
+        self.last_probe: Optional[str] = None
+
+    async def refresh(self, force: bool = False) -> bool:
+        """Reconstruye si la versión cambió (o si force); True si hubo reemplazo"""
+        async with self._lock:
+            if not force and self._current is not None:
+                version = await probe_version(self.settings)
+                self.last_probe = datetime.now().isoformat(sep=" ", timespec="seconds")
+                if version == self._current[0].version:
+                    return False
+            t0 = time.perf_counter()
+            snapshot = await load_snapshot(self.settings)
+            previous = self._current[1] if self._current is not None else None
+            search = await asyncio.to_thread(self._build_search, previous, snapshot)
+            self.last_build_ms = round((time.perf_counter() - t0) * 1000, 1)
+            self._current = (snapshot, search)  # reemplazo atómico de la referencia
+            self.rebuilds += 1
+            log.info("Catálogo: snapshot %s en %s ms", snapshot.stats(), self.last_build_ms)
+            return True
+
+    def _build_search(self, previous: Optional[CatalogSearchIndex], snapshot: CatalogSnapshot) -> CatalogSearchIndex:
+        """En hilo: copia del índice publicado sincronizada con `snapshot` (nuevo si cambió la config)"""
+        expansions, fuzzy_min = self.settings.CATALOG_SEARCH_MAX_EXPANSIONS, self.settings.CATALOG_SEARCH_FUZZY_MIN
+        if previous is None or (previous.max_expansions, previous.fuzzy_min) != (expansions, fuzzy_min):
+            previous = CatalogSearchIndex(expansions, fuzzy_min)
+        return previous.synced(snapshot_documents(snapshot))
+
+    async def current_with_search(self) -> Tuple[CatalogSnapshot, CatalogSearchIndex]:
+        current = self._current
+        if current is None:  # primer uso sin start() o carga inicial fallida
+            await self.refresh()
+            current = self._current
+        return current
+
+    async def current(self) -> CatalogSnapshot:
+        return (await self.current_with_search())[0]
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception:
+                # se sigue sirviendo el snapshot anterior
+                self.probe_errors += 1
+                log.exception("Catálogo: fallo al refrescar el snapshot")
+
+    async def start(self) -> None:
+        try:
+            await self.refresh(force=True)
+        except Exception:
+            log.exception("Catálogo: carga inicial fallida; se reintenta en la primera request")
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "probe_seconds": self.interval,
+            "rebuilds": self.rebuilds,
+            "probe_errors": self.probe_errors,
+            "last_build_ms": self.last_build_ms,
+            "last_probe": self.last_probe,
+            "snapshot": self._current[0].stats() if self._current else None,
+            "search": self._current[1].stats() if self._current else None,
+        }
+
+_instance: Optional[CatalogStore] = None
+
+def get_catalog_store(settings: Optional[Settings] = None) -> CatalogStore:
+    global _instance
+    if _instance is None:
+        _instance = CatalogStore(settings or get_settings())
+    return _instance
@@ -1,8 +1,11 @@
+from datetime import date
 from typing import Dict, Any, List, Optional
 from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
 from ev_shared.config import Settings
-from ev_shared.db import session_scope
+from ev_shared.db import async_session_scope
+from ev_shared.pricing import load_option_index, load_package_index
+from ev_shared.profiles import attach_profiles
 
 # IMPORT corregido: NUNCA uses "contratacion-service" con guion en imports
 # Usa import absoluto dentro del paquete app (o relativo si prefieres).
@@ -11,41 +14,40 @@ from app.infrastructure.db.sqlalchemy.repositories import EmailOutboxSql
 
 # ========= Helpers de cálculo =========
 
-def _calcular_total_paquete(settings: Settings, paquete_id: str) -> Dict[str, Any]:
-    sql = text("""
-        SELECT paquete_id, moneda, monto_total_vigente
-        FROM ev_paquetes.v_paquete_precio_vigente_total
-        WHERE paquete_id = :pid
-        LIMIT 1
-    """)
-    with session_scope(settings) as s:
-        row = s.execute(sql, {"pid": paquete_id}).mappings().first()
-        if not row:
-            raise ValueError("PAQUETE_SIN_PRECIO_VIGENTE")
-        return dict(row)
+def _fecha(value: Any) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+async def _calcular_total_paquete(settings: Settings, paquete_id: str, fecha: date) -> Dict[str, Any]:
+    # Total del paquete vigente en la fecha del evento (timeline de precios, ev_shared.pricing)
+    async with async_session_scope(settings) as s:
+        precios = await load_package_index(s, [paquete_id])
+    precio = precios.price_at(paquete_id, fecha)
+    if precio is None:
+        raise ValueError("PAQUETE_SIN_PRECIO_VIGENTE")
+    return {"paquete_id": paquete_id, "moneda": precio[0], "monto_total_vigente": precio[1]}
 
 
-def _calcular_items_custom(settings: Settings, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+async def _precios_opciones(settings: Settings, ids: List[str], fecha: date) -> Dict[str, Dict[str, Any]]:
+    """Precio por opción vigente en `fecha`; falla si alguna no tiene"""
+    async with async_session_scope(settings) as s:
+        precios = await load_option_index(s, ids)
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for op, precio in zip(ids, precios.prices_at((op, fecha) for op in ids)):
+        if precio is None:
+            raise ValueError("OPCION_SIN_PRECIO_VIGENTE")
+        by_id[op] = {"opcion_servicio_id": op, "moneda": precio[0], "monto": precio[1]}
+    return by_id
+
+
+async def _calcular_items_custom(settings: Settings, items: List[Dict[str, Any]], fecha: date) -> Dict[str, Any]:
     if not items:
         raise ValueError("ITEMS_VACIOS")
 
     ids = [it["opcion_servicio_id"] for it in items]
-    placeholders = ",".join([f":id{i}" for i in range(len(ids))])
-
-    sql = text(f"""
-        SELECT opcion_id AS opcion_servicio_id, moneda, monto
-        FROM ev_catalogo.v_opcion_con_precio_vigente
-        WHERE opcion_id IN ({placeholders})
-    """)
-    params = {f"id{i}": ids[i] for i in range(len(ids))}
-
-    with session_scope(settings) as s:
-        rows = s.execute(sql, params).mappings().all()
-        if not rows or len(rows) != len(ids):
-            raise ValueError("OPCION_SIN_PRECIO_VIGENTE")
-        by_id = {r["opcion_servicio_id"]: dict(r) for r in rows}
+    by_id = await _precios_opciones(settings, ids, fecha)
 
-    moneda = rows[0]["moneda"]
+    moneda = by_id[ids[0]]["moneda"]
     items_calc: List[Dict[str, Any]] = []
     total = 0.0
 
@@ -67,8 +69,8 @@ def _calcular_items_custom(settings: Settings, items: List[Dict[str, Any]]) -> D
 
 # ========= Casos de uso (Cliente) =========
 
-def crear_pedido_desde_paquete(settings: Settings, cliente_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-    tot = _calcular_total_paquete(settings, payload["paquete_id"])
+async def crear_pedido_desde_paquete(settings: Settings, cliente_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    tot = await _calcular_total_paquete(settings, payload["paquete_id"], _fecha(payload["fecha_evento"]))
     status_inicial = 1  # COTIZADO
 
     sql_tipo = text("""
@@ -98,15 +100,15 @@ def crear_pedido_desde_paquete(settings: Settings, cliente_id: str, payload: Dic
         VALUES (UUID(), :pedido_id, 2, :paquete_id, 1, :precio_unit, :precio_total, CURRENT_TIMESTAMP)
     """)
 
-    with session_scope(settings) as s:
-        trow = s.execute(sql_tipo, {"pid": payload["paquete_id"]}).first()
+    async with async_session_scope(settings) as s:
+        trow = (await s.execute(sql_tipo, {"pid": payload["paquete_id"]})).first()
         if not trow:
             raise ValueError("PAQUETE_SIN_ITEMS")
 
         tipo_evento_id = trow[0]
 
         try:
-            s.execute(sql_insert_pedido, {
+            await s.execute(sql_insert_pedido, {
                 "cliente_id": cliente_id,
                 "tipo_evento_id": tipo_evento_id,
                 "fecha_evento": payload["fecha_evento"],
@@ -120,15 +122,15 @@ def crear_pedido_desde_paquete(settings: Settings, cliente_id: str, payload: Dic
                 "request_id": payload.get("request_id"),
             })
         except IntegrityError:
-            row = s.execute(sql_get_by_req, {"req": payload.get("request_id")}).mappings().first()
+            row = (await s.execute(sql_get_by_req, {"req": payload.get("request_id")})).mappings().first()
             if row:
                 return dict(row)
             raise
 
-        prow = s.execute(sql_get_by_req, {"req": payload.get("request_id")}).mappings().first()
+        prow = (await s.execute(sql_get_by_req, {"req": payload.get("request_id")})).mappings().first()
         pedido_id = prow["id"]
 
-        s.execute(sql_insert_item, {
+        await s.execute(sql_insert_item, {
             "pedido_id": pedido_id,
             "paquete_id": payload["paquete_id"],
             "precio_unit": float(tot["monto_total_vigente"]),
@@ -138,8 +140,8 @@ def crear_pedido_desde_paquete(settings: Settings, cliente_id: str, payload: Dic
         return dict(prow)
 
 
-def crear_pedido_custom(settings: Settings, cliente_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-    calc = _calcular_items_custom(settings, [dict(x) for x in payload["items"]])
+async def crear_pedido_custom(settings: Settings, cliente_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    calc = await _calcular_items_custom(settings, [dict(x) for x in payload["items"]], _fecha(payload["fecha_evento"]))
     status_inicial = 1 if calc["total"] > 0 else 0  # COTIZADO si hay total; DRAFT si no
 
     sql_insert_pedido = text("""
@@ -160,9 +162,9 @@ def crear_pedido_custom(settings: Settings, cliente_id: str, payload: Dict[str,
         VALUES (UUID(), :pedido_id, 1, :opcion_servicio_id, :cantidad, :precio_unit, :precio_total, CURRENT_TIMESTAMP)
     """)
 
-    with session_scope(settings) as s:
+    async with async_session_scope(settings) as s:
         try:
-            s.execute(sql_insert_pedido, {
+            await s.execute(sql_insert_pedido, {
                 "cliente_id": cliente_id,
                 "tipo_evento_id": payload["tipo_evento_id"],
                 "fecha_evento": payload["fecha_evento"],
@@ -176,16 +178,16 @@ def crear_pedido_custom(settings: Settings, cliente_id: str, payload: Dict[str,
                 "request_id": payload.get("request_id"),
             })
         except IntegrityError:
-            row = s.execute(sql_get_by_req, {"req": payload.get("request_id")}).mappings().first()
+            row = (await s.execute(sql_get_by_req, {"req": payload.get("request_id")})).mappings().first()
             if row:
                 return dict(row)
             raise
 
-        prow = s.execute(sql_get_by_req, {"req": payload.get("request_id")}).mappings().first()
+        prow = (await s.execute(sql_get_by_req, {"req": payload.get("request_id")})).mappings().first()
         pedido_id = prow["id"]
 
         for it in calc["items_calculados"]:
-            s.execute(sql_insert_item, {
+            await s.execute(sql_insert_item, {
                 "pedido_id": pedido_id,
                 "opcion_servicio_id": it["opcion_servicio_id"],
                 "cantidad": it["cantidad"],
@@ -196,20 +198,27 @@ def crear_pedido_custom(settings: Settings, cliente_id: str, payload: Dict[str,
         return dict(prow)
 
 
-def listar_mis_pedidos(settings: Settings, cliente_id: str) -> List[Dict[str, Any]]:
-    sql = text("""
-        SELECT * FROM ev_contratacion.v_pedido_con_cliente
+# Columnas de v_pedido_con_cliente salvo las del cliente, que llegan de IAM (ev_shared.profiles)
+_PEDIDO_COLUMNS = """
+    id, cliente_id, tipo_evento_id, fecha_evento, hora_inicio, hora_fin,
+    ubicacion, monto_total, moneda, status, correlation_id, created_at, updated_at
+"""
+
+
+async def listar_mis_pedidos(settings: Settings, cliente_id: str) -> List[Dict[str, Any]]:
+    sql = text(f"""
+        SELECT {_PEDIDO_COLUMNS} FROM ev_contratacion.pedido_evento
         WHERE cliente_id = :uid
         ORDER BY created_at DESC
     """)
-    with session_scope(settings) as s:
-        rows = s.execute(sql, {"uid": cliente_id}).mappings().all()
-        return [dict(r) for r in rows]
+    async with async_session_scope(settings, readonly=True) as s:
+        rows = (await s.execute(sql, {"uid": cliente_id})).mappings().all()
+    return await attach_profiles(settings, [dict(r) for r in rows])
 
 
-def obtener_pedido(settings: Settings, cliente_id: str, pedido_id: str) -> Dict[str, Any]:
-    sql_pedido = text("""
-        SELECT * FROM ev_contratacion.v_pedido_con_cliente
+async def obtener_pedido(settings: Settings, cliente_id: str, pedido_id: str) -> Dict[str, Any]:
+    sql_pedido = text(f"""
+        SELECT {_PEDIDO_COLUMNS} FROM ev_contratacion.pedido_evento
         WHERE id = :pid AND cliente_id = :uid
         LIMIT 1
     """)
@@ -219,25 +228,26 @@ def obtener_pedido(settings: Settings, cliente_id: str, pedido_id: str) -> Dict[
         WHERE pedido_id = :pid
         ORDER BY created_at ASC
     """)
-    with session_scope(settings) as s:
-        p = s.execute(sql_pedido, {"pid": pedido_id, "uid": cliente_id}).mappings().first()
+    async with async_session_scope(settings) as s:
+        p = (await s.execute(sql_pedido, {"pid": pedido_id, "uid": cliente_id})).mappings().first()
         if not p:
             raise ValueError("PEDIDO_NO_ENCONTRADO")
-        items = s.execute(sql_items, {"pid": pedido_id}).mappings().all()
+        items = (await s.execute(sql_items, {"pid": pedido_id})).mappings().all()
         data = dict(p)
         data["items"] = [dict(i) for i in items]
-        return data
+    (data,) = await attach_profiles(settings, [data])
+    return data
 
 
-def enviar_resumen_pedido(settings: Settings, cliente_id: str, pedido_id: str, to_email: str) -> Dict[str, Any]:
-    ped = obtener_pedido(settings, cliente_id, pedido_id)
+async def enviar_resumen_pedido(settings: Settings, cliente_id: str, pedido_id: str, to_email: str) -> Dict[str, Any]:
+    ped = await obtener_pedido(settings, cliente_id, pedido_id)
     body = f"""
     Resumen de pedido #{ped['id']}
     Fecha: {ped['fecha_evento']} - {ped['hora_inicio']}
     Ubicación: {ped['ubicacion']}
     Total: {ped['moneda']} {ped['monto_total']}
     """
-    out = EmailOutboxSql(settings).enqueue(
+    out = await EmailOutboxSql(settings).enqueue(
         to_email=to_email,
         subject=f"Resumen de pedido {ped['id']}",
         body=body,
@@ -251,14 +261,14 @@ def enviar_resumen_pedido(settings: Settings, cliente_id: str, pedido_id: str, t
 
 # ========= Admin helpers =========
 
-def _get_pedido_row(settings: Settings, pedido_id: str) -> Optional[Dict[str, Any]]:
+async def _get_pedido_row(settings: Settings, pedido_id: str) -> Optional[Dict[str, Any]]:
     sql = text("SELECT * FROM ev_contratacion.pedido_evento WHERE id=:id LIMIT 1")
-    with session_scope(settings) as s:
-        row = s.execute(sql, {"id": pedido_id}).mappings().first()
+    async with async_session_scope(settings) as s:
+        row = (await s.execute(sql, {"id": pedido_id})).mappings().first()
         return dict(row) if row else None
 
 
-def _recalcular_total_pedido(settings: Settings, pedido_id: str) -> Dict[str, Any]:
+async def _recalcular_total_pedido(settings: Settings, pedido_id: str) -> Dict[str, Any]:
     sql_sum = text("""
         SELECT COALESCE(SUM(precio_total),0) AS total
         FROM ev_contratacion.item_pedido_evento
@@ -270,11 +280,11 @@ def _recalcular_total_pedido(settings: Settings, pedido_id: str) -> Dict[str, An
          WHERE id = :pid
          LIMIT 1
     """)
-    with session_scope(settings) as s:
-        total = s.execute(sql_sum, {"pid": pedido_id}).scalar() or 0.0
-        s.execute(sql_upd, {"pid": pedido_id, "total": float(total)})
-        row = s.execute(text("SELECT * FROM ev_contratacion.pedido_evento WHERE id=:id LIMIT 1"),
-                        {"id": pedido_id}).mappings().first()
+    async with async_session_scope(settings) as s:
+        total = (await s.execute(sql_sum, {"pid": pedido_id})).scalar() or 0.0
+        await s.execute(sql_upd, {"pid": pedido_id, "total": float(total)})
+        row = (await s.execute(text("SELECT * FROM ev_contratacion.pedido_evento WHERE id=:id LIMIT 1"),
+                                {"id": pedido_id})).mappings().first()
         out = dict(row) if row else {"id": pedido_id, "monto_total": float(total)}
     return out
 
@@ -290,8 +300,8 @@ _ALLOWED = {
     5: set(),   # CANCELADO
 }
 
-def admin_cambiar_estado(settings: Settings, pedido_id: str, nuevo_estado: int) -> Dict[str, Any]:
-    ped = _get_pedido_row(settings, pedido_id)
+async def admin_cambiar_estado(settings: Settings, pedido_id: str, nuevo_estado: int) -> Dict[str, Any]:
+    ped = await _get_pedido_row(settings, pedido_id)
     if not ped:
         raise ValueError("PEDIDO_NO_ENCONTRADO")
 
@@ -302,42 +312,29 @@ def admin_cambiar_estado(settings: Settings, pedido_id: str, nuevo_estado: int)
     if nuevo_estado >= 2 and float(ped.get("monto_total", 0)) <= 0:
         raise ValueError("TOTAL_INVALIDO")
 
-    with session_scope(settings) as s:
-        s.execute(text("""
+    async with async_session_scope(settings) as s:
+        await s.execute(text("""
             UPDATE ev_contratacion.pedido_evento
                SET status=:st
              WHERE id=:id
              LIMIT 1
         """), {"st": int(nuevo_estado), "id": pedido_id})
-        row = s.execute(text("SELECT * FROM ev_contratacion.pedido_evento WHERE id=:id LIMIT 1"),
-                        {"id": pedido_id}).mappings().first()
+        row = (await s.execute(text("SELECT * FROM ev_contratacion.pedido_evento WHERE id=:id LIMIT 1"),
+                                {"id": pedido_id})).mappings().first()
         return dict(row)
 
 
 # ========= Admin: agregar / eliminar ítems =========
 
-def admin_agregar_items(settings: Settings, pedido_id: str, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+async def admin_agregar_items(settings: Settings, pedido_id: str, items: List[Dict[str, Any]]) -> Dict[str, Any]:
     if not items:
         raise ValueError("ITEMS_VACIOS")
-    ped = _get_pedido_row(settings, pedido_id)
+    ped = await _get_pedido_row(settings, pedido_id)
     if not ped:
         raise ValueError("PEDIDO_NO_ENCONTRADO")
 
     ids = [it["opcion_servicio_id"] for it in items]
-    placeholders = ",".join([f":id{i}" for i in range(len(ids))])
-
-    sql_precio = text(f"""
-        SELECT opcion_id AS opcion_servicio_id, moneda, monto
-        FROM ev_catalogo.v_opcion_con_precio_vigente
-        WHERE opcion_id IN ({placeholders})
-    """)
-    params = {f"id{i}": ids[i] for i in range(len(ids))}
-
-    with session_scope(settings) as s:
-        rows = s.execute(sql_precio, params).mappings().all()
-        if not rows or len(rows) != len(ids):
-            raise ValueError("OPCION_SIN_PRECIO_VIGENTE")
-        by_id = {r["opcion_servicio_id"]: dict(r) for r in rows}
+    by_id = await _precios_opciones(settings, ids, _fecha(ped["fecha_evento"]))
 
     sql_ins = text("""
         INSERT INTO ev_contratacion.item_pedido_evento
@@ -345,21 +342,21 @@ def admin_agregar_items(settings: Settings, pedido_id: str, items: List[Dict[str
         VALUES (UUID(), :pid, 1, :ref, :cant, :unit, :tot, CURRENT_TIMESTAMP)
     """)
 
-    with session_scope(settings) as s:
+    async with async_session_scope(settings) as s:
         for it in items:
             ref = it["opcion_servicio_id"]
             cant = int(it.get("cantidad", 1))
             unit = float(by_id[ref]["monto"])
             tot  = unit * cant
-            s.execute(sql_ins, {"pid": pedido_id, "ref": ref, "cant": cant, "unit": unit, "tot": tot})
+            await s.execute(sql_ins, {"pid": pedido_id, "ref": ref, "cant": cant, "unit": unit, "tot": tot})
 
-    return _recalcular_total_pedido(settings, pedido_id)
+    return await _recalcular_total_pedido(settings, pedido_id)
 
 
-def admin_eliminar_items(settings: Settings, pedido_id: str, item_ids: List[str]) -> Dict[str, Any]:
+async def admin_eliminar_items(settings: Settings, pedido_id: str, item_ids: List[str]) -> Dict[str, Any]:
     if not item_ids:
         raise ValueError("ITEM_IDS_VACIOS")
-    ped = _get_pedido_row(settings, pedido_id)
+    ped = await _get_pedido_row(settings, pedido_id)
     if not ped:
         raise ValueError("PEDIDO_NO_ENCONTRADO")
 
@@ -373,15 +370,15 @@ def admin_eliminar_items(settings: Settings, pedido_id: str, item_ids: List[str]
            AND id IN ({placeholders})
     """)
 
-    with session_scope(settings) as s:
-        s.execute(sql_del, params)
+    async with async_session_scope(settings) as s:
+        await s.execute(sql_del, params)
 
-    return _recalcular_total_pedido(settings, pedido_id)
+    return await _recalcular_total_pedido(settings, pedido_id)
 
 
 # ========= Admin: asignar proveedor =========
 
-def _hay_conflicto_asignacion(settings: Settings, proveedor_id: str, inicio: str, fin: str) -> bool:
+async def _hay_conflicto_asignacion(settings: Settings, proveedor_id: str, inicio: str, fin: str) -> bool:
     """
     Conflicto con reservas CONFIRMADAS en contratación.
     Tabla y columnas reales: ev_contratacion.reserva (inicio, fin, status=1)
@@ -394,12 +391,12 @@ def _hay_conflicto_asignacion(settings: Settings, proveedor_id: str, inicio: str
            AND NOT (:fin <= inicio OR :ini >= fin)
          LIMIT 1
     """)
-    with session_scope(settings) as s:
-        r = s.execute(sql_conf, {"prov": proveedor_id, "ini": inicio, "fin": fin}).first()
+    async with async_session_scope(settings) as s:
+        r = (await s.execute(sql_conf, {"prov": proveedor_id, "ini": inicio, "fin": fin})).first()
         return bool(r)
 
 
-def _hold_valido(settings: Settings, hold_id: str, proveedor_id: str, inicio: str, fin: str) -> bool:
+async def _hold_valido(settings: Settings, hold_id: str, proveedor_id: str, inicio: str, fin: str) -> bool:
     """
     Valida un hold activo/confirmado que no haya expirado y solape.
     Tabla real: ev_proveedores.reserva_temporal (inicio, fin, expira_en, status)
@@ -414,15 +411,15 @@ def _hold_valido(settings: Settings, hold_id: str, proveedor_id: str, inicio: st
            AND NOT (:fin <= inicio OR :ini >= fin)
          LIMIT 1
     """)
-    with session_scope(settings) as s:
-        r = s.execute(sql, {"hid": hold_id, "prov": proveedor_id, "ini": inicio, "fin": fin}).first()
+    async with async_session_scope(settings) as s:
+        r = (await s.execute(sql, {"hid": hold_id, "prov": proveedor_id, "ini": inicio, "fin": fin})).first()
         return bool(r)
 
 
-def admin_asignar_proveedor(settings: Settings, pedido_id: str,
-                            proveedor_id: str, fecha_inicio: str, fecha_fin: str,
-                            hold_id: Optional[str] = None) -> Dict[str, Any]:
-    ped = _get_pedido_row(settings, pedido_id)
+async def admin_asignar_proveedor(settings: Settings, pedido_id: str,
+                                  proveedor_id: str, fecha_inicio: str, fecha_fin: str,
+                                  hold_id: Optional[str] = None) -> Dict[str, Any]:
+    ped = await _get_pedido_row(settings, pedido_id)
     if not ped:
         raise ValueError("PEDIDO_NO_ENCONTRADO")
 
@@ -430,10 +427,10 @@ def admin_asignar_proveedor(settings: Settings, pedido_id: str,
     if int(ped["status"]) < 2:
         raise ValueError("ESTADO_NO_PERMITE_ASIGNACION")
 
-    if hold_id and not _hold_valido(settings, hold_id, proveedor_id, fecha_inicio, fecha_fin):
+    if hold_id and not await _hold_valido(settings, hold_id, proveedor_id, fecha_inicio, fecha_fin):
         raise ValueError("HOLD_INVALIDO")
 
-    if _hay_conflicto_asignacion(settings, proveedor_id, fecha_inicio, fecha_fin):
+    if await _hay_conflicto_asignacion(settings, proveedor_id, fecha_inicio, fecha_fin):
         raise ValueError("CONFLICTO_PROVEEDOR")
 
     # La tabla ev_contratacion.reserva exige item_pedido_id.
@@ -445,8 +442,8 @@ def admin_asignar_proveedor(settings: Settings, pedido_id: str,
          ORDER BY created_at ASC
          LIMIT 1
     """)
-    with session_scope(settings) as s:
-        item = s.execute(sql_item, {"pid": pedido_id}).mappings().first()
+    async with async_session_scope(settings) as s:
+        item = (await s.execute(sql_item, {"pid": pedido_id})).mappings().first()
         if not item:
             raise ValueError("PEDIDO_SIN_ITEMS")
 
@@ -455,7 +452,7 @@ def admin_asignar_proveedor(settings: Settings, pedido_id: str,
                 (id, item_pedido_id, proveedor_id, inicio, fin, status, hold_id, created_at)
             VALUES (UUID(), :item_id, :prov, :ini, :fin, 1, :hold, CURRENT_TIMESTAMP)
         """)
-        s.execute(sql_ins, {
+        await s.execute(sql_ins, {
             "item_id": item["id"],
             "prov": proveedor_id,
             "ini": fecha_inicio,
@@ -463,13 +460,13 @@ def admin_asignar_proveedor(settings: Settings, pedido_id: str,
             "hold": hold_id,
         })
 
-        s.execute(text("""
+        await s.execute(text("""
             UPDATE ev_contratacion.pedido_evento
                SET status = 3            -- ASIGNADO
              WHERE id = :pid
              LIMIT 1
         """), {"pid": pedido_id})
 
-        row = s.execute(text("SELECT * FROM ev_contratacion.pedido_evento WHERE id=:id LIMIT 1"),
-                        {"id": pedido_id}).mappings().first()
+        row = (await s.execute(text("SELECT * FROM ev_contratacion.pedido_evento WHERE id=:id LIMIT 1"),
+                                {"id": pedido_id})).mappings().first()
         return dict(row)
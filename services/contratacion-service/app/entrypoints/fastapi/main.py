@@ -1,9 +1,10 @@
 # created by emeday 2025 - corrected hex alignment
 from fastapi import FastAPI
 from fastapi.openapi.utils import get_openapi  # 👈 añade esto
-from ev_shared.config import load_settings, Settings
+from ev_shared.config import load_settings, install_reload_signal, Settings
 from ev_shared.logger import get_logger
 from ev_shared.http_debug import build_debug_router
+from ev_shared.db import dispose_engines, dispose_async_engines
 from .router import build_api_router  # Asegúrate que router.py exporte esta función
 
 settings: Settings = load_settings(service_name="contratacion-service")
@@ -30,3 +31,10 @@ app.include_router(build_debug_router(settings), prefix="/contratacion/_debug")
 @app.on_event("startup")
 async def on_startup():
     log.info("Starting %s on %s:%s", settings.SERVICE_NAME, settings.APP_HOST, settings.APP_PORT)
+    if install_reload_signal():
+        log.info("Settings: recarga con SIGHUP habilitada")
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    dispose_engines()
+    await dispose_async_engines()
@@ -2,7 +2,7 @@
 
 from typing import Dict, Any
 from fastapi import APIRouter, HTTPException, status, Depends
-from ev_shared.config import Settings
+from ev_shared.config import Settings, get_settings
 
 # === DTOs (entrypoint) ===
 from .schemas import (
@@ -20,17 +20,14 @@ from .schemas import (
 )
 
 # === Seguridad (entrypoint) ===
-from .security import get_current_user, require_role
+from ev_shared.security.permissions import Perm, require_permission
+from .security import get_current_user
 
 # === Casos de uso (application/commands) — aquí está tu SQL real ===
 from ...application import commands
 
 router = APIRouter(tags=["contratacion"])
 
-# Callable para evitar que FastAPI intente documentar Settings en OpenAPI
-def get_settings() -> Settings:
-    return Settings()
-
 # --- Infra ---
 @router.get(
     "/health",
@@ -38,7 +35,7 @@ def get_settings() -> Settings:
     operation_id="contratacion_health",
     openapi_extra={"security": []},
 )
-def health():
+async def health():
     """Ping rápido sin tocar DB."""
     return {"status": "ok"}
 
@@ -54,7 +51,7 @@ def health():
     operation_id="contratacion_crear_pedido",
     openapi_extra={"security": [{"HTTPBearer": []}]},
 )
-def crear_pedido(
+async def crear_pedido(
     body: Dict[str, Any],
     settings: Settings = Depends(get_settings),
     user: Dict[str, Any] = Depends(get_current_user),
@@ -67,10 +64,10 @@ def crear_pedido(
     try:
         if "paquete_id" in body:
             payload = CrearPedidoDesdePaquete(**body).model_dump()
-            return commands.crear_pedido_desde_paquete(settings, user["id"], payload)
+            return await commands.crear_pedido_desde_paquete(settings, user["id"], payload)
         else:
             payload = CrearPedidoCustom(**body).model_dump()
-            return commands.crear_pedido_custom(settings, user["id"], payload)
+            return await commands.crear_pedido_custom(settings, user["id"], payload)
     except ValueError as e:
         # errores de validación de negocio
         raise HTTPException(status_code=400, detail={"code": str(e)})
@@ -84,11 +81,11 @@ def crear_pedido(
     operation_id="contratacion_listar_mis_pedidos",
     openapi_extra={"security": [{"HTTPBearer": []}]},
 )
-def mis_pedidos(
+async def mis_pedidos(
     settings: Settings = Depends(get_settings),
     user: Dict[str, Any] = Depends(get_current_user),
 ):
-    data = commands.listar_mis_pedidos(settings, user["id"])
+    data = await commands.listar_mis_pedidos(settings, user["id"])
     return {"items": data}
 
 
@@ -98,13 +95,13 @@ def mis_pedidos(
     operation_id="contratacion_detalle_pedido",
     openapi_extra={"security": [{"HTTPBearer": []}]},
 )
-def detalle_pedido(
+async def detalle_pedido(
     pedido_id: str,
     settings: Settings = Depends(get_settings),
     user: Dict[str, Any] = Depends(get_current_user),
 ):
     try:
-        return commands.obtener_pedido(settings, user["id"], pedido_id)
+        return await commands.obtener_pedido(settings, user["id"], pedido_id)
     except ValueError:
         raise HTTPException(status_code=404, detail={"code": "PEDIDO_NO_ENCONTRADO"})
 
@@ -116,14 +113,14 @@ def detalle_pedido(
     operation_id="contratacion_enviar_resumen",
     openapi_extra={"security": [{"HTTPBearer": []}]},
 )
-def enviar_resumen(
+async def enviar_resumen(
     pedido_id: str,
     body: EnviarResumenRequest,
     settings: Settings = Depends(get_settings),
     user: Dict[str, Any] = Depends(get_current_user),
 ):
     try:
-        return commands.enviar_resumen_pedido(settings, user["id"], pedido_id, body.to_email)
+        return await commands.enviar_resumen_pedido(settings, user["id"], pedido_id, body.to_email)
     except ValueError:
         raise HTTPException(status_code=404, detail={"code": "PEDIDO_NO_ENCONTRADO"})
     except Exception:
@@ -139,14 +136,14 @@ def enviar_resumen(
     operation_id="contratacion_admin_patch_estado",
     openapi_extra={"security": [{"HTTPBearer": []}]},
 )
-def admin_patch_estado(
+async def admin_patch_estado(
     pedido_id: str,
     body: AdminPatchEstadoRequest,
     settings: Settings = Depends(get_settings),
-    admin=Depends(require_role("admin")),
+    admin=Depends(require_permission(Perm.PEDIDOS_GESTIONAR)),
 ):
     try:
-        return commands.admin_cambiar_estado(settings, pedido_id, body.estado)
+        return await commands.admin_cambiar_estado(settings, pedido_id, body.estado)
     except ValueError as e:
         msg = str(e)
         if msg.startswith("TRANSICION_INVALIDA") or msg in ("TOTAL_INVALIDO",):
@@ -162,15 +159,15 @@ def admin_patch_estado(
     operation_id="contratacion_admin_add_items",
     openapi_extra={"security": [{"HTTPBearer": []}]},
 )
-def admin_add_items(
+async def admin_add_items(
     pedido_id: str,
     body: AdminAddItemsRequest,
     settings: Settings = Depends(get_settings),
-    admin=Depends(require_role("admin")),
+    admin=Depends(require_permission(Perm.PEDIDOS_GESTIONAR)),
 ):
     try:
         payload = [i.model_dump() for i in body.items]
-        return commands.admin_agregar_items(settings, pedido_id, payload)
+        return await commands.admin_agregar_items(settings, pedido_id, payload)
     except ValueError as e:
         msg = str(e)
         if msg in ("ITEMS_VACIOS", "OPCION_SIN_PRECIO_VIGENTE"):
@@ -186,14 +183,14 @@ def admin_add_items(
     operation_id="contratacion_admin_delete_items",
     openapi_extra={"security": [{"HTTPBearer": []}]},
 )
-def admin_delete_items(
+async def admin_delete_items(
     pedido_id: str,
     body: AdminDeleteItemsRequest,
     settings: Settings = Depends(get_settings),
-    admin=Depends(require_role("admin")),
+    admin=Depends(require_permission(Perm.PEDIDOS_GESTIONAR)),
 ):
     try:
-        return commands.admin_eliminar_items(settings, pedido_id, body.item_ids)
+        return await commands.admin_eliminar_items(settings, pedido_id, body.item_ids)
     except ValueError as e:
         msg = str(e)
         if msg in ("ITEM_IDS_VACIOS",):
@@ -209,14 +206,14 @@ def admin_delete_items(
     operation_id="contratacion_admin_asignar_proveedor",
     openapi_extra={"security": [{"HTTPBearer": []}]},
 )
-def admin_asignar_proveedor(
+async def admin_asignar_proveedor(
     pedido_id: str,
     body: AdminAsignarProveedorRequest,
     settings: Settings = Depends(get_settings),
-    admin=Depends(require_role("admin")),
+    admin=Depends(require_permission(Perm.PEDIDOS_ASIGNAR)),
 ):
     try:
-        return commands.admin_asignar_proveedor(
+        return await commands.admin_asignar_proveedor(
             settings,
             pedido_id=pedido_id,
             proveedor_id=body.proveedor_id,
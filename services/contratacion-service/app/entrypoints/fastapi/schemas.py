@@ -45,7 +45,7 @@ class ItemPedidoOut(BaseModel):
     created_at: datetime
 
 class PedidoEventoOut(BaseModel):
-    # columnas de ev_contratacion.v_pedido_con_cliente
+    # columnas de ev_contratacion.pedido_evento + perfil del cliente (ev_shared.profiles)
     id: str
     cliente_id: str
     cliente_email: Optional[str] = None
@@ -1,47 +1,33 @@
 # entrypoints/fastapi/security.py — Contratación
 from typing import Any, Dict, Optional
-from fastapi import Depends, HTTPException, Header, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt, JWTError
-from ev_shared.config import Settings
-
-# Mantenemos el esquema Bearer para que Swagger muestre "Authorize"
-bearer_scheme = HTTPBearer(auto_error=True)
+from fastapi import Depends, HTTPException, Header, Request
+from fastapi.security import HTTPAuthorizationCredentials
+from ev_shared.config import Settings, get_settings
+from ev_shared.security.auth import (
+    bearer_scheme,  # Mantenemos el esquema Bearer para que Swagger muestre "Authorize"
+    decode_token,
+    request_claims,
+    require_claims,
+    to_user,
+)
 
 # --- Compat: tu helper actual (no lo quitamos) ---
 def require_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    settings: Settings = Depends(lambda: Settings()),
+    settings: Settings = Depends(get_settings),
 ) -> Dict[str, Any]:
-    token = credentials.credentials
-    secret = getattr(settings, "JWT_SECRET", None)
-    algo = getattr(settings, "JWT_ALG", getattr(settings, "JWT_ALGORITHM", "HS256"))
-    if not secret:
-        raise HTTPException(status_code=500, detail="JWT configuration missing (JWT_SECRET).")
-    try:
-        payload = jwt.decode(token, secret, algorithms=[algo])
-        return payload
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Token inválido o expirado")
+    return request_claims(request, settings, credentials.credentials)
 
 # --- Requeridos por router.py ---
 def _decode_token(settings: Settings, token: str) -> Dict[str, Any]:
-    secret = getattr(settings, "JWT_SECRET", None)
-    algo = getattr(settings, "JWT_ALG", getattr(settings, "JWT_ALGORITHM", "HS256"))
-    if not secret:
-        raise HTTPException(status_code=500, detail="JWT_SECRET no configurado")
-    try:
-        payload = jwt.decode(token, secret, algorithms=[algo])
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Token inválido o expirado")
     # Chequeos mínimos de claims que usa el MVP
-    if "sub" not in payload or "username" not in payload or "role" not in payload:
-        raise HTTPException(status_code=401, detail="Token inválido (claims)")
-    return payload
+    return require_claims(decode_token(settings, token), ("sub", "username", "role"))
 
 def get_current_user(
+    request: Request,
     authorization: Optional[str] = Header(None),
-    settings: Settings = Depends(lambda: Settings()),
+    settings: Settings = Depends(get_settings),
 ) -> Dict[str, Any]:
     """
     Extrae y valida Authorization: Bearer <token>
@@ -50,12 +36,9 @@ def get_current_user(
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail="Falta Authorization Bearer")
     token = authorization.split(" ", 1)[1]
-    payload = _decode_token(settings, token)
-    return {
-        "id": payload.get("sub"),
-        "email": payload.get("username"),
-        "role": payload.get("role"),  # 'ADMIN' / 'CLIENTE' o 'admin' / 'cliente' según IAM; comparamos case-insensitive
-    }
+    payload = require_claims(request_claims(request, settings, token), ("sub", "username", "role"))
+    # role: 'ADMIN' / 'CLIENTE' o 'admin' / 'cliente' según IAM; comparamos case-insensitive
+    return to_user(payload)
 
 def require_role(required: str):
     """
@@ -18,7 +18,7 @@ class SqlContratacionRepository(ContratacionRepository):
 from datetime import datetime
 from typing import Dict, Any, Iterable, List, Optional
 from sqlalchemy import text
-from ev_shared.db import session_scope
+from ev_shared.db import async_session_scope
 from ev_shared.config import Settings
 
 class EmailOutboxSql:
@@ -29,12 +29,12 @@ class EmailOutboxSql:
     def __init__(self, settings: Settings):
         self.settings = settings
 
-    def enqueue(self, to_email: str, subject: str, body: str,
-                template: Optional[str] = None,
-                payload_json: Optional[Dict[str, Any]] = None,
-                correlation_id: Optional[str] = None,
-                scheduled_at: Optional[datetime] = None,
-                created_by: Optional[str] = None) -> Dict[str, Any]:
+    async def enqueue(self, to_email: str, subject: str, body: str,
+                      template: Optional[str] = None,
+                      payload_json: Optional[Dict[str, Any]] = None,
+                      correlation_id: Optional[str] = None,
+                      scheduled_at: Optional[datetime] = None,
+                      created_by: Optional[str] = None) -> Dict[str, Any]:
         sql = text("""
             INSERT INTO ev_mensajeria.email_outbox
                 (id, to_email, subject, body, template, payload_json, status, attempts,
@@ -52,12 +52,12 @@ class EmailOutboxSql:
             "correlation_id": correlation_id,
             "created_by": created_by,
         }
-        with session_scope(self.settings) as s:
-            s.execute(sql, params)
+        async with async_session_scope(self.settings) as s:
+            await s.execute(sql, params)
             # devuelve lo mínimo útil para trazabilidad
-            row = s.execute(text("SELECT LAST_INSERT_ID()")).first()  # no aplica a UUID: lo dejamos None
+            row = (await s.execute(text("SELECT LAST_INSERT_ID()"))).first()  # no aplica a UUID: lo dejamos None
         # Como la PK es UUID generado por MySQL en SQL, recuperamos con un select ordenado
-        with session_scope(self.settings) as s:
+        async with async_session_scope(self.settings) as s:
             sel = text("""
                 SELECT id, to_email, subject, status, attempts, scheduled_at, correlation_id, created_at
                 FROM ev_mensajeria.email_outbox
@@ -65,20 +65,20 @@ class EmailOutboxSql:
                 ORDER BY created_at DESC
                 LIMIT 1
             """)
-            r = s.execute(sel, {"to_email": to_email}).mappings().first()
+            r = (await s.execute(sel, {"to_email": to_email})).mappings().first()
             return dict(r) if r else {"to_email": to_email, "subject": subject, "status": 0}
 
-    def mark_sent(self, outbox_id: str, when: Optional[datetime] = None) -> None:
+    async def mark_sent(self, outbox_id: str, when: Optional[datetime] = None) -> None:
         sql = text("""
             UPDATE ev_mensajeria.email_outbox
                SET status=1, sent_at=COALESCE(:when, NOW()), last_attempt_at=COALESCE(:when, NOW())
              WHERE id=:id
              LIMIT 1
         """)
-        with session_scope(self.settings) as s:
-            s.execute(sql, {"id": outbox_id, "when": when})
+        async with async_session_scope(self.settings) as s:
+            await s.execute(sql, {"id": outbox_id, "when": when})
 
-    def mark_error(self, outbox_id: str, error_msg: str) -> None:
+    async def mark_error(self, outbox_id: str, error_msg: str) -> None:
         sql = text("""
             UPDATE ev_mensajeria.email_outbox
                SET status=2,
@@ -88,10 +88,10 @@ class EmailOutboxSql:
              WHERE id=:id
              LIMIT 1
         """)
-        with session_scope(self.settings) as s:
-            s.execute(sql, {"id": outbox_id, "msg": error_msg})
+        async with async_session_scope(self.settings) as s:
+            await s.execute(sql, {"id": outbox_id, "msg": error_msg})
 
-    def pick_pending(self, limit: int = 50) -> List[Dict[str, Any]]:
+    async def pick_pending(self, limit: int = 50) -> List[Dict[str, Any]]:
         sql = text("""
             SELECT id, to_email, subject, body, template, payload_json, attempts,
                    scheduled_at, created_at, correlation_id
@@ -100,6 +100,6 @@ class EmailOutboxSql:
              ORDER BY COALESCE(scheduled_at, created_at) ASC
              LIMIT :lim
         """)
-        with session_scope(self.settings) as s:
-            rows = s.execute(sql, {"lim": limit}).mappings().all()
+        async with async_session_scope(self.settings) as s:
+            rows = (await s.execute(sql, {"lim": limit})).mappings().all()
             return [dict(r) for r in rows]
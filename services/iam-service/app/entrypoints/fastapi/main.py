@@ -7,14 +7,24 @@ IAM FastAPI main
 Synopsis: created by emeday 2025
 """
 from fastapi import FastAPI
-from ev_shared import load_settings, get_logger
+from ev_shared import load_settings, install_reload_signal, get_logger, dispose_engines, dispose_async_engines
 from .router import build_api_router
+from ...infrastructure.db.sqlalchemy.login_bookkeeping import get_login_bookkeeping
+from ...infrastructure.db.sqlalchemy.role_cache import get_role_cache
+from ...infrastructure.db.sqlalchemy.user_import import get_import_jobs, purge_leftover_spools
 from ev_shared.http_debug import build_debug_router
+from ev_shared.retention import RetentionJob
+from ev_shared.security.hashing import (
+    HashingPoolSaturated, hashing_saturated_handler, shutdown_hashing_pool, configure_password_cost,
+)
 
 settings = load_settings(service_name="iam-service")
 log = get_logger(__name__, service_name=settings.SERVICE_NAME)
 
+retention_job = RetentionJob(settings)
+
 app = FastAPI(title="IAM Service", version="0.1.0")
+app.add_exception_handler(HashingPoolSaturated, hashing_saturated_handler)
 
 # Routers
 app.include_router(build_debug_router(settings), prefix="/iam")
@@ -23,6 +33,42 @@ app.include_router(build_api_router(settings), prefix="/iam")
 @app.on_event("startup")
 async def on_startup():
     log.info("Starting %s on %s:%s", settings.SERVICE_NAME, settings.APP_HOST, settings.APP_PORT)
+    if install_reload_signal():
+        log.info("Settings: recarga con SIGHUP habilitada")
+    if not settings.INTERNAL_API_KEY:
+        log.warning("INTERNAL_API_KEY vacío: /iam/internal/* responde 503 (perfiles y revocaciones de los demás servicios)")
+    rounds = configure_password_cost(settings)
+    log.info("bcrypt rounds=%s (objetivo %s ms por verify)", rounds, settings.BCRYPT_TARGET_MS)
+    await get_login_bookkeeping(settings).start()
+    get_role_cache(settings)  # dimensionado con ROLE_CACHE_* de este servicio
+    if purged := purge_leftover_spools(settings):
+        log.warning("Imports: %s archivo(s) huérfano(s) borrados de %s/imports", purged, settings.SPOOL_DIR)
+    await retention_job.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await retention_job.stop()
+    await get_import_jobs(settings).stop()
+    await get_login_bookkeeping(settings).stop()
+    shutdown_hashing_pool()
+    dispose_engines()
+    await dispose_async_engines()
+
+@app.get("/iam/_debug/write-behind", tags=["_debug"])
+def debug_write_behind():
+    # Contadores del bookkeeping de login (pendientes, descartados, demorados)
+    return {
+        "login": get_login_bookkeeping(settings).spool.stats(),
+    }
+
+@app.get("/iam/_debug/role-cache", tags=["_debug"])
+def debug_role_cache():
+    return get_role_cache(settings).cache.stats()
+
+@app.get("/iam/_debug/retention", tags=["_debug"])
+def debug_retention():
+    # Última corrida de retención programada (filas borradas/archivadas y filas/seg por tabla)
+    return retention_job.stats()
 
 @app.get("/iam/health")
 def health():
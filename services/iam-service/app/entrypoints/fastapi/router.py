@@ -1,36 +1,58 @@
 ﻿# router.py — IAM Service (Hexagonal MVP)
 # Rutas públicas: /auth/login, /auth/register, /health
 # Rutas protegidas (Bearer): /me, /admin/**
-from fastapi import APIRouter, HTTPException, status, Depends, Body
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import jwt, JWTError
+import hmac
+import json
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, Response, status, Depends, Body, Header, Query
+from fastapi.responses import StreamingResponse
+from jose import jwt
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Sequence, Tuple
 from sqlalchemy import text
-import json
 
 from ev_shared.config import Settings
-from ev_shared.db import session_scope
-from ev_shared.security.passwords import verify_password, hash_password
+from ev_shared.db import async_session_scope
+from ev_shared.logger import get_logger
+from ev_shared.profiles import PROFILES_SQL
+from ev_shared.security.passwords import needs_rehash
+from ev_shared.security.hashing import HashingPoolSaturated, verify_password_async, hash_password_async
+from ev_shared.security.auth import get_current_user
+from ev_shared.security.permissions import Perm, compile_permissions, require_permission
+from ev_shared.security.throttle import LoginThrottled, client_ip, get_login_throttle
+from ev_shared.security.revocation import SqlRevocationSource
+from ...infrastructure.db.sqlalchemy.audit_buffer import audit_row, insert_audit_rows
+from ...infrastructure.db.sqlalchemy.audit_log import InvalidCursor, query_page, stream_events
+from ...infrastructure.db.sqlalchemy.login_bookkeeping import get_login_bookkeeping
+from ...infrastructure.db.sqlalchemy.role_cache import get_role_cache, sort_role_codes
+from ...infrastructure.db.sqlalchemy.user_import import (
+    IMPORT_FORMATS, ImportJob, UploadTooLarge, get_import_jobs, spool_upload,
+)
+from ...infrastructure.db.sqlalchemy.user_search import InvalidCursor as InvalidSearchCursor, search_users
+from ...infrastructure.db.sqlalchemy.sessions import (
+    create_session, rotate_session, revoke_session, revoke_user_sessions,
+)
 
 # DTOs (defínelos en app/entrypoints/fastapi/schemas.py)
 from .schemas import (
     Health,
     LoginRequest,
     TokenResponse,
+    RefreshRequest,
+    RevokeSessionsOut,
     RegisterRequest,
     UsuarioOut,
     CrearUsuarioAdminRequest,
     UpdateUsuarioRequest,
+    ImportJobOut,
+    AuditPageOut,
+    UserSearchOut,
 )
 
-# ---------- Settings provider ----------
-def get_settings() -> Settings:
-    return Settings()
+log = get_logger(__name__)
 
 # ---------- Security (Bearer) ----------
-bearer_scheme = HTTPBearer(auto_error=True)
-
+# Verificación de tokens compartida: ev_shared.security.auth.get_current_user
+# Autorización por bits del claim perm: ev_shared.security.permissions.require_permission
 def _get_jwt_conf(settings: Settings):
     secret = getattr(settings, "JWT_SECRET", None)
     if not secret:
@@ -39,104 +61,101 @@ def _get_jwt_conf(settings: Settings):
     expires_min = int(getattr(settings, "JWT_EXPIRES_MIN", 60))
     return secret, algorithm, expires_min
 
-def _decode_token(settings: Settings, token: str) -> Dict[str, Any]:
-    secret, algorithm, _ = _get_jwt_conf(settings)
-    try:
-        payload = jwt.decode(token, secret, algorithms=[algorithm])
-        return payload
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Token inválido o expirado")
-
-def get_current_user(
-    creds: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    settings: Settings = Depends(get_settings),
-) -> Dict[str, Any]:
-    """
-    Extrae y valida Authorization: Bearer <token>.
-    Devuelve un dict homogéneo: {id, email, role}
-    """
-    token = creds.credentials
-    payload = _decode_token(settings, token)
-    return {
-        "id": payload.get("sub"),
-        "email": payload.get("username"),
-        "role": payload.get("role"),
-    }
-
-def require_role(required: str):
-    """
-    Uso:
-      admin = Depends(require_role("ADMIN"))
-    """
-    req = (required or "").upper()
-    def guard(user: Dict[str, Any] = Depends(get_current_user)):
-        role = (user.get("role") or "").upper()
-        if role != req:
-            raise HTTPException(status_code=403, detail="Sin permisos")
-        return user
-    return guard
-
 # ---------- Helpers de rol ----------
-def _get_role_code_for_user(s, user_id: str) -> Optional[str]:
+async def _get_role_code_for_user(s, user_id: str) -> Optional[str]:
     """
     Retorna el codigo de rol principal del usuario (prioriza ADMIN si hay varios).
+    Pasa por el cache de roles; un usuario cuyo rol cambió en esta transacción se lee de la BD.
     """
-    row = s.execute(
-        text("""
-            SELECT r.codigo AS role
-              FROM ev_iam.usuario_rol ur
-              JOIN ev_iam.rol r ON r.id = ur.rol_id
-             WHERE ur.usuario_id = :uid
-               AND r.status = 1
-             ORDER BY CASE r.codigo WHEN 'ADMIN' THEN 1 ELSE 2 END
-             LIMIT 1
-        """),
-        {"uid": user_id}
-    ).mappings().first()
-    return row["role"] if row else None
+    return await get_role_cache().get(s, user_id)
 
-def _resolve_role_id_by_code(s, code: str) -> Optional[str]:
-    row = s.execute(
+async def _get_role_codes_for_user(s, user_id: str) -> Tuple[str, ...]:
+    """Todos los roles activos del usuario (ADMIN primero), para compilar `perm`"""
+    return await get_role_cache().get_codes(s, user_id)
+
+async def _resolve_role_id_by_code(s, code: str) -> Optional[str]:
+    row = (await s.execute(
         text("SELECT id FROM ev_iam.rol WHERE codigo=:c AND status=1 LIMIT 1"),
         {"c": code}
-    ).mappings().first()
+    )).mappings().first()
     return row["id"] if row else None
 
-def _set_single_role_for_user(s, user_id: str, role_code: str):
+async def _set_single_role_for_user(s, user_id: str, role_code: str):
     """
     Upsert simple: borra roles previos y asigna el indicado (MVP).
     """
-    role_id = _resolve_role_id_by_code(s, role_code)
+    role_id = await _resolve_role_id_by_code(s, role_code)
     if not role_id:
         raise HTTPException(status_code=400, detail=f"Rol '{role_code}' no existe o está inactivo")
-    s.execute(text("DELETE FROM ev_iam.usuario_rol WHERE usuario_id=:uid"), {"uid": user_id})
-    s.execute(
+    await s.execute(text("DELETE FROM ev_iam.usuario_rol WHERE usuario_id=:uid"), {"uid": user_id})
+    await s.execute(
         text("""
             INSERT INTO ev_iam.usuario_rol (id, usuario_id, rol_id, created_at)
             VALUES (UUID(), :uid, :rid, NOW())
         """),
         {"uid": user_id, "rid": role_id}
     )
+    get_role_cache().invalidate(s, user_id)
 
 # ---------- Auditoría ----------
-def _audit(s, actor_id: Optional[str], entidad: str, entidad_id: str, accion: str, metadata: Optional[Dict[str, Any]] = None):
+async def _audit(s, actor_id: Optional[str], entidad: str, entidad_id: str, accion: str,
+                 metadata: Optional[Dict[str, Any]] = None):
     """
-    Inserta un evento en ev_iam.evento_audit.
+    Inserta el evento en ev_iam.evento_audit dentro de la transacción de `s`:
+    se confirma o se descarta junto con el cambio auditado.
     """
-    s.execute(
-        text("""
-            INSERT INTO ev_iam.evento_audit
-                (id, fecha_hora, actor_id, entidad, entidad_id, accion, metadata)
-            VALUES (UUID(), NOW(), :actor, :ent, :eid, :acc, CAST(:meta AS JSON))
-        """),
-        {
-            "actor": actor_id,
-            "ent": entidad,
-            "eid": entidad_id,
-            "acc": accion,
-            "meta": json.dumps(metadata or {})
-        }
-    )
+    await insert_audit_rows(s, [audit_row(actor_id, entidad, entidad_id, accion, metadata)])
+
+async def _rehash_password(settings: Settings, user_id: str, plain: str, old_hash: str):
+    """
+    Rehash en segundo plano tras un login exitoso.
+    El WHERE por hash anterior evita pisar un cambio de contraseña concurrente.
+    """
+    try:
+        new_hash = await hash_password_async(settings, plain)
+        async with async_session_scope(settings) as s:
+            await s.execute(
+                text("UPDATE ev_iam.usuario SET password_hash=:new WHERE id=:id AND password_hash=:old LIMIT 1"),
+                {"new": new_hash, "id": user_id, "old": old_hash}
+            )
+    except HashingPoolSaturated:
+        pass  # se reintenta en el próximo login
+    except Exception:
+        log.exception("No se pudo rehashear la contraseña de %s", user_id)
+
+def _token_response(settings: Settings, user_id: str, email: str, role_codes: Sequence[str],
+                    sid: Optional[str] = None, refresh_token: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Emite el access token (claims: sub, username, role, perm, exp, iat y sid si hay sesión).
+    role = rol principal (el primero de role_codes, ADMIN si lo tiene; CLIENTE si no hay);
+    perm = OR de los permisos de todos los roles (ev_shared.security.permissions).
+    y arma la respuesta de login/refresh.
+    """
+    role_code = role_codes[0] if role_codes else "CLIENTE"
+    secret, algorithm, expires_min = _get_jwt_conf(settings)
+    now = datetime.utcnow()
+    exp = now + timedelta(minutes=expires_min)
+    payload = {
+        "sub": str(user_id),
+        "username": email,
+        "role": role_code,
+        "perm": compile_permissions(role_codes or [role_code]),
+        "iat": int(now.timestamp()),
+        "exp": int(exp.timestamp()),
+        "scope": "access_token",
+    }
+    if sid:
+        payload["sid"] = sid
+    out = {
+        "access_token": jwt.encode(payload, secret, algorithm=algorithm),
+        "token_type": "bearer",
+        "expires_in": expires_min * 60,
+        "role": role_code,
+    }
+    if refresh_token:
+        out["refresh_token"] = refresh_token
+        out["refresh_expires_in"] = settings.JWT_REFRESH_EXPIRES_DAYS * 86400
+    return out
 
 # ---------- Router ----------
 def build_api_router(settings: Settings) -> APIRouter:
@@ -144,107 +163,142 @@ def build_api_router(settings: Settings) -> APIRouter:
 
     # Health (pública)
     @r.get("/health", response_model=Health, operation_id="iam_health", openapi_extra={"security": []})
-    def health():
+    async def health():
         return {"status": "ok"}
 
     # ---------- AUTH (público) ----------
     @r.post("/auth/login", response_model=TokenResponse, operation_id="iam_login", openapi_extra={"security": []})
-    def login(data: LoginRequest = Body(...)):
+    async def login(request: Request, background_tasks: BackgroundTasks, data: LoginRequest = Body(...)):
         """
         Login por email + password.
-        - Verifica hash (bcrypt).
-        - Resuelve rol por join a rol (prioriza ADMIN).
-        - Emite JWT con claims: sub, username, role, exp, iat.
-        - Registra intento de login (éxito/falla) y audita LOGIN.
+        - Throttling por email/IP (retardo progresivo y bloqueo): 429 antes de tocar BD o bcrypt.
+        - Usuario y roles activos en una sola consulta; verifica hash (bcrypt).
+        - Emite JWT con claims: sub, username, role, exp, iat, sid.
+        - Abre una sesión de refresh (ev_iam.sesion) y retorna su refresh_token.
+        - Registra intento de login (éxito/falla) y audita LOGIN fuera del camino crítico.
+        - Si el hash quedó desactualizado (legacy o menos rounds), lo rehashea tras responder.
         """
-        secret, algorithm, expires_min = _get_jwt_conf(settings)
-        ip = None  # si quieres, captura IP desde un middleware/proxy
-
-        with session_scope(settings) as s:
-            u = s.execute(
-                text("""
-                    SELECT id, email, password_hash
-                      FROM ev_iam.usuario
-                     WHERE email = :e
-                       AND status = 1
-                       AND is_deleted = 0
-                     LIMIT 1
-                """),
-                {"e": data.email}
-            ).mappings().first()
+        _get_jwt_conf(settings)  # 500 si falta JWT_SECRET, antes de tocar BD o bcrypt
+        ip = client_ip(request.client.host if request.client else None,
+                       request.headers.get("x-forwarded-for"), settings.TRUSTED_PROXY_NETWORKS)
+        throttle = get_login_throttle(settings) if settings.LOGIN_THROTTLE_ENABLED else None
+        attempt = 0.0
+        if throttle:
+            try:
+                attempt = await throttle.check(data.email, ip)  # reserva el intento antes de bcrypt
+            except LoginThrottled as e:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Demasiados intentos, reintente más tarde",
+                    headers={"Retry-After": str(e.retry_after)},
+                )
 
-            # fallo: credenciales
-            if not u or not u.get("password_hash") or not verify_password(data.password, u["password_hash"]):
-                s.execute(
+        # Una sola ida a la BD: usuario + todos sus roles activos
+        roles = get_role_cache()
+        role_gen = roles.generation()
+        try:
+            async with async_session_scope(settings) as s:
+                u = (await s.execute(
                     text("""
-                        INSERT INTO ev_iam.login_intento
-                            (id, usuario_id, email, ip, exito)
-                        VALUES (UUID(), NULL, :e, :ip, 0)
+                        SELECT u.id, u.email, u.password_hash, GROUP_CONCAT(r.codigo) AS roles
+                          FROM ev_iam.usuario u
+                          LEFT JOIN ev_iam.usuario_rol ur ON ur.usuario_id = u.id
+                          LEFT JOIN ev_iam.rol r ON r.id = ur.rol_id AND r.status = 1
+                         WHERE u.email = :e
+                           AND u.status = 1
+                           AND u.is_deleted = 0
+                         GROUP BY u.id, u.email, u.password_hash
                     """),
-                    {"e": data.email, "ip": ip}
+                    {"e": data.email}
+                )).mappings().first()
+
+            # bcrypt sin conexión tomada; intento, last_login y audit van diferidos (journal + worker)
+            valid = bool(u and u.get("password_hash")) and await verify_password_async(
+                settings, data.password, u["password_hash"])
+        except Exception:
+            # BD caída, pool de hashing saturado...: no es un fallo de credenciales
+            if throttle:
+                await throttle.release(data.email, ip, attempt)
+            raise
+
+        bookkeeping = get_login_bookkeeping(settings)
+        if not valid:
+            bookkeeping.record_login(False, data.email, ip)
+            if throttle:
+                await throttle.record_failure(data.email, ip)
+            raise HTTPException(status_code=401, detail="Credenciales inválidas")
+
+        role_codes = sort_role_codes((u["roles"] or "").split(","))
+        roles.prime(u["id"], role_codes, role_gen)  # /me, refresh y admin lo reutilizan
+        role_code = role_codes[0] if role_codes else "CLIENTE"
+        bookkeeping.record_login(True, u["email"], ip, user_id=u["id"], role=role_code)
+        if throttle:
+            await throttle.record_success(data.email, ip, attempt)
+
+        if needs_rehash(u["password_hash"]):
+            background_tasks.add_task(_rehash_password, settings, u["id"], data.password, u["password_hash"])
+
+        sid = refresh_token = None
+        if settings.JWT_REFRESH_EXPIRES_DAYS > 0:
+            async with async_session_scope(settings) as s:
+                sid, refresh_token = await create_session(
+                    s, u["id"], timedelta(days=settings.JWT_REFRESH_EXPIRES_DAYS),
+                    ip=ip, user_agent=request.headers.get("user-agent"),
                 )
-                # audit opcional de intento fallido (sin entidad_id real)
-                _audit(s, None, "login", "00000000-0000-0000-0000-000000000000", "LOGIN_FALLIDO",
-                       {"email": data.email})
-                raise HTTPException(status_code=401, detail="Credenciales inválidas")
-
-            role_code = _get_role_code_for_user(s, u["id"]) or "CLIENTE"
+        return _token_response(settings, u["id"], u["email"], role_codes, sid, refresh_token)
 
-            # éxito: registra intento + last_login
-            s.execute(
-                text("""
-                    INSERT INTO ev_iam.login_intento
-                        (id, usuario_id, email, ip, exito)
-                    VALUES (UUID(), :uid, :e, :ip, 1)
-                """),
-                {"uid": u["id"], "e": u["email"], "ip": ip}
-            )
-            s.execute(
-                text("UPDATE ev_iam.usuario SET last_login=NOW() WHERE id=:id LIMIT 1"),
-                {"id": u["id"]}
-            )
-            _audit(s, actor_id=u["id"], entidad="login", entidad_id=u["id"], accion="LOGIN",
-                   metadata={"email": u["email"], "role": role_code})
-
-        sub = str(u["id"])
-        now = datetime.utcnow()
-        exp = now + timedelta(minutes=expires_min)
-        payload = {
-            "sub": sub,
-            "username": u["email"],
-            "role": role_code,
-            "iat": int(now.timestamp()),
-            "exp": int(exp.timestamp()),
-            "scope": "access_token",
-        }
-        token = jwt.encode(payload, secret, algorithm=algorithm)
-        return {
-            "access_token": token,
-            "token_type": "bearer",
-            "expires_in": expires_min * 60,
-            "role": role_code,
-        }
+    @r.post("/auth/refresh", response_model=TokenResponse, operation_id="iam_refresh", openapi_extra={"security": []})
+    async def refresh(data: RefreshRequest = Body(...)):
+        """
+        Nuevo access token a partir del refresh token, sin bcrypt.
+        - Una búsqueda por jwt_id (UNIQUE) + UPDATE por PK que rota el refresh token.
+        - Reusar un refresh token ya rotado revoca la sesión.
+        - El rol se resuelve de nuevo (cache de roles), así un cambio de rol aplica al refrescar.
+        """
+        async with async_session_scope(settings) as s:
+            sess = await rotate_session(s, data.refresh_token)
+            if sess:
+                role_codes = await _get_role_codes_for_user(s, sess["usuario_id"])
+        # 401 fuera del scope: la revocación por reuso debe quedar confirmada
+        if not sess:
+            raise HTTPException(status_code=401, detail="Refresh token inválido o expirado")
+        return _token_response(settings, sess["usuario_id"], sess["email"], role_codes,
+                               sess["sesion_id"], sess["refresh_token"])
+
+    @r.post("/auth/logout", status_code=204, operation_id="iam_logout", openapi_extra={"security": []})
+    async def logout(data: RefreshRequest = Body(...)):
+        """
+        Revoca la sesión del refresh token (idempotente). Audita LOGOUT.
+        Access token vigente: con REVOCATION_SOURCE configurado en el servicio que lo recibe,
+        su `sid` se rechaza (401) a más tardar en REVOCATION_REFRESH_SECONDS; sin él, sigue
+        valiendo hasta su exp.
+        """
+        async with async_session_scope(settings) as s:
+            user_id = await revoke_session(s, data.refresh_token)
+            if user_id:
+                await _audit(s, actor_id=user_id, entidad="usuario", entidad_id=user_id, accion="LOGOUT")
+        return
 
     @r.post("/auth/register", response_model=UsuarioOut, operation_id="iam_register", openapi_extra={"security": []})
-    def register(data: RegisterRequest = Body(...)):
+    async def register(data: RegisterRequest = Body(...)):
         """
         Auto-registro de cliente:
         - Crea usuario con password hasheado.
         - Asigna rol CLIENTE por defecto.
         - Audita USUARIO_CREAR.
         """
-        with session_scope(settings) as s:
-            exists = s.execute(
+        async with async_session_scope(settings) as s:
+            exists = (await s.execute(
                 text("SELECT id FROM ev_iam.usuario WHERE email=:e AND is_deleted=0 LIMIT 1"),
                 {"e": data.email}
-            ).first()
+            )).first()
             if exists:
                 raise HTTPException(status_code=409, detail="Email ya registrado")
 
-        pwd_hash = hash_password(data.password)
+        pwd_hash = await hash_password_async(settings, data.password)
 
-        with session_scope(settings) as s:
-            s.execute(text("""
+        async with async_session_scope(settings) as s:
+            await s.execute(text("""
                 INSERT INTO ev_iam.usuario
                     (id, email, password_hash, nombre, telefono, status, is_deleted, created_at)
                 VALUES (UUID(), :email, :ph, :nombre, :telefono, 1, 0, NOW())
@@ -255,20 +309,20 @@ def build_api_router(settings: Settings) -> APIRouter:
                 "telefono": data.telefono,
             })
 
-            row = s.execute(
+            row = (await s.execute(
                 text("""SELECT id, email, nombre, telefono, status
                           FROM ev_iam.usuario
                          WHERE email=:e AND is_deleted=0
                          LIMIT 1"""),
                 {"e": data.email}
-            ).mappings().first()
+            )).mappings().first()
 
             user_id = row["id"]
-            _set_single_role_for_user(s, user_id, "CLIENTE")
-            role_code = _get_role_code_for_user(s, user_id) or "CLIENTE"
+            await _set_single_role_for_user(s, user_id, "CLIENTE")
+            role_code = await _get_role_code_for_user(s, user_id) or "CLIENTE"
 
-            _audit(s, actor_id=user_id, entidad="usuario", entidad_id=user_id, accion="USUARIO_CREAR",
-                   metadata={"email": row["email"], "role": role_code})
+            await _audit(s, actor_id=user_id, entidad="usuario", entidad_id=user_id, accion="USUARIO_CREAR",
+                         metadata={"email": row["email"], "role": role_code})
 
         return UsuarioOut(
             id=str(row["id"]),
@@ -286,21 +340,21 @@ def build_api_router(settings: Settings) -> APIRouter:
         operation_id="iam_me",
         openapi_extra={"security": [{"HTTPBearer": []}]},
     )
-    def me(user=Depends(get_current_user)):
+    async def me(user=Depends(get_current_user)):
         """
         Perfil del usuario autenticado.
         """
-        with session_scope(settings) as s:
-            row = s.execute(
+        async with async_session_scope(settings) as s:
+            row = (await s.execute(
                 text("""SELECT id, email, nombre, telefono, status
                           FROM ev_iam.usuario
                          WHERE id=:id AND is_deleted=0
                          LIMIT 1"""),
                 {"id": user["id"]}
-            ).mappings().first()
+            )).mappings().first()
             if not row:
                 raise HTTPException(status_code=404, detail="Usuario no encontrado")
-            role_code = _get_role_code_for_user(s, row["id"]) or "CLIENTE"
+            role_code = await _get_role_code_for_user(s, row["id"]) or "CLIENTE"
 
         return UsuarioOut(
             id=str(row["id"]),
@@ -318,25 +372,25 @@ def build_api_router(settings: Settings) -> APIRouter:
         operation_id="iam_admin_create_user",
         openapi_extra={"security": [{"HTTPBearer": []}]},
     )
-    def admin_create_user(
+    async def admin_create_user(
         data: CrearUsuarioAdminRequest = Body(...),
-        admin=Depends(require_role("ADMIN")),
+        admin=Depends(require_permission(Perm.USUARIOS_ESCRIBIR)),
     ):
         """
         Crea usuario y le asigna un rol (ADMIN/CLIENTE). Audita USUARIO_CREAR.
         """
-        with session_scope(settings) as s:
-            exists = s.execute(
+        async with async_session_scope(settings) as s:
+            exists = (await s.execute(
                 text("SELECT id FROM ev_iam.usuario WHERE email=:e AND is_deleted=0 LIMIT 1"),
                 {"e": data.email}
-            ).first()
+            )).first()
             if exists:
                 raise HTTPException(status_code=409, detail="Email ya registrado")
 
-        pwd_hash = hash_password(data.password)
+        pwd_hash = await hash_password_async(settings, data.password)
 
-        with session_scope(settings) as s:
-            s.execute(text("""
+        async with async_session_scope(settings) as s:
+            await s.execute(text("""
                 INSERT INTO ev_iam.usuario
                     (id, email, password_hash, nombre, telefono, status, is_deleted, created_at)
                 VALUES (UUID(), :email, :ph, :nombre, :telefono, 1, 0, NOW())
@@ -347,19 +401,19 @@ def build_api_router(settings: Settings) -> APIRouter:
                 "telefono": data.telefono,
             })
 
-            u = s.execute(
+            u = (await s.execute(
                 text("""SELECT id, email, nombre, telefono, status
                           FROM ev_iam.usuario
                          WHERE email=:e AND is_deleted=0
                          LIMIT 1"""),
                 {"e": data.email}
-            ).mappings().first()
+            )).mappings().first()
 
-            _set_single_role_for_user(s, u["id"], data.role)
-            role_code = _get_role_code_for_user(s, u["id"]) or "CLIENTE"
+            await _set_single_role_for_user(s, u["id"], data.role)
+            role_code = await _get_role_code_for_user(s, u["id"]) or "CLIENTE"
 
-            _audit(s, actor_id=admin["id"], entidad="usuario", entidad_id=u["id"], accion="USUARIO_CREAR",
-                   metadata={"email": u["email"], "role": role_code})
+            await _audit(s, actor_id=admin["id"], entidad="usuario", entidad_id=u["id"], accion="USUARIO_CREAR",
+                         metadata={"email": u["email"], "role": role_code})
 
         return UsuarioOut(
             id=str(u["id"]),
@@ -370,36 +424,73 @@ def build_api_router(settings: Settings) -> APIRouter:
             status=u["status"],
         )
 
+    @r.post(
+        "/admin/users/import",
+        response_model=ImportJobOut,
+        status_code=202,
+        operation_id="iam_admin_import_users",
+        openapi_extra={"security": [{"HTTPBearer": []}]},
+    )
+    async def admin_import_users(
+        request: Request,
+        format: Optional[str] = None,
+        admin=Depends(require_permission(Perm.USUARIOS_ESCRIBIR)),
+    ):
+        """
+        Importación masiva: body NDJSON (un objeto por línea) o CSV con cabecera.
+        Campos: email, password (o password_hash bcrypt), nombre, telefono, role (default CLIENTE).
+        - El formato sale de ?format= o del Content-Type (text/csv -> csv, si no ndjson).
+        - El body se guarda por chunks y se procesa en segundo plano por lotes; responde 202
+          con el id del import. Progreso y errores por fila: GET /admin/users/import/{id}.
+        - Audita USUARIO_CREAR por usuario (metadata.import_id).
+        """
+        fmt = (format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")).lower()
+        if fmt not in IMPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Formato no soportado (use {', '.join(IMPORT_FORMATS)})")
+        try:
+            path = await spool_upload(settings, request.stream())
+        except UploadTooLarge:
+            raise HTTPException(status_code=413, detail="Archivo demasiado grande")
+        job = ImportJob(admin["id"], fmt, path, settings.IMPORT_MAX_ERRORS)
+        return get_import_jobs(settings).submit(job).snapshot()
+
+    @r.get(
+        "/admin/users/import/{job_id}",
+        response_model=ImportJobOut,
+        operation_id="iam_admin_import_status",
+        openapi_extra={"security": [{"HTTPBearer": []}]},
+    )
+    async def admin_import_status(job_id: str, admin=Depends(require_permission(Perm.USUARIOS_LEER))):
+        """Progreso de un import (solo en la instancia que lo recibió)"""
+        job = get_import_jobs(settings).get(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Import no encontrado")
+        return job.snapshot()
+
     @r.get(
         "/admin/users",
         response_model=List[UsuarioOut],
         operation_id="iam_admin_list_users",
         openapi_extra={"security": [{"HTTPBearer": []}]},
     )
-    def admin_list_users(
+    async def admin_list_users(
         limit: int = 50,
         offset: int = 0,
-        admin=Depends(require_role("ADMIN")),
+        admin=Depends(require_permission(Perm.USUARIOS_LEER)),
     ):
-        with session_scope(settings) as s:
-            rows = s.execute(
+        async with async_session_scope(settings, readonly=True) as s:
+            rows = (await s.execute(
                 text("""
-                    SELECT u.id, u.email, u.nombre, u.telefono, u.status,
-                           (
-                             SELECT r.codigo
-                               FROM ev_iam.usuario_rol ur
-                               JOIN ev_iam.rol r ON r.id = ur.rol_id AND r.status = 1
-                              WHERE ur.usuario_id = u.id
-                              ORDER BY CASE r.codigo WHEN 'ADMIN' THEN 1 ELSE 2 END
-                              LIMIT 1
-                           ) AS role
+                    SELECT u.id, u.email, u.nombre, u.telefono, u.status
                       FROM ev_iam.usuario u
                      WHERE u.is_deleted = 0
                      ORDER BY u.created_at DESC
                      LIMIT :lim OFFSET :off
                 """),
                 {"lim": limit, "off": offset}
-            ).mappings().all()
+            )).mappings().all()
+            # roles de la página: cache + una sola consulta IN (...) para los faltantes
+            role_by_user = await get_role_cache().get_many(s, [rw["id"] for rw in rows]) if rows else {}
 
         return [
             UsuarioOut(
@@ -407,30 +498,72 @@ def build_api_router(settings: Settings) -> APIRouter:
                 email=rw["email"],
                 nombre=rw["nombre"],
                 telefono=rw["telefono"],
-                role=rw["role"] or "CLIENTE",
+                role=role_by_user.get(str(rw["id"])) or "CLIENTE",
                 status=rw["status"],
             )
             for rw in rows
         ]
 
+    @r.get(
+        "/admin/users/search",
+        response_model=UserSearchOut,
+        operation_id="iam_admin_search_users",
+        openapi_extra={"security": [{"HTTPBearer": []}]},
+    )
+    async def admin_search_users(
+        email: Optional[str] = Query(None, description="Prefijo de email"),
+        nombre: Optional[str] = Query(None, description="Prefijo de nombre"),
+        role: Optional[str] = None,
+        status_: Optional[int] = Query(None, alias="status"),
+        limit: int = Query(50, ge=1),
+        cursor: Optional[str] = None,
+        admin=Depends(require_permission(Perm.USUARIOS_LEER)),
+    ):
+        """
+        Búsqueda por prefijo de email o nombre, rol y status, sobre índices de ev_iam.usuario.
+        Paginación keyset: pasar next_cursor como ?cursor= con los mismos filtros.
+        total es aproximado salvo total_exact=true.
+        """
+        try:
+            async with async_session_scope(settings, readonly=True) as s:
+                page = await search_users(
+                    s, min(limit, settings.USER_SEARCH_PAGE_MAX), settings.USER_SEARCH_COUNT_CAP, cursor,
+                    email=email, nombre=nombre, role=role, status=status_,
+                )
+                role_by_user = await get_role_cache().get_many(s, [u["id"] for u in page["items"]])
+        except InvalidSearchCursor:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        page["items"] = [
+            UsuarioOut(
+                id=str(u["id"]),
+                email=u["email"],
+                nombre=u["nombre"],
+                telefono=u["telefono"],
+                role=role_by_user.get(str(u["id"])) or "CLIENTE",
+                status=u["status"],
+            )
+            for u in page["items"]
+        ]
+        return page
+
     @r.get(
         "/admin/users/{id}",
         response_model=UsuarioOut,
         operation_id="iam_admin_get_user",
         openapi_extra={"security": [{"HTTPBearer": []}]},
     )
-    def admin_get_user(id: str, admin=Depends(require_role("ADMIN"))):
-        with session_scope(settings) as s:
-            row = s.execute(
+    async def admin_get_user(id: str, admin=Depends(require_permission(Perm.USUARIOS_LEER))):
+        async with async_session_scope(settings) as s:
+            row = (await s.execute(
                 text("""SELECT id, email, nombre, telefono, status
                           FROM ev_iam.usuario
                          WHERE id=:id AND is_deleted=0
                          LIMIT 1"""),
                 {"id": id}
-            ).mappings().first()
+            )).mappings().first()
             if not row:
                 raise HTTPException(status_code=404, detail="Usuario no encontrado")
-            role_code = _get_role_code_for_user(s, row["id"]) or "CLIENTE"
+            role_code = await _get_role_code_for_user(s, row["id"]) or "CLIENTE"
 
         return UsuarioOut(
             id=str(row["id"]),
@@ -447,10 +580,10 @@ def build_api_router(settings: Settings) -> APIRouter:
         operation_id="iam_admin_patch_user",
         openapi_extra={"security": [{"HTTPBearer": []}]},
     )
-    def admin_patch_user(
+    async def admin_patch_user(
         id: str,
         data: UpdateUsuarioRequest = Body(...),
-        admin=Depends(require_role("ADMIN")),
+        admin=Depends(require_permission(Perm.USUARIOS_ESCRIBIR)),
     ):
         """
         Actualiza campos parciales y/o rol. Audita USUARIO_ACTUALIZAR con metadata de cambios.
@@ -472,7 +605,7 @@ def build_api_router(settings: Settings) -> APIRouter:
             params["status"] = int(data.status)
             changed["status"] = int(data.status)
 
-        with session_scope(settings) as s:
+        async with async_session_scope(settings) as s:
             if sets:
                 sql = text(f"""
                     UPDATE ev_iam.usuario
@@ -480,30 +613,30 @@ def build_api_router(settings: Settings) -> APIRouter:
                      WHERE id=:id AND is_deleted=0
                      LIMIT 1
                 """)
-                res = s.execute(sql, params)
+                res = await s.execute(sql, params)
                 if res.rowcount == 0:
                     raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
             role_changed = False
             if data.role is not None:
-                _set_single_role_for_user(s, id, data.role)
+                await _set_single_role_for_user(s, id, data.role)
                 changed["role"] = data.role
                 role_changed = True
 
-            row = s.execute(
+            row = (await s.execute(
                 text("""SELECT id, email, nombre, telefono, status
                           FROM ev_iam.usuario
                          WHERE id=:id AND is_deleted=0
                          LIMIT 1"""),
                 {"id": id}
-            ).mappings().first()
+            )).mappings().first()
             if not row:
                 raise HTTPException(status_code=404, detail="Usuario no encontrado")
-            role_code = _get_role_code_for_user(s, row["id"]) or "CLIENTE"
+            role_code = await _get_role_code_for_user(s, row["id"]) or "CLIENTE"
 
             if changed or role_changed:
-                _audit(s, actor_id=admin["id"], entidad="usuario", entidad_id=id, accion="USUARIO_ACTUALIZAR",
-                       metadata=changed)
+                await _audit(s, actor_id=admin["id"], entidad="usuario", entidad_id=id, accion="USUARIO_ACTUALIZAR",
+                             metadata=changed)
 
         return UsuarioOut(
             id=str(row["id"]),
@@ -520,12 +653,12 @@ def build_api_router(settings: Settings) -> APIRouter:
         operation_id="iam_admin_delete_user",
         openapi_extra={"security": [{"HTTPBearer": []}]},
     )
-    def admin_delete_user(id: str, admin=Depends(require_role("ADMIN"))):
+    async def admin_delete_user(id: str, admin=Depends(require_permission(Perm.USUARIOS_ESCRIBIR))):
         """
         Soft-delete: is_deleted=1 y status=0. Audita USUARIO_ELIMINAR.
         """
-        with session_scope(settings) as s:
-            res = s.execute(
+        async with async_session_scope(settings) as s:
+            res = await s.execute(
                 text("""
                     UPDATE ev_iam.usuario
                        SET is_deleted=1,
@@ -539,9 +672,136 @@ def build_api_router(settings: Settings) -> APIRouter:
             if res.rowcount == 0:
                 raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
-            _audit(s, actor_id=admin["id"], entidad="usuario", entidad_id=id, accion="USUARIO_ELIMINAR",
-                   metadata={"reason": "soft_delete"})
+            await _audit(s, actor_id=admin["id"], entidad="usuario", entidad_id=id, accion="USUARIO_ELIMINAR",
+                         metadata={"reason": "soft_delete"})
 
         return
 
+    # ---------- Endpoints internos (servicio a servicio, header X-Internal-Key) ----------
+    def require_internal_key(x_internal_key: Optional[str]) -> None:
+        # sin clave configurada no se sirve: abierto expondría emails/nombres por id a cualquiera
+        if not settings.INTERNAL_API_KEY:
+            raise HTTPException(status_code=503, detail="INTERNAL_API_KEY no configurado")
+        if not hmac.compare_digest(x_internal_key or "", settings.INTERNAL_API_KEY):
+            raise HTTPException(status_code=401, detail="X-Internal-Key inválido")
+
+    # Feed de revocaciones (lo consumen los demás servicios; lee el primario)
+    revocation_source = SqlRevocationSource(settings)
+
+    @r.get("/internal/revocations", operation_id="iam_internal_revocations", openapi_extra={"security": []})
+    def internal_revocations(since: Optional[str] = None, horizon: int = 3660,
+                             x_internal_key: Optional[str] = Header(None)):
+        """
+        Sesiones revocadas: sin `since`, las de los últimos `horizon` seg.; con `since`, las
+        revocadas desde ese watermark. Solo ids de sesión (sin datos del usuario).
+        """
+        require_internal_key(x_internal_key)
+        revoked, watermark = revocation_source.revoked_since(since, horizon)
+        return {"revoked": revoked, "watermark": watermark}
+
+    @r.get("/internal/revocations/{sid}", operation_id="iam_internal_revocation", openapi_extra={"security": []})
+    def internal_revocation(sid: str, x_internal_key: Optional[str] = Header(None)):
+        """Chequeo exacto para positivos del Bloom filter"""
+        require_internal_key(x_internal_key)
+        return {"revoked": revocation_source.is_revoked(sid)}
+
+    @r.get("/internal/users/profiles", operation_id="iam_internal_profiles", openapi_extra={"security": []})
+    async def internal_profiles(
+        response: Response,
+        ids: str = Query(..., description="ids separados por coma"),
+        x_internal_key: Optional[str] = Header(None),
+    ):
+        """
+        Perfiles mínimos (id, email, nombre) de hasta PROFILE_BATCH_MAX usuarios en una consulta por PK.
+        Lo consume ev_shared.profiles para enriquecer listados sin JOIN a ev_iam.
+        Exige el header X-Internal-Key (503 si INTERNAL_API_KEY no está configurado).
+        """
+        require_internal_key(x_internal_key)
+        wanted = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+        if len(wanted) > settings.PROFILE_BATCH_MAX:
+            raise HTTPException(status_code=400, detail=f"Máximo {settings.PROFILE_BATCH_MAX} ids por consulta")
+        profiles = []
+        if wanted:
+            async with async_session_scope(settings, readonly=True) as s:
+                rows = (await s.execute(PROFILES_SQL, {"ids": wanted})).mappings().all()
+            profiles = [{"id": str(r["id"]), "email": r["email"], "nombre": r["nombre"]} for r in rows]
+        found = {p["id"] for p in profiles}
+        response.headers["Cache-Control"] = f"private, max-age={settings.PROFILE_CACHE_TTL}"
+        return {"profiles": profiles, "missing": [i for i in wanted if i not in found]}
+
+    # ---------- AUDITORÍA (protegido) ----------
+    def _audit_filters(
+        actor_id: Optional[str] = None,
+        entidad: Optional[str] = None,
+        entidad_id: Optional[str] = None,
+        accion: Optional[str] = None,
+        desde: Optional[datetime] = Query(None, description="Inclusive, ISO 8601"),
+        hasta: Optional[datetime] = Query(None, description="Exclusive, ISO 8601"),
+    ) -> Dict[str, Any]:
+        return {"actor_id": actor_id, "entidad": entidad, "entidad_id": entidad_id,
+                "accion": accion, "desde": desde, "hasta": hasta}
+
+    @r.get(
+        "/admin/audit",
+        response_model=AuditPageOut,
+        operation_id="iam_admin_audit_query",
+        openapi_extra={"security": [{"HTTPBearer": []}]},
+    )
+    async def admin_audit_query(
+        limit: int = Query(50, ge=1),
+        cursor: Optional[str] = None,
+        filters: Dict[str, Any] = Depends(_audit_filters),
+        admin=Depends(require_permission(Perm.AUDITORIA_LEER)),
+    ):
+        """
+        Eventos de ev_iam.evento_audit, más recientes primero.
+        Paginación keyset: pasar next_cursor de la respuesta como ?cursor= (None = última página).
+        """
+        try:
+            async with async_session_scope(settings, readonly=True) as s:
+                return await query_page(s, min(limit, settings.AUDIT_PAGE_MAX), cursor, **filters)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    @r.get(
+        "/admin/audit/export",
+        operation_id="iam_admin_audit_export",
+        openapi_extra={"security": [{"HTTPBearer": []}]},
+        response_class=StreamingResponse,
+    )
+    async def admin_audit_export(
+        filters: Dict[str, Any] = Depends(_audit_filters),
+        admin=Depends(require_permission(Perm.AUDITORIA_LEER)),
+    ):
+        """
+        Export NDJSON (un evento por línea, orden cronológico) con los mismos filtros que /admin/audit.
+        Lee con cursor del lado del servidor: la memoria no crece con el tamaño del export.
+        """
+        async def lines():
+            async with async_session_scope(settings, readonly=True) as s:
+                async for ev in stream_events(s, settings.AUDIT_EXPORT_FETCH_SIZE, **filters):
+                    yield json.dumps(ev, ensure_ascii=False, default=str) + "\n"
+
+        return StreamingResponse(
+            lines(),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": 'attachment; filename="evento_audit.ndjson"'},
+        )
+
+    @r.post(
+        "/admin/users/{id}/sessions/revoke",
+        response_model=RevokeSessionsOut,
+        operation_id="iam_admin_revoke_sessions",
+        openapi_extra={"security": [{"HTTPBearer": []}]},
+    )
+    async def admin_revoke_sessions(id: str, admin=Depends(require_permission(Perm.SESIONES_REVOCAR))):
+        """
+        Revoca todas las sesiones de refresh del usuario. Audita SESION_REVOCAR.
+        """
+        async with async_session_scope(settings) as s:
+            revoked = await revoke_user_sessions(s, id)
+            await _audit(s, actor_id=admin["id"], entidad="usuario", entidad_id=id, accion="SESION_REVOCAR",
+                         metadata={"revoked": revoked})
+        return {"revoked": revoked}
+
     return r
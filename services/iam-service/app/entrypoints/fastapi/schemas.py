@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Any, Optional, List
 from pydantic import BaseModel, Field, ConfigDict
 
 class Health(BaseModel):
@@ -22,6 +22,14 @@ class TokenResponse(BaseModel):
     token_type: str = "bearer"
     expires_in: int
     role: str
+    refresh_token: Optional[str] = None
+    refresh_expires_in: Optional[int] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class RevokeSessionsOut(BaseModel):
+    revoked: int
 
 class RegisterRequest(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
@@ -38,6 +46,12 @@ class UsuarioOut(BaseModel):
     role: str
     status: int
 
+class UserSearchOut(BaseModel):
+    items: List[UsuarioOut]
+    next_cursor: Optional[str] = None  # None = última página
+    total: int                         # aproximado (ver total_exact)
+    total_exact: bool = False
+
 class CrearUsuarioAdminRequest(RegisterRequest):
     # Si algún cliente te enviara "_password", usar:
     # password: str = Field(alias="_password")
@@ -49,3 +63,35 @@ class UpdateUsuarioRequest(BaseModel):
     telefono: Optional[str] = None
     status: Optional[int] = None  # 0/1
     role: Optional[str] = None    # "admin" | "cliente"
+
+class ImportErrorOut(BaseModel):
+    line: int
+    email: Optional[str] = None
+    detail: str
+
+class ImportJobOut(BaseModel):
+    id: str
+    status: str   # pendiente | en_curso | terminado | fallido | cancelado
+    format: str   # ndjson | csv
+    processed: int
+    created: int
+    failed: int
+    errors: List[ImportErrorOut] = []
+    errors_truncated: bool = False
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    elapsed_ms: Optional[int] = None
+    detail: Optional[str] = None
+
+class AuditEventOut(BaseModel):
+    id: str
+    fecha_hora: Optional[str] = None
+    actor_id: Optional[str] = None
+    entidad: str
+    entidad_id: str
+    accion: str
+    metadata: Optional[Any] = None
+
+class AuditPageOut(BaseModel):
+    items: List[AuditEventOut]
+    next_cursor: Optional[str] = None  # None = última página
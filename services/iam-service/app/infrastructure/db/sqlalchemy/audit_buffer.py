@@ -0,0 +1,35 @@
+# services/iam-service/app/infrastructure/db/sqlalchemy/audit_buffer.py
+"""
+Filas de ev_iam.evento_audit e INSERT multi-fila (ev_shared.batching).
+- Eventos admin/seguridad (USUARIO_*, SESION_REVOCAR, LOGOUT): pocos, se insertan en la
+  transacción del caso de uso (router._audit); si esta hace rollback, tampoco queda el evento.
+- Telemetría de login (alto volumen): en lotes vía el spool durable de login_bookkeeping.
+"""
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from ev_shared.batching import multi_row_insert
+
+AUDIT_COLUMNS = ("id", "fecha_hora", "actor_id", "entidad", "entidad_id", "accion", "metadata")
+
+def audit_row(actor_id: Optional[str], entidad: str, entidad_id: str, accion: str,
+              metadata: Optional[Dict[str, Any]] = None, at: Optional[str] = None,
+              row_id: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "id": row_id or str(uuid.uuid4()),
+        "fecha_hora": at or datetime.now().isoformat(sep=" ", timespec="seconds"),
+        "actor_id": actor_id,
+        "entidad": entidad,
+        "entidad_id": entidad_id,
+        "accion": accion,
+        "metadata": json.dumps(metadata or {}),
+    }
+
+async def insert_audit_rows(s, rows: List[Dict[str, Any]]) -> None:
+    """INSERT IGNORE multi-fila (idempotente por id)"""
+    if rows:
+        sql, params = multi_row_insert("ev_iam.evento_audit", AUDIT_COLUMNS, rows,
+                                       ignore=True, casts={"metadata": "JSON"})
+        await s.execute(sql, params)
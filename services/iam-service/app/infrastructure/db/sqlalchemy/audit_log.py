@@ -0,0 +1,107 @@
+# services/iam-service/app/infrastructure/db/sqlalchemy/audit_log.py
+"""
+Lectura de ev_iam.evento_audit.
+- query_page(): filtros por actor, entidad/entidad_id, acción y rango [desde, hasta),
+  orden (fecha_hora DESC, id DESC) con paginación keyset: el cursor es la última
+  (fecha_hora, id) de la página, así cada página es un rango del índice y no un OFFSET.
+  Con actor usa idx_audit_actor (actor_id, fecha_hora); con entidad y entidad_id,
+  idx_audit_entidad (entidad, entidad_id, fecha_hora); solo con entidad,
+  idx_audit_entidad_fecha (entidad, fecha_hora); solo con fechas, idx_audit_fecha.
+- stream_events(): mismos filtros en orden ascendente, sin LIMIT, con cursor del lado del
+  servidor: las filas llegan de a AUDIT_EXPORT_FETCH_SIZE y nunca se materializa el resultado.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from sqlalchemy import text
+
+_COLUMNS = "id, fecha_hora, actor_id, entidad, entidad_id, accion, metadata"
+
+class InvalidCursor(ValueError):
+    """Cursor de paginación ilegible o manipulado"""
+
+def encode_cursor(fecha_hora: datetime, row_id: str) -> str:
+    raw = json.dumps([fecha_hora.isoformat(sep=" "), str(row_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        fecha, row_id = json.loads(raw)
+        return datetime.fromisoformat(fecha), str(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+
+def _filters(actor_id: Optional[str] = None, entidad: Optional[str] = None,
+             entidad_id: Optional[str] = None, accion: Optional[str] = None,
+             desde: Optional[datetime] = None, hasta: Optional[datetime] = None) -> Tuple[List[str], Dict[str, Any]]:
+    where: List[str] = []
+    params: Dict[str, Any] = {}
+    for col, value in (("actor_id", actor_id), ("entidad", entidad),
+                       ("entidad_id", entidad_id), ("accion", accion)):
+        if value:
+            where.append(f"{col} = :{col}")
+            params[col] = value
+    if desde:
+        where.append("fecha_hora >= :desde")
+        params["desde"] = desde
+    if hasta:
+        where.append("fecha_hora < :hasta")
+        params["hasta"] = hasta
+    return where, params
+
+def to_event(row: Dict[str, Any]) -> Dict[str, Any]:
+    meta = row["metadata"]
+    if isinstance(meta, (str, bytes)):
+        try:
+            meta = json.loads(meta)
+        except ValueError:
+            pass
+    return {
+        "id": str(row["id"]),
+        "fecha_hora": row["fecha_hora"].isoformat(sep=" ") if row["fecha_hora"] else None,
+        "actor_id": row["actor_id"],
+        "entidad": row["entidad"],
+        "entidad_id": row["entidad_id"],
+        "accion": row["accion"],
+        "metadata": meta,
+    }
+
+async def query_page(s, limit: int, cursor: Optional[str] = None, **filters) -> Dict[str, Any]:
+    """Una página (más reciente primero) y el cursor de la siguiente (None si no hay más)"""
+    where, params = _filters(**filters)
+    if cursor:
+        after_fecha, after_id = decode_cursor(cursor)
+        where.append("(fecha_hora < :c_fecha OR (fecha_hora = :c_fecha AND id < :c_id))")
+        params.update(c_fecha=after_fecha, c_id=after_id)
+    params["lim"] = limit + 1
+    rows = (await s.execute(text(f"""
+        SELECT {_COLUMNS}
+          FROM ev_iam.evento_audit
+         {"WHERE " + " AND ".join(where) if where else ""}
+         ORDER BY fecha_hora DESC, id DESC
+         LIMIT :lim
+    """), params)).mappings().all()
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(last["fecha_hora"], last["id"])
+    return {"items": [to_event(r) for r in page], "next_cursor": next_cursor}
+
+async def stream_events(s, fetch_size: int, **filters) -> AsyncIterator[Dict[str, Any]]:
+    """Eventos en orden cronológico con cursor del lado del servidor (SSCursor de aiomysql)"""
+    where, params = _filters(**filters)
+    result = await s.stream(text(f"""
+        SELECT {_COLUMNS}
+          FROM ev_iam.evento_audit
+         {"WHERE " + " AND ".join(where) if where else ""}
+         ORDER BY fecha_hora, id
+    """).execution_options(yield_per=fetch_size), params)
+    try:
+        async for part in result.mappings().partitions(fetch_size):
+            for row in part:
+                yield to_event(row)
+    finally:
+        await result.close()
@@ -0,0 +1,96 @@
+# services/iam-service/app/infrastructure/db/sqlalchemy/login_bookkeeping.py
+"""
+Escrituras de bookkeeping del login fuera del camino crítico:
+login_intento, last_login y evento_audit.
+El router solo registra el evento (journal local, sin BD); el spool lo aplica
+después en lotes: un INSERT multi-fila por tabla y un UPDATE de last_login por
+usuario, en una transacción. Todas las sentencias son idempotentes (ids
+generados aquí, INSERT IGNORE, GREATEST en last_login) porque la entrega es
+at-least-once.
+"""
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+
+from ev_shared.batching import multi_row_insert
+from ev_shared.config import Settings
+from ev_shared.db import async_session_scope
+from ev_shared.spool import DurableSpool
+from .audit_buffer import audit_row, insert_audit_rows
+
+# entidad_id para auditar intentos fallidos sin usuario
+NO_ENTITY_ID = "00000000-0000-0000-0000-000000000000"
+
+INTENTO_COLUMNS = ("id", "usuario_id", "email", "ip", "exito", "created_at")
+
+class LoginBookkeeping:
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.spool = DurableSpool(
+            settings.SPOOL_DIR, "iam-login", self._apply,
+            fsync=settings.SPOOL_FSYNC,
+            max_batch=settings.WRITE_BEHIND_BATCH_MAX,
+            flush_interval=settings.WRITE_BEHIND_FLUSH_SECONDS,
+            max_pending=settings.WRITE_BEHIND_MAX_PENDING,
+            overflow=settings.WRITE_BEHIND_OVERFLOW,
+        )
+
+    def record_login(self, ok: bool, email: str, ip: Optional[str],
+                     user_id: Optional[str] = None, role: Optional[str] = None) -> None:
+        """Registra un intento de login (éxito o fallo); no bloquea en la BD"""
+        meta: Dict[str, Any] = {"email": email}
+        if ok:
+            meta["role"] = role
+        self.spool.append({
+            "ok": ok,
+            "at": datetime.now().isoformat(sep=" ", timespec="seconds"),
+            "user_id": user_id,
+            "email": email,
+            "ip": ip,
+            "intento_id": str(uuid.uuid4()),
+            "audit_id": str(uuid.uuid4()),
+            "meta": meta,
+        })
+
+    async def _apply(self, events: List[Dict[str, Any]]) -> None:
+        intentos = []
+        audits = []
+        last_login: Dict[str, str] = {}
+        for ev in events:
+            intentos.append({"id": ev["intento_id"], "usuario_id": ev["user_id"], "email": ev["email"],
+                             "ip": ev["ip"], "exito": 1 if ev["ok"] else 0, "created_at": ev["at"]})
+            audits.append(audit_row(ev["user_id"], "login", ev["user_id"] or NO_ENTITY_ID,
+                                    "LOGIN" if ev["ok"] else "LOGIN_FALLIDO", ev["meta"],
+                                    at=ev["at"], row_id=ev["audit_id"]))
+            if ev["ok"]:
+                last_login[ev["user_id"]] = max(ev["at"], last_login.get(ev["user_id"], ev["at"]))
+
+        async with async_session_scope(self.settings) as s:
+            sql, params = multi_row_insert("ev_iam.login_intento", INTENTO_COLUMNS, intentos, ignore=True)
+            await s.execute(sql, params)
+            for uid, at in last_login.items():
+                await s.execute(
+                    text("""
+                        UPDATE ev_iam.usuario
+                           SET last_login = GREATEST(COALESCE(last_login, :at), :at)
+                         WHERE id = :id
+                         LIMIT 1
+                    """),
+                    {"id": uid, "at": at}
+                )
+            await insert_audit_rows(s, audits)
+
+    async def start(self) -> None:
+        await self.spool.start()
+
+    async def stop(self) -> None:
+        await self.spool.stop()
+
+_instance: Optional[LoginBookkeeping] = None
+
+def get_login_bookkeeping(settings: Settings) -> LoginBookkeeping:
+    global _instance
+    if _instance is None:
+        _instance = LoginBookkeeping(settings)
+    return _instance
@@ -0,0 +1,99 @@
+# services/iam-service/app/infrastructure/db/sqlalchemy/role_cache.py
+"""
+Cache de los roles activos por usuario (tupla de códigos, ADMIN primero: el primero es el
+rol principal del claim `role`; todos juntos compilan `perm`), acotado por ROLE_CACHE_SIZE
+y con TTL ROLE_CACHE_TTL como tope de desfase entre procesos.
+- invalidate(s, user_id): al cambiar usuario_rol; invalida ya y otra vez tras el
+  commit, y mientras la transacción sigue abierta ese usuario no usa ni llena el cache.
+- El status de un rol no se cambia desde la API (solo por SQL/bootstrap): activarlo o
+  desactivarlo se refleja en todos sus usuarios cuando vence ROLE_CACHE_TTL o al reiniciar.
+- get_many()/get_codes_many(): resuelven una página de usuarios con una sola consulta para los faltantes.
+  Leído en una sesión de réplica (readonly) no se guarda: un cambio de rol recién confirmado
+  en el primario podría volver al cache por el lag y durar ROLE_CACHE_TTL.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import bindparam, event, text
+
+from ev_shared.cache import TTLCache
+from ev_shared.config import Settings, get_settings
+
+_ROLES_SQL = text("""
+    SELECT ur.usuario_id, r.codigo
+      FROM ev_iam.usuario_rol ur
+      JOIN ev_iam.rol r ON r.id = ur.rol_id
+     WHERE ur.usuario_id IN :ids
+       AND r.status = 1
+""").bindparams(bindparam("ids", expanding=True))
+
+RoleCodes = Tuple[str, ...]
+
+def sort_role_codes(codes: Iterable[Optional[str]]) -> RoleCodes:
+    """Códigos únicos, ADMIN primero (misma prioridad en login, refresh y listados)"""
+    return tuple(sorted({c for c in codes if c}, key=lambda c: (c != "ADMIN", c)))
+
+def _dirty(s) -> set:
+    return s.info.setdefault("role_dirty", set())
+
+class RoleCache:
+    def __init__(self, settings: Settings):
+        self.cache = TTLCache(settings.ROLE_CACHE_SIZE, settings.ROLE_CACHE_TTL)
+
+    async def _load(self, s, user_ids: List[str]) -> Dict[str, RoleCodes]:
+        codes: Dict[str, List[str]] = {uid: [] for uid in user_ids}
+        for row in (await s.execute(_ROLES_SQL, {"ids": user_ids})).all():
+            codes[str(row[0])].append(row[1])
+        return {uid: sort_role_codes(c) for uid, c in codes.items()}
+
+    async def get(self, s, user_id: str) -> Optional[str]:
+        """Rol principal (ADMIN si lo tiene)"""
+        codes = await self.get_codes(s, user_id)
+        return codes[0] if codes else None
+
+    async def get_many(self, s, user_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        codes_by_user = await self.get_codes_many(s, user_ids)
+        return {uid: (codes[0] if codes else None) for uid, codes in codes_by_user.items()}
+
+    async def get_codes(self, s, user_id: str) -> RoleCodes:
+        return (await self.get_codes_many(s, [user_id]))[str(user_id)]
+
+    async def get_codes_many(self, s, user_ids: Iterable[str]) -> Dict[str, RoleCodes]:
+        ids = list(dict.fromkeys(str(u) for u in user_ids))
+        dirty = _dirty(s)
+        found, missing = self.cache.get_many(u for u in ids if u not in dirty)
+        missing.extend(u for u in ids if u in dirty)
+        if missing:
+            gen = self.cache.generation
+            loaded = await self._load(s, missing)
+            cacheable = not s.info.get("replica")
+            for uid, codes in loaded.items():
+                if cacheable and uid not in dirty:
+                    self.cache.put(uid, codes, gen=gen)
+            found.update(loaded)
+        return found
+
+    def generation(self) -> int:
+        return self.cache.generation
+
+    def prime(self, user_id: str, codes: Iterable[Optional[str]], gen: int) -> None:
+        """Guarda roles leídos por otra consulta (p. ej. el login), si no hubo invalidación desde `gen`"""
+        self.cache.put(str(user_id), sort_role_codes(codes), gen=gen)
+
+    def invalidate(self, s, user_id: str) -> None:
+        user_id = str(user_id)
+        self.cache.invalidate(user_id)
+        dirty = _dirty(s)
+        if not dirty:
+            event.listen(s.sync_session, "after_commit", self._after_commit, once=True)
+        dirty.add(user_id)
+
+    def _after_commit(self, session) -> None:
+        for uid in session.info.pop("role_dirty", ()):
+            self.cache.invalidate(uid)
+
+_instance: Optional[RoleCache] = None
+
+def get_role_cache(settings: Optional[Settings] = None) -> RoleCache:
+    global _instance
+    if _instance is None:
+        _instance = RoleCache(settings or get_settings())
+    return _instance
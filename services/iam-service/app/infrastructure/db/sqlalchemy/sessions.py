@@ -0,0 +1,109 @@
+# services/iam-service/app/infrastructure/db/sqlalchemy/sessions.py
+"""
+Sesiones de refresh en ev_iam.sesion.
+- Refresh token opaco "<sesion_id>.<aleatorio>"; en la BD solo se guarda su sha256
+  (hex, 64) en jwt_id, así un dump de la tabla no sirve para refrescar.
+- rotate(): una búsqueda por el UNIQUE de jwt_id y un UPDATE condicional por PK que
+  cambia el hash y guarda el anterior en prev_jwt_id; el token anterior deja de valer.
+- Reuso de un token ya rotado (su hash está en prev_jwt_id) = posible robo: se revoca la
+  sesión completa. Un token que nunca se emitió (p. ej. "<sid>.x" con el sid de un access
+  token) no coincide con ningún hash y solo recibe 401.
+"""
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import text
+
+def _hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _new_token(sid: str) -> str:
+    return f"{sid}.{secrets.token_urlsafe(32)}"
+
+def session_id_of(token: str) -> Optional[str]:
+    sid, sep, rnd = (token or "").partition(".")
+    return sid if sep and sid and rnd else None
+
+async def create_session(s, user_id: str, ttl: timedelta, ip: Optional[str] = None,
+                         user_agent: Optional[str] = None) -> Tuple[str, str]:
+    """Crea la sesión y retorna (sesion_id, refresh_token)"""
+    sid = str(uuid.uuid4())
+    token = _new_token(sid)
+    now = datetime.now().replace(microsecond=0)
+    await s.execute(
+        text("""
+            INSERT INTO ev_iam.sesion (id, usuario_id, issued_at, expires_at, jwt_id, user_agent, ip, status)
+            VALUES (:id, :uid, :iat, :exp, :jti, :ua, :ip, 1)
+        """),
+        {"id": sid, "uid": user_id, "iat": now, "exp": now + ttl, "jti": _hash(token),
+         "ua": (user_agent or "")[:255] or None, "ip": ip}
+    )
+    return sid, token
+
+async def rotate_session(s, token: str) -> Optional[Dict[str, Any]]:
+    """
+    Valida el refresh token y lo rota.
+    Retorna {sesion_id, usuario_id, email, expires_at, refresh_token} o None si no es válido
+    (inexistente, revocado, vencido, usuario inactivo o reusado).
+    """
+    sid = session_id_of(token)
+    if not sid:
+        return None
+    old = _hash(token)
+    row = (await s.execute(
+        text("""
+            SELECT se.id, se.usuario_id, se.expires_at, u.email
+              FROM ev_iam.sesion se
+              JOIN ev_iam.usuario u ON u.id = se.usuario_id
+             WHERE se.jwt_id = :jti
+               AND se.status = 1
+               AND se.expires_at > :now
+               AND u.status = 1
+               AND u.is_deleted = 0
+             LIMIT 1
+        """),
+        {"jti": old, "now": datetime.now()}
+    )).mappings().first()
+    if not row:
+        # solo si es el token emitido y ya rotado de esa sesión; el sid del token no se confía
+        await s.execute(
+            text("UPDATE ev_iam.sesion SET status=0 WHERE prev_jwt_id=:jti AND id=:id AND status=1 LIMIT 1"),
+            {"id": sid, "jti": old}
+        )
+        return None
+
+    new_token = _new_token(sid)
+    res = await s.execute(
+        text("UPDATE ev_iam.sesion SET jwt_id=:new, prev_jwt_id=:old WHERE id=:id AND jwt_id=:old AND status=1 LIMIT 1"),
+        {"new": _hash(new_token), "id": sid, "old": old}
+    )
+    if res.rowcount == 0:
+        return None  # rotación concurrente ganó la carrera
+    return {
+        "sesion_id": sid,
+        "usuario_id": str(row["usuario_id"]),
+        "email": row["email"],
+        "expires_at": row["expires_at"],
+        "refresh_token": new_token,
+    }
+
+async def revoke_session(s, token: str) -> Optional[str]:
+    """Revoca la sesión del refresh token; retorna el usuario_id si estaba activa"""
+    row = (await s.execute(
+        text("SELECT id, usuario_id FROM ev_iam.sesion WHERE jwt_id=:jti AND status=1 LIMIT 1"),
+        {"jti": _hash(token)}
+    )).mappings().first()
+    if not row:
+        return None
+    await s.execute(text("UPDATE ev_iam.sesion SET status=0 WHERE id=:id LIMIT 1"), {"id": row["id"]})
+    return str(row["usuario_id"])
+
+async def revoke_user_sessions(s, user_id: str) -> int:
+    """Revoca todas las sesiones activas del usuario; retorna cuántas"""
+    res = await s.execute(
+        text("UPDATE ev_iam.sesion SET status=0 WHERE usuario_id=:uid AND status=1"),
+        {"uid": user_id}
+    )
+    return res.rowcount
@@ -0,0 +1,363 @@
+# services/iam-service/app/infrastructure/db/sqlalchemy/user_import.py
+"""
+Importación masiva de usuarios desde NDJSON o CSV (con cabecera).
+- spool_upload(): copia el body del request a SPOOL_DIR/imports por chunks, sin
+  cargarlo en memoria (la escritura va en un hilo); el proceso corre en segundo plano
+  y se consulta por id.
+- El archivo trae contraseñas en claro: se borra al terminar el import y, al arrancar,
+  purge_leftover_spools() borra los que dejó un proceso que ya no existe (caída, kill -9).
+- Lotes de IMPORT_BATCH_SIZE filas: validación, dedupe contra el archivo y contra
+  uq_usuario_email (un SELECT ... IN por lote), bcrypt en el pool de hashing con
+  IMPORT_HASH_CONCURRENCY tareas, y una transacción por lote con INSERT multi-fila
+  en usuario, usuario_rol y evento_audit.
+- Un email que otra petición registra entre el SELECT y el INSERT lo descarta el
+  INSERT IGNORE y se reporta como error de la fila, sin abortar el lote.
+- Filas con `password_hash` (bcrypt o bcrypt_sha256) se importan sin rehashear.
+- Los trabajos viven en memoria del proceso que recibió el archivo (últimos IMPORT_JOBS_KEEP).
+"""
+import asyncio
+import csv
+import json
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
+from sqlalchemy import bindparam, text
+
+from ev_shared.batching import multi_row_insert
+from ev_shared.config import Settings, get_settings
+from ev_shared.db import async_session_scope
+from ev_shared.logger import get_logger
+from ev_shared.security.hashing import HashingPoolSaturated, get_hashing_pool, hash_password_async
+from ev_shared.security.passwords import is_bcrypt, is_bcrypt_sha256
+from .audit_buffer import audit_row, insert_audit_rows
+
+log = get_logger(__name__)
+
+IMPORT_FORMATS = ("ndjson", "csv")
+USER_COLUMNS = ("id", "email", "password_hash", "nombre", "telefono", "status", "is_deleted")
+USER_ROLE_COLUMNS = ("id", "usuario_id", "rol_id")
+_MAX_LEN = {"email": 150, "nombre": 150, "telefono": 50}
+
+_ROLES_SQL = text("SELECT id, codigo FROM ev_iam.rol WHERE status = 1")
+# sin filtrar is_deleted: uq_usuario_email incluye a los eliminados
+_EXISTING_SQL = text(
+    "SELECT email FROM ev_iam.usuario WHERE email IN :emails"
+).bindparams(bindparam("emails", expanding=True))
+_INSERTED_SQL = text(
+    "SELECT id FROM ev_iam.usuario WHERE id IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+
+Record = Tuple[int, Optional[Dict[str, Any]], Optional[str]]  # (línea, registro, error)
+
+class UploadTooLarge(Exception):
+    """El archivo supera IMPORT_MAX_BYTES"""
+
+def _spool_folder(settings: Settings) -> str:
+    return os.path.join(settings.SPOOL_DIR, "imports")
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def purge_leftover_spools(settings: Settings) -> int:
+    """
+    Borra los *.import de procesos que ya no corren (el pid va en el nombre); los de otros
+    workers vivos con el mismo SPOOL_DIR se respetan. Retorna cuántos borró.
+    """
+    folder = _spool_folder(settings)
+    if not os.path.isdir(folder):
+        return 0
+    removed = 0
+    for name in os.listdir(folder):
+        if not name.endswith(".import"):
+            continue
+        parts = name.split("-")
+        pid = int(parts[1]) if len(parts) > 2 and parts[1].isdigit() else None
+        if pid is not None and pid != os.getpid() and _pid_alive(pid):
+            continue
+        try:
+            os.remove(os.path.join(folder, name))
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+async def spool_upload(settings: Settings, chunks: AsyncIterator[bytes]) -> str:
+    """Escribe el body en un archivo temporal y retorna su ruta (se borra al terminar el import)"""
+    folder = _spool_folder(settings)
+    os.makedirs(folder, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix=f"usuarios-{os.getpid()}-", suffix=".import", dir=folder)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > settings.IMPORT_MAX_BYTES:
+                    raise UploadTooLarge()
+                await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+def iter_records(path: str, fmt: str) -> Iterator[Record]:
+    """Registros del archivo con su número de línea; las líneas ilegibles salen como error"""
+    with open(path, encoding="utf-8-sig", errors="replace", newline="") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for rec in reader:
+                yield reader.line_num, {k.strip().lower(): v for k, v in rec.items() if k}, None
+            return
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                yield n, None, "JSON inválido"
+                continue
+            if not isinstance(rec, dict):
+                yield n, None, "Se esperaba un objeto JSON"
+                continue
+            yield n, rec, None
+
+def _str_or_none(value: Any) -> Optional[str]:
+    value = str(value).strip() if value is not None else ""
+    return value or None
+
+def clean_record(rec: Dict[str, Any], roles: Dict[str, str]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Normaliza un registro a fila de usuario; (None, motivo) si no es importable"""
+    email = _str_or_none(rec.get("email"))
+    if not email or "@" not in email:
+        return None, "Email inválido"
+    password = rec.get("password") or None
+    pwd_hash = _str_or_none(rec.get("password_hash"))
+    if pwd_hash and not (is_bcrypt(pwd_hash) or is_bcrypt_sha256(pwd_hash)):
+        return None, "password_hash no es bcrypt"
+    if not pwd_hash and not password:
+        return None, "Falta password"
+    role = (_str_or_none(rec.get("role")) or "CLIENTE").upper()
+    if role not in roles:
+        return None, f"Rol '{role}' no existe o está inactivo"
+    row = {
+        "email": email,
+        "password": None if pwd_hash else str(password),
+        "password_hash": pwd_hash,
+        "nombre": _str_or_none(rec.get("nombre")),
+        "telefono": _str_or_none(rec.get("telefono")),
+        "role": role,
+    }
+    for col, limit in _MAX_LEN.items():
+        if row[col] and len(row[col]) > limit:
+            return None, f"{col} supera {limit} caracteres"
+    return row, None
+
+class ImportJob:
+    def __init__(self, actor_id: str, fmt: str, path: str, max_errors: int):
+        self.id = str(uuid.uuid4())
+        self.actor_id = actor_id
+        self.format = fmt
+        self.path = path
+        self.max_errors = max_errors
+        self.status = "pendiente"   # pendiente | en_curso | terminado | fallido | cancelado
+        self.detail: Optional[str] = None
+        self.processed = 0
+        self.created = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._t0 = 0.0
+        self.elapsed_ms: Optional[int] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status not in ("pendiente", "en_curso")
+
+    def fail_row(self, line: int, email: Optional[str], detail: str) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "email": email, "detail": detail})
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = self.elapsed_ms
+        if elapsed is None and self._t0:
+            elapsed = int((time.perf_counter() - self._t0) * 1000)
+        return {
+            "id": self.id,
+            "status": self.status,
+            "format": self.format,
+            "processed": self.processed,
+            "created": self.created,
+            "failed": self.failed,
+            "errors": list(self.errors),
+            "errors_truncated": self.failed > len(self.errors),
+            "started_at": self.started_at.isoformat(timespec="seconds") if self.started_at else None,
+            "finished_at": self.finished_at.isoformat(timespec="seconds") if self.finished_at else None,
+            "elapsed_ms": elapsed,
+            "detail": self.detail,
+        }
+
+def _take(it: Iterator[Record], n: int) -> List[Record]:
+    return list(islice(it, n))
+
+async def _hash_rows(settings: Settings, rows: List[Dict[str, Any]]) -> None:
+    """
+    bcrypt de las filas sin password_hash, con a lo sumo IMPORT_HASH_CONCURRENCY en el pool
+    (0 = sus workers): la cola queda libre para los logins. Si aun así se satura, espera y reintenta.
+    """
+    limit = settings.IMPORT_HASH_CONCURRENCY or get_hashing_pool(settings).workers
+    sem = asyncio.Semaphore(limit)
+
+    async def one(row: Dict[str, Any]) -> None:
+        async with sem:
+            while True:
+                try:
+                    row["password_hash"] = await hash_password_async(settings, row["password"])
+                    break
+                except HashingPoolSaturated:
+                    await asyncio.sleep(settings.HASH_POOL_RETRY_AFTER)
+        row["password"] = None
+
+    await asyncio.gather(*(one(r) for r in rows if not r["password_hash"]))
+
+async def _import_batch(settings: Settings, job: ImportJob, batch: List[Record],
+                        roles: Dict[str, str], seen: Set[str]) -> None:
+    valid: List[Tuple[int, Dict[str, Any]]] = []
+    for line, rec, error in batch:
+        job.processed += 1
+        row = None
+        if not error:
+            row, error = clean_record(rec, roles)
+        if error:
+            job.fail_row(line, _str_or_none((rec or {}).get("email")), error)
+            continue
+        key = row["email"].lower()
+        if key in seen:
+            job.fail_row(line, row["email"], "Email duplicado en el archivo")
+            continue
+        seen.add(key)
+        valid.append((line, row))
+    if not valid:
+        return
+
+    async with async_session_scope(settings) as s:
+        existing = {
+            str(e).lower() for (e,) in
+            (await s.execute(_EXISTING_SQL, {"emails": [r["email"] for _, r in valid]})).all()
+        }
+    pending = []
+    for line, row in valid:
+        if row["email"].lower() in existing:
+            job.fail_row(line, row["email"], "Email ya registrado")
+        else:
+            pending.append((line, row))
+    if not pending:
+        return
+
+    # bcrypt sin conexión tomada
+    await _hash_rows(settings, [row for _, row in pending])
+
+    now = datetime.now().isoformat(sep=" ", timespec="seconds")
+    for _, row in pending:
+        row.update(id=str(uuid.uuid4()), status=1, is_deleted=0)
+    async with async_session_scope(settings) as s:
+        sql, params = multi_row_insert("ev_iam.usuario", USER_COLUMNS, [r for _, r in pending], ignore=True)
+        await s.execute(sql, params)
+        inserted = {
+            str(i) for (i,) in
+            (await s.execute(_INSERTED_SQL, {"ids": [r["id"] for _, r in pending]})).all()
+        }
+        created = [r for _, r in pending if r["id"] in inserted]
+        if created:
+            sql, params = multi_row_insert("ev_iam.usuario_rol", USER_ROLE_COLUMNS, [
+                {"id": str(uuid.uuid4()), "usuario_id": r["id"], "rol_id": roles[r["role"]]} for r in created
+            ])
+            await s.execute(sql, params)
+            await insert_audit_rows(s, [
+                audit_row(job.actor_id, "usuario", r["id"], "USUARIO_CREAR",
+                          {"email": r["email"], "role": r["role"], "import_id": job.id}, at=now)
+                for r in created
+            ])
+    for line, row in pending:
+        if row["id"] not in inserted:
+            job.fail_row(line, row["email"], "Email ya registrado")
+    job.created += len(created)
+
+async def run_import(settings: Settings, job: ImportJob) -> None:
+    job.status = "en_curso"
+    job.started_at = datetime.now()
+    job._t0 = time.perf_counter()
+    records = iter_records(job.path, job.format)
+    try:
+        async with async_session_scope(settings) as s:
+            roles = {row["codigo"].upper(): row["id"] for row in (await s.execute(_ROLES_SQL)).mappings().all()}
+        seen: Set[str] = set()
+        while True:
+            batch = await asyncio.to_thread(_take, records, settings.IMPORT_BATCH_SIZE)
+            if not batch:
+                break
+            await _import_batch(settings, job, batch, roles, seen)
+        job.status = "terminado"
+    except asyncio.CancelledError:
+        job.status = "cancelado"
+        raise
+    except Exception as e:
+        log.exception("Import %s: fallo tras %s filas", job.id, job.processed)
+        job.status = "fallido"
+        job.detail = str(e)
+    finally:
+        records.close()
+        job.finished_at = datetime.now()
+        job.elapsed_ms = int((time.perf_counter() - job._t0) * 1000)
+        try:
+            os.remove(job.path)
+        except OSError:
+            pass
+        log.info("Import %s %s: %s filas, %s creados, %s con error, %s ms",
+                 job.id, job.status, job.processed, job.created, job.failed, job.elapsed_ms)
+
+class ImportJobs:
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.keep = settings.IMPORT_JOBS_KEEP
+        self._jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def submit(self, job: ImportJob) -> ImportJob:
+        self._jobs[job.id] = job
+        for old in [j for j in self._jobs.values() if j.done][:max(0, len(self._jobs) - self.keep)]:
+            del self._jobs[old.id]
+        task = asyncio.create_task(run_import(self.settings, job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        return self._jobs.get(job_id)
+
+    async def stop(self) -> None:
+        """Cancela los imports en curso (lo ya confirmado por lote queda escrito)"""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+_instance: Optional[ImportJobs] = None
+
+def get_import_jobs(settings: Optional[Settings] = None) -> ImportJobs:
+    global _instance
+    if _instance is None:
+        _instance = ImportJobs(settings or get_settings())
+    return _instance
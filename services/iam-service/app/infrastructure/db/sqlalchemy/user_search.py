@@ -0,0 +1,101 @@
+# services/iam-service/app/infrastructure/db/sqlalchemy/user_search.py
+"""
+Búsqueda admin de usuarios sobre índices de ev_iam.usuario.
+- email: prefijo sobre uq_usuario_email; nombre: prefijo sobre idx_usuario_nombre.
+  Orden por (email) o, si se filtra por nombre, por (nombre, id): el mismo orden del índice,
+  así cada página es un rango y se pagina por keyset (cursor = última clave) sin OFFSET.
+- role: EXISTS contra usuario_rol (idx_ur_usuario) + rol activo; status: igualdad.
+- Total aproximado y barato: sin filtros, TABLE_ROWS de information_schema; con filtros, un
+  COUNT acotado a USER_SEARCH_COUNT_CAP filas (exacto por debajo del tope).
+"""
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import text
+
+class InvalidCursor(ValueError):
+    """Cursor de paginación ilegible o de otro orden"""
+
+def _encode(values: List[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+def _decode(cursor: str, size: int) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as e:
+        raise InvalidCursor(str(e))
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("cursor de otro orden")
+    return values
+
+def _prefix(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+def _where(email: Optional[str], nombre: Optional[str], role: Optional[str],
+           status: Optional[int]) -> Tuple[List[str], Dict[str, Any]]:
+    where = ["u.is_deleted = 0"]
+    params: Dict[str, Any] = {}
+    if email:
+        where.append("u.email LIKE :email")
+        params["email"] = _prefix(email)
+    if nombre:
+        where.append("u.nombre LIKE :nombre")
+        params["nombre"] = _prefix(nombre)
+    if role:
+        where.append("""EXISTS (SELECT 1
+                                  FROM ev_iam.usuario_rol ur
+                                  JOIN ev_iam.rol r ON r.id = ur.rol_id AND r.status = 1
+                                 WHERE ur.usuario_id = u.id AND r.codigo = :role)""")
+        params["role"] = role.upper()
+    if status is not None:
+        where.append("u.status = :status")
+        params["status"] = status
+    return where, params
+
+async def _estimate_total(s, where: List[str], params: Dict[str, Any], filtered: bool, cap: int) -> Tuple[int, bool]:
+    if not filtered:
+        rows = (await s.execute(text("""
+            SELECT TABLE_ROWS FROM information_schema.TABLES
+             WHERE TABLE_SCHEMA = 'ev_iam' AND TABLE_NAME = 'usuario'
+        """))).scalar()
+        return int(rows or 0), False
+    n = (await s.execute(text(f"""
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM ev_iam.usuario u WHERE {" AND ".join(where)} LIMIT :cap
+        ) t
+    """), {**params, "cap": cap})).scalar()
+    return int(n), n < cap
+
+async def search_users(s, limit: int, count_cap: int, cursor: Optional[str] = None,
+                       email: Optional[str] = None, nombre: Optional[str] = None,
+                       role: Optional[str] = None, status: Optional[int] = None) -> Dict[str, Any]:
+    """Página de usuarios (id, email, nombre, telefono, status), next_cursor y total aproximado"""
+    where, params = _where(email, nombre, role, status)
+    filtered = bool(email or nombre or role or status is not None)
+    total, exact = await _estimate_total(s, where, params, filtered, count_cap)
+
+    if nombre:
+        keys = ("nombre", "id")
+        order = "u.nombre, u.id"
+        after = "(u.nombre > :k0 OR (u.nombre = :k0 AND u.id > :k1))"
+    else:
+        keys = ("email",)
+        order = "u.email"
+        after = "u.email > :k0"
+    if cursor:
+        for i, v in enumerate(_decode(cursor, len(keys))):
+            params[f"k{i}"] = v
+        where.append(after)
+
+    params["lim"] = limit + 1
+    rows = (await s.execute(text(f"""
+        SELECT u.id, u.email, u.nombre, u.telefono, u.status
+          FROM ev_iam.usuario u
+         WHERE {" AND ".join(where)}
+         ORDER BY {order}
+         LIMIT :lim
+    """), params)).mappings().all()
+    page = [dict(r) for r in rows[:limit]]
+    next_cursor = _encode([str(page[-1][k]) for k in keys]) if len(rows) > limit else None
+    return {"items": page, "next_cursor": next_cursor, "total": total, "total_exact": exact}
@@ -1,34 +1,19 @@
-from fastapi import APIRouter, Depends, Security, HTTPException, status, Body, Query, Path
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query, Path
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
-from jose import jwt, JWTError
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
 
 from ev_shared.config import Settings
-from ev_shared.db import session_scope
+from ev_shared.db import async_session_scope
+from ev_shared.security.auth import get_token_claims, require_claims, to_user
+from ev_shared.security.permissions import Perm, has_permission
 
-# 👉 HTTP Bearer para endpoints protegidos (muestra Authorize en Swagger)
-bearer_scheme = HTTPBearer(auto_error=True)
-
-def validate_token(
-    creds: HTTPAuthorizationCredentials = Security(bearer_scheme),
-    settings: Settings = Depends(lambda: Settings()),
-):
-    token = creds.credentials
-    algorithm = getattr(settings, "JWT_ALG", getattr(settings, "JWT_ALGORITHM", "HS256"))
-    secret = getattr(settings, "JWT_SECRET", None)
-    if not secret:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="JWT_SECRET no configurado")
-    try:
-        payload = jwt.decode(token, secret, algorithms=[algorithm])
-        if "sub" not in payload or "role" not in payload:
-            raise HTTPException(status_code=401, detail="Token inválido (claims)")
-        return payload
-    except JWTError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido o expirado")
+def validate_token(claims: Dict[str, Any] = Depends(get_token_claims)):
+    # Verificación compartida (cache de claims + request.state); aquí solo los claims que usa el servicio.
+    # Claims + {id, email, role}: las rutas usan user["id"] y has_permission sigue viendo `perm`
+    return {**require_claims(claims, ("sub", "role")), **to_user(claims)}
 
 
 # ------- Schemas -------
@@ -70,14 +55,14 @@ def build_api_router(settings: Settings) -> APIRouter:
 
     # HEALTH (público)
     @r.get("/health", response_model=Health, operation_id="proveedores_health", openapi_extra={"security": []})
-    def health():
+    async def health():
         return {"status": "ok"}
 
     # GET /v1/proveedores?servicio_id=...&fecha=... (público)
     # Intenta chequear reservas confirmadas (ev_contratacion.reserva).
     # Si MySQL devuelve 1142 (permiso denegado), cae a un fallback sin ese chequeo.
     @r.get("/v1/proveedores", openapi_extra={"security": []})
-    def buscar_disponibles(
+    async def buscar_disponibles(
         servicio_id: str,
         fecha: str,
         limit: int = Query(50, ge=1, le=200),
@@ -150,9 +135,9 @@ def build_api_router(settings: Settings) -> APIRouter:
 
         params = {"sid": servicio_id, "start_dt": start, "end_dt": end, "lim": limit, "off": offset}
 
-        with session_scope(settings) as s:
+        async with async_session_scope(settings, readonly=True) as s:
             try:
-                rows = s.execute(sql_full, params).mappings().all()
+                rows = (await s.execute(sql_full, params)).mappings().all()
             except SQLAlchemyError as e:
                 # Detecta permiso denegado a ev_contratacion.reserva (1142)
                 orig = getattr(e, "orig", None)
@@ -160,7 +145,7 @@ def build_api_router(settings: Settings) -> APIRouter:
                     errcode = orig.args[0]
                     if errcode == 1142:
                         # Reintenta sin chequear ev_contratacion.reserva
-                        rows = s.execute(sql_fallback, params).mappings().all()
+                        rows = (await s.execute(sql_fallback, params)).mappings().all()
                     else:
                         raise
                 else:
@@ -170,16 +155,16 @@ def build_api_router(settings: Settings) -> APIRouter:
 
     # POST /v1/proveedores/reservas (protegido)
     @r.post("/v1/proveedores/reservas", status_code=status.HTTP_201_CREATED, response_model=HoldOut)
-    def crear_reserva_temporal(
+    async def crear_reserva_temporal(
         body: CrearHoldIn = Body(...),
         user=Depends(validate_token),
     ):
         if body.inicio >= body.fin:
             raise HTTPException(status_code=400, detail="Rango de tiempo inválido (fin > inicio)")
 
-        with session_scope(settings) as s:
+        async with async_session_scope(settings) as s:
             # Conflictos con holds
-            conflict_hold = s.execute(
+            conflict_hold = (await s.execute(
                 text("""
                     SELECT id FROM ev_proveedores.reserva_temporal
                     WHERE proveedor_id = :pid
@@ -189,13 +174,13 @@ def build_api_router(settings: Settings) -> APIRouter:
                     LIMIT 1
                 """),
                 {"pid": body.proveedor_id, "ini": body.inicio, "fin": body.fin},
-            ).first()
+            )).first()
             if conflict_hold:
                 raise HTTPException(status_code=409, detail="Proveedor no disponible (hold activo)")
 
             # Conflictos con reservas confirmadas (si hay permisos; si no, no romper)
             try:
-                conflict_res = s.execute(
+                conflict_res = (await s.execute(
                     text("""
                         SELECT id FROM ev_contratacion.reserva
                         WHERE proveedor_id = :pid
@@ -204,7 +189,7 @@ def build_api_router(settings: Settings) -> APIRouter:
                         LIMIT 1
                     """),
                     {"pid": body.proveedor_id, "ini": body.inicio, "fin": body.fin},
-                ).first()
+                )).first()
                 if conflict_res:
                     raise HTTPException(status_code=409, detail="Proveedor no disponible (reserva confirmada)")
             except SQLAlchemyError as e:
@@ -215,7 +200,7 @@ def build_api_router(settings: Settings) -> APIRouter:
                 # Si es 1142, lo ignoramos para no romper el flujo (quedará menos estricto)
 
             # Descanso
-            conflict_desc = s.execute(
+            conflict_desc = (await s.execute(
                 text("""
                     SELECT id FROM ev_proveedores.calendario_proveedor
                     WHERE proveedor_id = :pid
@@ -224,12 +209,12 @@ def build_api_router(settings: Settings) -> APIRouter:
                     LIMIT 1
                 """),
                 {"pid": body.proveedor_id, "ini": body.inicio, "fin": body.fin},
-            ).first()
+            )).first()
             if conflict_desc:
                 raise HTTPException(status_code=409, detail="Proveedor en descanso")
 
             # Crear hold
-            s.execute(
+            await s.execute(
                 text("""
                     INSERT INTO ev_proveedores.reserva_temporal
                       (id, proveedor_id, opcion_servicio_id, inicio, fin, status, expira_en, correlation_id, created_by)
@@ -247,7 +232,7 @@ def build_api_router(settings: Settings) -> APIRouter:
                 },
             )
 
-            row = s.execute(
+            row = (await s.execute(
                 text("""
                     SELECT id, proveedor_id, opcion_servicio_id, inicio, fin, expira_en, status
                     FROM ev_proveedores.reserva_temporal
@@ -257,7 +242,7 @@ def build_api_router(settings: Settings) -> APIRouter:
                     LIMIT 1
                 """),
                 {"pid": body.proveedor_id, "oid": body.opcion_servicio_id},
-            ).mappings().first()
+            )).mappings().first()
 
         return HoldOut(
             id=row["id"],
@@ -271,12 +256,12 @@ def build_api_router(settings: Settings) -> APIRouter:
 
     # DELETE /v1/proveedores/reservas/{id} (protegido)
     @r.delete("/v1/proveedores/reservas/{id}", status_code=status.HTTP_204_NO_CONTENT)
-    def liberar_reserva_temporal(
+    async def liberar_reserva_temporal(
         id: str = Path(..., description="ID del hold"),
         user=Depends(validate_token),
     ):
-        with session_scope(settings) as s:
-            hold = s.execute(
+        async with async_session_scope(settings) as s:
+            hold = (await s.execute(
                 text("""
                     SELECT id, created_by, status
                     FROM ev_proveedores.reserva_temporal
@@ -284,19 +269,18 @@ def build_api_router(settings: Settings) -> APIRouter:
                     LIMIT 1
                 """),
                 {"hid": id},
-            ).mappings().first()
+            )).mappings().first()
 
             if not hold:
                 raise HTTPException(status_code=404, detail="Hold no encontrado")
 
-            role = (user.get("role") or "").upper()
-            if str(hold["created_by"]) != str(user["id"]) and role != "ADMIN":
+            if str(hold["created_by"]) != str(user["id"]) and not has_permission(user, Perm.PROVEEDORES_ESCRIBIR):
                 raise HTTPException(status_code=403, detail="No puedes liberar este hold")
 
             if hold["status"] != 0:
                 raise HTTPException(status_code=409, detail="Hold no está activa")
 
-            s.execute(
+            await s.execute(
                 text("""
                     UPDATE ev_proveedores.reserva_temporal
                     SET status = 3  -- liberada
@@ -0,0 +1,86 @@
+"""
+tools/bench_db_async.py
+-----------------------
+Benchmark sync (session_scope + threadpool) vs async (async_session_scope + event loop)
+contra un MySQL local. Reporta requests/seg, p50 y p99.
+Usage:
+    python tools/bench_db_async.py --requests 5000 --concurrency 200
+    python tools/bench_db_async.py --sql "SELECT id FROM ev_catalogo.tipo_evento LIMIT 50"
+Lee la conexión desde el .env del directorio actual (DB_HOST, DB_USER, ...).
+El modo sync usa un pool de 40 hilos, el mismo tamaño que el threadpool por defecto de Starlette.
+Synopsis: created by emeday 2025
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from sqlalchemy import text
+from ev_shared.config import Settings
+from ev_shared.db import session_scope, async_session_scope, dispose_engines, dispose_async_engines
+
+STARLETTE_THREADS = 40
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+def _report(label: str, latencies: List[float], elapsed: float) -> None:
+    n = len(latencies)
+    print(f"{label:<6} n={n:<7} rps={n / elapsed:10.1f}  "
+          f"p50={_percentile(latencies, 50) * 1000:8.2f} ms  p99={_percentile(latencies, 99) * 1000:8.2f} ms")
+
+def bench_sync(settings: Settings, sql: str, requests: int) -> None:
+    stmt = text(sql)
+
+    def one() -> float:
+        t0 = time.perf_counter()
+        with session_scope(settings) as s:
+            s.execute(stmt).fetchall()
+        return time.perf_counter() - t0
+
+    one()  # calienta el pool
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=STARLETTE_THREADS) as ex:
+        latencies = list(ex.map(lambda _: one(), range(requests)))
+    _report("sync", latencies, time.perf_counter() - t0)
+    dispose_engines()
+
+async def bench_async(settings: Settings, sql: str, requests: int, concurrency: int) -> None:
+    stmt = text(sql)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one() -> float:
+        async with sem:
+            t0 = time.perf_counter()
+            async with async_session_scope(settings) as s:
+                (await s.execute(stmt)).fetchall()
+            return time.perf_counter() - t0
+
+    await one()
+    t0 = time.perf_counter()
+    latencies = await asyncio.gather(*(one() for _ in range(requests)))
+    _report("async", list(latencies), time.perf_counter() - t0)
+    await dispose_async_engines()
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark sync vs async DB path")
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=200, help="consultas en vuelo en modo async")
+    ap.add_argument("--sql", default="SELECT 1")
+    ap.add_argument("--mode", choices=["both", "sync", "async"], default="both")
+    args = ap.parse_args()
+
+    settings = Settings()
+    print(f"DB {settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}  "
+          f"pool={settings.DB_POOL_SIZE}+{settings.DB_MAX_OVERFLOW}  sql={args.sql!r}")
+    if args.mode in ("both", "sync"):
+        bench_sync(settings, args.sql, args.requests)
+    if args.mode in ("both", "async"):
+        asyncio.run(bench_async(settings, args.sql, args.requests, args.concurrency))
+
+if __name__ == "__main__":
+    main()
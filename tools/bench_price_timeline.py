@@ -0,0 +1,192 @@
+"""
+tools/bench_price_timeline.py
+-----------------------------
+Benchmark del índice de precios en memoria (ev_shared.pricing) contra la resolución en MySQL.
+- En memoria (siempre): genera --rows precios sintéticos repartidos en --options opciones
+  (intervalos consecutivos, el último abierto), construye el PriceIndex y mide lookups
+  puntuales y por lote de pares (opción, fecha) aleatorios.
+- --db: carga el índice desde ev_catalogo.precio_servicio y compara, para --samples pares,
+  price_at() contra la consulta equivalente a v_opcion_con_precio_vigente con fecha parámetro
+  (y contra la vista misma para la fecha de hoy), con p50/p99 por lookup.
+- --seed / --cleanup: inserta / borra en la BD local opciones y precios sintéticos
+  (servicio_id y nombre con prefijo "bench-") para llegar a --rows filas.
+Usage:
+    python tools/bench_price_timeline.py --rows 1000000 --options 100000
+    python tools/bench_price_timeline.py --seed --rows 1000000 --options 100000
+    python tools/bench_price_timeline.py --db --samples 2000
+    python tools/bench_price_timeline.py --cleanup
+Lee la conexión desde el .env del directorio actual (DB_HOST, DB_USER, ...).
+Synopsis: created by emeday 2025
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Tuple
+from sqlalchemy import text
+from ev_shared.batching import multi_row_insert
+from ev_shared.config import Settings
+from ev_shared.db import async_session_scope, dispose_async_engines, dispose_engines, session_scope
+from ev_shared.pricing import PriceIndex, load_option_index
+
+BENCH_SERVICIO = "bench-0000-0000-0000-000000000000"
+BASE = date(2020, 1, 1)
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+def _report(label: str, latencies: List[float]) -> None:
+    print(f"  {label:<22} n={len(latencies):<7} p50={_percentile(latencies, 50) * 1e6:9.1f} us  "
+          f"p99={_percentile(latencies, 99) * 1e6:9.1f} us")
+
+def synthetic_rows(rows: int, options: int, seed: int = 7) -> Iterator[Dict[str, Any]]:
+    """`rows` precios en `options` opciones: tramos de 15 a 120 días, el último sin vigente_hasta"""
+    rnd = random.Random(seed)
+    per_option = max(1, rows // options)
+    for o in range(options):
+        op = f"bench-{o:08d}-0000-0000-000000000000"
+        start = BASE
+        for k in range(per_option):
+            end = None if k == per_option - 1 else start + timedelta(days=rnd.randint(15, 120))
+            yield {"id": str(uuid.uuid4()), "opcion_servicio_id": op, "moneda": "PEN",
+                   "monto": Decimal(rnd.randint(100, 99999)) / 100, "vigente_desde": start, "vigente_hasta": end}
+            if end is not None:
+                start = end + timedelta(days=1)
+
+def _pairs(keys: List[str], n: int, span_days: int, seed: int = 11) -> List[Tuple[str, date]]:
+    rnd = random.Random(seed)
+    return [(rnd.choice(keys), BASE + timedelta(days=rnd.randint(0, span_days))) for _ in range(n)]
+
+def bench_memory(rows: int, options: int, lookups: int) -> None:
+    print(f"En memoria: {rows} precios / {options} opciones")
+    t0 = time.perf_counter()
+    data = list(synthetic_rows(rows, options))
+    t1 = time.perf_counter()
+    index = PriceIndex.from_rows(data)
+    t2 = time.perf_counter()
+    print(f"  generación {t1 - t0:.1f} s, construcción del índice {t2 - t1:.1f} s "
+          f"({len(data) / (t2 - t1):,.0f} filas/s)")
+    pairs = _pairs(list(index.timelines), lookups, span_days=365 * 6)
+
+    latencies = []
+    for key, fecha in pairs[:min(lookups, 100000)]:
+        t = time.perf_counter()
+        index.price_at(key, fecha)
+        latencies.append(time.perf_counter() - t)
+    _report("price_at", latencies)
+
+    t = time.perf_counter()
+    index.prices_at(pairs)
+    elapsed = time.perf_counter() - t
+    print(f"  prices_at (lote)       n={len(pairs):<7} {elapsed * 1000:.1f} ms ({len(pairs) / elapsed:,.0f} lookups/s)")
+
+_AT_DATE_SQL = text("""
+    SELECT p.moneda, p.monto
+      FROM ev_catalogo.precio_servicio p
+      JOIN ev_catalogo.opcion_servicio o
+        ON o.id = p.opcion_servicio_id AND o.is_deleted = 0 AND o.status = 1
+     WHERE p.opcion_servicio_id = :op
+       AND p.vigente_desde <= :fecha
+       AND (p.vigente_hasta IS NULL OR p.vigente_hasta >= :fecha)
+     ORDER BY p.vigente_desde DESC
+     LIMIT 1
+""")
+
+_VIEW_SQL = text("SELECT moneda, monto FROM ev_catalogo.v_opcion_con_precio_vigente WHERE opcion_id = :op")
+
+async def bench_db(settings: Settings, samples: int) -> None:
+    async with async_session_scope(settings, readonly=True) as s:
+        total = (await s.execute(text("SELECT COUNT(*) FROM ev_catalogo.precio_servicio"))).scalar()
+        t0 = time.perf_counter()
+        index = await load_option_index(s)
+        print(f"BD: {total} precios; índice cargado en {time.perf_counter() - t0:.1f} s ({len(index)} opciones)")
+        if not len(index):
+            return
+        pairs = _pairs(list(index.timelines), samples, span_days=365 * 6)
+        today = (await s.execute(text("SELECT CURRENT_DATE()"))).scalar()
+
+        mem, sql, view, mismatches = [], [], [], 0
+        for key, fecha in pairs:
+            t = time.perf_counter()
+            expected = index.price_at(key, fecha)
+            mem.append(time.perf_counter() - t)
+            t = time.perf_counter()
+            row = (await s.execute(_AT_DATE_SQL, {"op": key, "fecha": fecha})).first()
+            sql.append(time.perf_counter() - t)
+            if (tuple(row) if row else None) != expected:
+                mismatches += 1
+            t = time.perf_counter()
+            (await s.execute(_VIEW_SQL, {"op": key})).all()
+            view.append(time.perf_counter() - t)
+    _report("índice price_at", mem)
+    _report("SQL con fecha", sql)
+    _report(f"vista (hoy {today})", view)
+    print(f"  diferencias índice vs SQL: {mismatches}")
+    await dispose_async_engines()
+
+def seed(settings: Settings, rows: int, options: int, batch: int = 1000) -> None:
+    cols = ("id", "opcion_servicio_id", "moneda", "monto", "vigente_desde", "vigente_hasta")
+    t0 = time.perf_counter()
+    with session_scope(settings) as s:
+        for start in range(0, options, batch):
+            ops = [{"id": f"bench-{o:08d}-0000-0000-000000000000", "servicio_id": BENCH_SERVICIO,
+                    "nombre": f"bench-{o}"} for o in range(start, min(options, start + batch))]
+            s.execute(*multi_row_insert("ev_catalogo.opcion_servicio", ("id", "servicio_id", "nombre"), ops, ignore=True))
+    written = 0
+    chunk: List[Dict[str, Any]] = []
+    for row in synthetic_rows(rows, options):
+        chunk.append(row)
+        if len(chunk) >= batch:
+            with session_scope(settings) as s:
+                s.execute(*multi_row_insert("ev_catalogo.precio_servicio", cols, chunk, ignore=True))
+            written += len(chunk)
+            chunk = []
+    if chunk:
+        with session_scope(settings) as s:
+            s.execute(*multi_row_insert("ev_catalogo.precio_servicio", cols, chunk, ignore=True))
+        written += len(chunk)
+    print(f"Seed: {written} precios en {options} opciones en {time.perf_counter() - t0:.1f} s")
+
+def cleanup(settings: Settings, batch: int = 10000) -> None:
+    deleted = 0
+    for sql in ("DELETE FROM ev_catalogo.precio_servicio WHERE opcion_servicio_id LIKE 'bench-%' LIMIT :n",
+                "DELETE FROM ev_catalogo.opcion_servicio WHERE servicio_id = :sid LIMIT :n"):
+        while True:
+            with session_scope(settings) as s:
+                n = s.execute(text(sql), {"n": batch, "sid": BENCH_SERVICIO}).rowcount or 0
+            deleted += n
+            if n < batch:
+                break
+    print(f"Cleanup: {deleted} filas")
+
+def main():
+    ap = argparse.ArgumentParser(description="Índice de precios en memoria vs vista/SQL")
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--options", type=int, default=100_000)
+    ap.add_argument("--lookups", type=int, default=1_000_000, help="pares (opción, fecha) en memoria")
+    ap.add_argument("--samples", type=int, default=2000, help="pares comparados contra la BD")
+    ap.add_argument("--db", action="store_true", help="comparar contra MySQL")
+    ap.add_argument("--seed", action="store_true", help="insertar precios sintéticos en la BD local")
+    ap.add_argument("--cleanup", action="store_true", help="borrar los datos sintéticos de la BD")
+    args = ap.parse_args()
+
+    if args.seed or args.cleanup or args.db:
+        settings = Settings()
+        if args.cleanup:
+            cleanup(settings)
+        if args.seed:
+            seed(settings, args.rows, args.options)
+        dispose_engines()
+        if args.db:
+            asyncio.run(bench_db(settings, args.samples))
+    else:
+        bench_memory(args.rows, args.options, args.lookups)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+tools/bench_settings.py
+-----------------------
+Microbenchmark del costo de obtener Settings por request:
+- antes:   Depends(lambda: Settings())  -> relee y parsea .env + entorno en cada llamada
+- después: Depends(get_settings)        -> instancia cacheada del proceso
+Mide la llamada directa y el request completo a una app FastAPI mínima (TestClient).
+Usage:
+    python tools/bench_settings.py --calls 20000 --requests 2000
+Ejecutar desde el directorio del servicio para que lea su .env.
+Synopsis: created by emeday 2025
+"""
+import argparse
+import time
+from typing import Callable
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from ev_shared.config import Settings, get_settings
+
+def _per_call_us(fn: Callable[[], object], n: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e6
+
+def _build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/antes")
+    def antes(settings: Settings = Depends(lambda: Settings())):
+        return {"alg": settings.JWT_ALG}
+
+    @app.get("/despues")
+    def despues(settings: Settings = Depends(get_settings)):
+        return {"alg": settings.JWT_ALG}
+
+    return app
+
+def main():
+    ap = argparse.ArgumentParser(description="Costo por request de Settings() vs get_settings()")
+    ap.add_argument("--calls", type=int, default=20000, help="llamadas directas por variante")
+    ap.add_argument("--requests", type=int, default=2000, help="requests HTTP in-process por variante")
+    args = ap.parse_args()
+
+    old_us = _per_call_us(Settings, args.calls)
+    new_us = _per_call_us(get_settings, args.calls)
+    print(f"llamada  Settings()={old_us:9.2f} us  get_settings()={new_us:7.2f} us  x{old_us / new_us:,.0f}")
+
+    client = TestClient(_build_app())
+    old_req = _per_call_us(lambda: client.get("/antes"), args.requests)
+    new_req = _per_call_us(lambda: client.get("/despues"), args.requests)
+    print(f"request  antes={old_req:9.2f} us  después={new_req:9.2f} us  "
+          f"ahorro={old_req - new_req:8.2f} us/request")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+tools/migrate_password_hashes.py
+--------------------------------
+Inventario y migración offline de hashes en ev_iam.usuario.
+- Reporta cuántos hashes hay por esquema: bcrypt_sha256 (vigente o con menos rounds que el
+  configurado), bcrypt legacy ($2a/$2b/$2y) y otros/vacíos.
+- Con --temp-password (repetible) o --temp-password-file, prueba esas contraseñas temporales
+  contra cada hash desactualizado en un pool de procesos y rehashea los que coinciden con
+  bcrypt_sha256; UPDATE de a --batch filas en una sola sentencia (CASE por id), condicionado
+  al hash anterior para no pisar un login o un cambio de contraseña concurrente.
+- --report escribe CSV (id, email, esquema) de las cuentas que siguen desactualizadas.
+Usage:
+    python tools/migrate_password_hashes.py
+    python tools/migrate_password_hashes.py --temp-password "Temporal2024" --report legacy.csv
+    python tools/migrate_password_hashes.py --temp-password-file temporales.txt --workers 8 --dry-run
+Lee la conexión y el costo bcrypt (BCRYPT_*) desde el .env del directorio actual.
+Synopsis: created by emeday 2025
+"""
+import argparse
+import csv
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import text
+from ev_shared.config import Settings
+from ev_shared.db import session_scope, dispose_engines
+from ev_shared.security.hashing import configure_password_cost
+from ev_shared.security.passwords import (
+    configure_rounds, hash_password, is_bcrypt, is_bcrypt_sha256, needs_rehash, verify_password,
+)
+
+Candidate = Tuple[str, str, str]  # (id, email, hash)
+
+def scheme_of(hash_: Optional[str]) -> str:
+    if not hash_:
+        return "vacio"
+    if is_bcrypt_sha256(hash_):
+        return "bcrypt_sha256_debil" if needs_rehash(hash_) else "bcrypt_sha256"
+    if is_bcrypt(hash_):
+        return "bcrypt_legacy"
+    return "otro"
+
+def scan(settings: Settings, fetch: int) -> Tuple[Counter, List[Candidate]]:
+    """Recorre usuario con cursor del servidor; retorna conteo por esquema y los desactualizados"""
+    counts: Counter = Counter()
+    outdated: List[Candidate] = []
+    stmt = text("SELECT id, email, password_hash FROM ev_iam.usuario WHERE is_deleted = 0")
+    with session_scope(settings, readonly=True) as s:
+        result = s.execute(stmt.execution_options(stream_results=True, yield_per=fetch))
+        for uid, email, hash_ in result:
+            scheme = scheme_of(hash_)
+            counts[scheme] += 1
+            if scheme in ("bcrypt_legacy", "bcrypt_sha256_debil"):
+                outdated.append((str(uid), email, hash_))
+    return counts, outdated
+
+def _init_worker(rounds: int) -> None:
+    configure_rounds(rounds)
+
+def _try_upgrade(job: Tuple[str, str, Sequence[str]]) -> Optional[Tuple[str, str, str]]:
+    """(id, hash, contraseñas) -> (id, hash anterior, hash nuevo) si alguna coincide"""
+    uid, old_hash, passwords = job
+    for pw in passwords:
+        if verify_password(pw, old_hash):
+            return uid, old_hash, hash_password(pw)
+    return None
+
+def apply_updates(settings: Settings, upgrades: List[Tuple[str, str, str]]) -> int:
+    """Un UPDATE por lote; solo cambia filas cuyo hash sigue siendo el leído"""
+    params: Dict[str, str] = {}
+    new_cases, old_cases, ids = [], [], []
+    for i, (uid, old_hash, new_hash) in enumerate(upgrades):
+        params.update({f"id_{i}": uid, f"new_{i}": new_hash, f"old_{i}": old_hash})
+        new_cases.append(f"WHEN :id_{i} THEN :new_{i}")
+        old_cases.append(f"WHEN :id_{i} THEN :old_{i}")
+        ids.append(f":id_{i}")
+    sql = f"""
+        UPDATE ev_iam.usuario
+           SET password_hash = CASE id {' '.join(new_cases)} END
+         WHERE id IN ({', '.join(ids)})
+           AND password_hash = CASE id {' '.join(old_cases)} END
+    """
+    with session_scope(settings) as s:
+        return s.execute(text(sql), params).rowcount or 0
+
+def _load_passwords(args: argparse.Namespace) -> List[str]:
+    passwords = list(args.temp_password or [])
+    if args.temp_password_file:
+        with open(args.temp_password_file, encoding="utf-8") as f:
+            passwords.extend(line.rstrip("\r\n") for line in f if line.strip())
+    return list(dict.fromkeys(passwords))
+
+def main():
+    parser = argparse.ArgumentParser(description="Inventario y migración de hashes de ev_iam.usuario")
+    parser.add_argument("--temp-password", action="append", help="contraseña temporal conocida (repetible)")
+    parser.add_argument("--temp-password-file", help="archivo con una contraseña temporal por línea")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="procesos para bcrypt")
+    parser.add_argument("--batch", type=int, default=500, help="filas por UPDATE")
+    parser.add_argument("--fetch", type=int, default=5000, help="filas por lectura del cursor")
+    parser.add_argument("--report", help="CSV con las cuentas que siguen desactualizadas")
+    parser.add_argument("--dry-run", action="store_true", help="no escribe en la BD")
+    args = parser.parse_args()
+
+    settings = Settings()
+    rounds = configure_password_cost(settings)
+    t0 = time.perf_counter()
+    counts, outdated = scan(settings, args.fetch)
+    print(f"Escaneo en {time.perf_counter() - t0:.1f} s (bcrypt rounds vigentes: {rounds})")
+    for scheme, n in counts.most_common():
+        print(f"  {scheme:<22} {n}")
+
+    upgraded: Dict[str, str] = {}
+    passwords = _load_passwords(args)
+    if passwords and outdated:
+        t0 = time.perf_counter()
+        jobs = [(uid, hash_, passwords) for uid, _, hash_ in outdated]
+        pending: List[Tuple[str, str, str]] = []
+        written = 0
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(rounds,)) as ex:
+            for result in ex.map(_try_upgrade, jobs, chunksize=16):
+                if result is None:
+                    continue
+                upgraded[result[0]] = result[2]
+                pending.append(result)
+                if len(pending) >= args.batch:
+                    written += 0 if args.dry_run else apply_updates(settings, pending)
+                    pending = []
+        if pending and not args.dry_run:
+            written += apply_updates(settings, pending)
+        elapsed = time.perf_counter() - t0
+        print(f"Contraseña temporal en {len(upgraded)} de {len(outdated)} cuentas desactualizadas; "
+              f"actualizadas {written}{' (dry-run)' if args.dry_run else ''} en {elapsed:.1f} s "
+              f"({len(outdated) / elapsed if elapsed else 0:.1f} hashes/s)")
+
+    remaining = [(uid, email, scheme_of(hash_)) for uid, email, hash_ in outdated if uid not in upgraded]
+    print(f"Siguen desactualizadas: {len(remaining)}")
+    if args.report:
+        with open(args.report, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["id", "email", "esquema"])
+            writer.writerows(remaining)
+        print(f"Reporte: {args.report}")
+    dispose_engines()
+
+if __name__ == "__main__":
+    main()
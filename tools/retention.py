@@ -0,0 +1,41 @@
+"""
+tools/retention.py
+------------------
+Aplica las políticas de retención (RETENTION_POLICIES) una vez y reporta filas/seg por tabla.
+Usage:
+    python tools/retention.py --dry-run
+    python tools/retention.py --table ev_iam.login_intento
+Lee la conexión y las políticas desde el .env del directorio actual (ver ev_shared.retention).
+Synopsis: created by emeday 2025
+"""
+import argparse
+import asyncio
+from ev_shared.config import Settings
+from ev_shared.db import dispose_async_engines
+from ev_shared.retention import run_retention
+
+def _print(report: dict) -> None:
+    if "error" in report:
+        print(f"{report['policy']:<50} ERROR {report['error']}")
+    elif report.get("skipped"):
+        print(f"{report['policy']:<50} omitida ({report['skipped']})")
+    else:
+        print(f"{report['policy']:<50} filas={report['deleted']:<9} archivadas={report['archived']:<9} "
+              f"chunks={report['chunks']:<6} {report['seconds']:8.2f} s  {report['rows_per_sec']:10.1f} filas/s")
+
+async def main_async(args: argparse.Namespace) -> None:
+    settings = Settings()
+    try:
+        for report in await run_retention(settings, dry_run=args.dry_run, tables=args.table):
+            _print(report)
+    finally:
+        await dispose_async_engines()
+
+def main():
+    parser = argparse.ArgumentParser(description="Retención de tablas ev_iam")
+    parser.add_argument("--dry-run", action="store_true", help="solo cuenta las filas vencidas")
+    parser.add_argument("--table", action="append", help="limitar a esta tabla (repetible)")
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()